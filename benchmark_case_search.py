@@ -0,0 +1,206 @@
+import argparse
+import json
+import platform
+import random
+import string
+import time
+import numpy as np
+from config import MYSQL_CONFIG
+
+FIRST_NAMES = ["aarav", "aditi", "anaya", "arjun", "diya", "ishaan", "kabir", "kavya", "meera", "neha",
+               "priya", "rahul", "riya", "rohan", "sara", "tara", "vihaan", "zara", "liam", "emma"]
+LAST_NAMES = ["sharma", "patel", "naik", "iyer", "reddy", "gupta", "khan", "das", "mehta", "rao"]
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='Synthetic-scale benchmark for case name search')
+    parser.add_argument('--rows', type=int, default=100000,
+                        help='Synthetic Children_Metadata rows')
+    parser.add_argument('--open-fraction', type=float, default=0.7,
+                        help='Share of rows left Open')
+    parser.add_argument('--queries', type=int, default=200,
+                        help='Search terms timed per method')
+    parser.add_argument('--database', type=str, default='child_safety_bench',
+                        help='Scratch database (created and dropped; never the live one)')
+    parser.add_argument('--keep', action='store_true',
+                        help='Keep the scratch database for repeat runs')
+    parser.add_argument('--seed', type=int, default=42,
+                        help='Random seed for reproducible runs')
+    parser.add_argument('--output', type=str, default='case_search_benchmark.json',
+                        help='JSON file to write results to')
+    return parser.parse_args()
+
+def percentiles(samples_ms):
+    samples_ms = np.asarray(samples_ms)
+    return {
+        "p50_ms": float(np.percentile(samples_ms, 50)),
+        "p95_ms": float(np.percentile(samples_ms, 95)),
+        "p99_ms": float(np.percentile(samples_ms, 99)),
+        "mean_ms": float(samples_ms.mean()),
+    }
+
+def synthetic_name(rng):
+    return f"{rng.choice(FIRST_NAMES).title()} {rng.choice(LAST_NAMES).title()}"
+
+def populate(database, rows, open_fraction, rng, batch_size=5000):
+    """
+    Fill the scratch table with synthetic cases in executemany batches
+    """
+    conn = database.create_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT COUNT(*) FROM Children_Metadata")
+        existing = cursor.fetchone()[0]
+        if existing >= rows:
+            return existing
+
+        query = """
+        INSERT INTO Children_Metadata
+        (name, age, gender, guardian_contact, embedding_id, image_url, case_status, last_known_location)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+        """
+        for start in range(existing, rows, batch_size):
+            batch = []
+            for i in range(start, min(start + batch_size, rows)):
+                batch.append((
+                    synthetic_name(rng),
+                    rng.randint(1, 17),
+                    rng.choice(["Male", "Female", "Other"]),
+                    "9" + "".join(rng.choices(string.digits, k=9)),
+                    i,
+                    f"bench/{i}.enc",
+                    "Open" if rng.random() < open_fraction else "Closed",
+                    rng.choice(["Mumbai", "Pune", "Goa", None]),
+                ))
+            cursor.executemany(query, batch)
+            conn.commit()
+        return rows
+    finally:
+        conn.close()
+
+def legacy_filter(database, term):
+    # What ChildSafetyApp.filter_cases did: fetch every open case and match in Python
+    term = term.lower()
+    return [case for case in database.search_open_cases() if term in case['name'].lower()]
+
+def legacy_guardian_contacts(database, name):
+    # What ChildSafetyApp.get_all_guardian_contacts did: exact name scan and list-membership dedupe
+    conn = database.create_connection()
+    try:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute("SELECT guardian_contact FROM Children_Metadata WHERE name = %s AND case_status = 'Open'",
+                       (name,))
+        unique_contacts = []
+        for result in cursor.fetchall():
+            if result['guardian_contact'] not in unique_contacts:
+                unique_contacts.append(result['guardian_contact'])
+        return unique_contacts
+    finally:
+        conn.close()
+
+def time_calls(function, arguments):
+    samples = []
+    for argument in arguments:
+        start = time.perf_counter()
+        function(argument)
+        samples.append((time.perf_counter() - start) * 1000)
+    return percentiles(samples)
+
+def explain(database, query, params):
+    conn = database.create_connection()
+    try:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute("EXPLAIN " + query, params)
+        return [{k: row[k] for k in ("type", "key", "rows", "Extra")} for row in cursor.fetchall()]
+    finally:
+        conn.close()
+
+def main():
+    args = parse_arguments()
+    if args.database == MYSQL_CONFIG["database"]:
+        raise SystemExit("Refusing to benchmark against the live database")
+
+    # Point database.py at the scratch database; EXPLAIN output below is MySQL-specific
+    import database
+    from metadata_backends import MySQLBackend, set_backend
+    set_backend(MySQLBackend(dict(MYSQL_CONFIG, database=args.database)))
+
+    rng = random.Random(args.seed)
+    database.create_database()
+    database.create_metadata_table()
+
+    print(f"Populating {args.rows} synthetic rows in {args.database}...")
+    start = time.perf_counter()
+    rows = populate(database, args.rows, args.open_fraction, rng)
+    populate_seconds = time.perf_counter() - start
+
+    prefixes = [rng.choice(FIRST_NAMES)[:rng.randint(2, 4)] for _ in range(args.queries)]
+    names = [synthetic_name(rng) for _ in range(args.queries)]
+
+    print("Timing searches...")
+    results = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "parameters": {
+            "rows": rows,
+            "open_fraction": args.open_fraction,
+            "queries": args.queries,
+            "page_size": database.CASE_PAGE_SIZE,
+            "seed": args.seed,
+        },
+        "populate_seconds": populate_seconds,
+        "filter": {
+            "legacy_full_scan": time_calls(lambda t: legacy_filter(database, t), prefixes),
+            "indexed_first_page": time_calls(database.search_open_cases_by_name, prefixes),
+            "indexed_count": time_calls(database.count_open_cases_by_name, prefixes),
+        },
+        "guardian_contacts": {
+            "legacy": time_calls(lambda n: legacy_guardian_contacts(database, n), names),
+            "indexed_distinct": time_calls(database.get_guardian_contacts_by_name, names),
+        },
+        "explain": {
+            "name_search": explain(
+                database,
+                "SELECT child_id FROM Children_Metadata WHERE case_status = 'Open' "
+                "AND name_normalized LIKE %s ORDER BY name_normalized, child_id LIMIT 100",
+                ("aa%",)
+            ),
+            "open_cases_page": explain(
+                database,
+                f"SELECT {database.CASE_LIST_COLUMNS} FROM Children_Metadata "
+                "WHERE case_status = 'Open' AND child_id > %s ORDER BY child_id LIMIT 100",
+                (0,)
+            ),
+            "guardian_contacts": explain(
+                database,
+                "SELECT guardian_contact FROM Children_Metadata WHERE case_status = 'Open' "
+                "AND name_normalized = %s GROUP BY guardian_contact",
+                ("aarav naik",)
+            ),
+        },
+    }
+
+    for section in ("filter", "guardian_contacts"):
+        for method, metrics in results[section].items():
+            print(f"  {section}/{method}: p50 {metrics['p50_ms']:.2f} ms, p95 {metrics['p95_ms']:.2f} ms")
+
+    if not args.keep:
+        conn = database.create_connection()
+        try:
+            conn.cursor().execute(f"DROP DATABASE {args.database}")
+        finally:
+            conn.close()
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2, default=str)
+    print(f"Results written to {args.output}")
+
+if __name__ == "__main__":
+    main()
+
+
+#!Python run script
+#full run (100k rows, scratch database dropped afterwards)
+#python benchmark_case_search.py --output bench_results/case_search_v1.json
+#repeat runs without re-populating
+#python benchmark_case_search.py --keep
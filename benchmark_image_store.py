@@ -0,0 +1,153 @@
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import tempfile
+import time
+import numpy as np
+from image_stores import FlatImageStore, ShardedImageStore, PackedImageStore, migrate_image_store
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='Write and random-read benchmark of the encrypted image stores')
+    parser.add_argument('--stores', nargs='+', default=['flat', 'sharded', 'packed'],
+                        choices=['flat', 'sharded', 'packed'], help='Stores to benchmark')
+    parser.add_argument('--images', type=int, default=100000,
+                        help='Blobs written to each store before the read benchmarks')
+    parser.add_argument('--blob-kb', type=int, default=64,
+                        help='Size of each blob in KiB (a typical encrypted photo)')
+    parser.add_argument('--reads', type=int, default=2000,
+                        help='Timed random reads per store')
+    parser.add_argument('--workdir', type=str, default=None,
+                        help='Directory to build the scratch stores in (defaults to the system temp dir; '
+                             'use the disk the real images live on)')
+    parser.add_argument('--seed', type=int, default=42,
+                        help='Random seed for reproducible runs')
+    parser.add_argument('--output', type=str, default='image_store_benchmark.json',
+                        help='JSON file to write results to')
+    return parser.parse_args()
+
+def percentiles(samples_ms):
+    samples_ms = np.asarray(samples_ms)
+    return {
+        "p50_ms": float(np.percentile(samples_ms, 50)),
+        "p95_ms": float(np.percentile(samples_ms, 95)),
+        "p99_ms": float(np.percentile(samples_ms, 99)),
+        "mean_ms": float(samples_ms.mean()),
+    }
+
+def count_inodes(path):
+    return sum(len(files) + len(directories) for _, directories, files in os.walk(path))
+
+def build_store(name, root):
+    if name == "flat":
+        return FlatImageStore(root)
+    if name == "sharded":
+        return ShardedImageStore(root)
+    return PackedImageStore(os.path.join(root, "pack"))
+
+def benchmark_store(store, root, names, payload, args, rng):
+    """
+    Fill a store, then time random full-blob reads and a full backup-style scan
+
+    Returns:
+        dict: Write throughput, read latency percentiles and layout counts
+    """
+    start = time.perf_counter()
+    for blob_name in names:
+        with store.open_write(blob_name) as dst:
+            dst.write(payload)
+    write_seconds = time.perf_counter() - start
+
+    # Listing cost grows with directory size for the flat layout
+    start = time.perf_counter()
+    listed = sum(1 for _ in store.names())
+    list_ms = (time.perf_counter() - start) * 1000
+
+    samples = []
+    for blob_name in rng.choices(names, k=args.reads):
+        start = time.perf_counter()
+        with store.open_read(blob_name) as src:
+            src.read()
+        samples.append((time.perf_counter() - start) * 1000)
+
+    # What a backup does: read every blob once
+    start = time.perf_counter()
+    scanned = 0
+    for blob_name in store.names():
+        with store.open_read(blob_name) as src:
+            scanned += len(src.read())
+    scan_seconds = time.perf_counter() - start
+
+    return {
+        "write_blobs_per_s": len(names) / write_seconds,
+        "random_read": percentiles(samples),
+        "list_ms": list_ms,
+        "listed": listed,
+        "full_scan_mb_per_s": scanned / (1024 * 1024) / scan_seconds,
+        "inodes": count_inodes(root),
+    }
+
+def main():
+    args = parse_arguments()
+    rng = random.Random(args.seed)
+    payload = os.urandom(args.blob_kb * 1024)
+    names = [f"{embedding_id}.enc" for embedding_id in rng.sample(range(10 ** 12), args.images)]
+
+    results = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "parameters": {
+            "images": args.images,
+            "blob_kb": args.blob_kb,
+            "reads": args.reads,
+            "seed": args.seed,
+        },
+        "stores": {},
+    }
+
+    workdir = tempfile.mkdtemp(prefix="image_store_bench_", dir=args.workdir)
+    try:
+        for name in args.stores:
+            print(f"Benchmarking {name} ({args.images} blobs of {args.blob_kb} KiB)...")
+            root = os.path.join(workdir, name)
+            os.makedirs(root)
+            metrics = benchmark_store(build_store(name, root), root, names, payload, args, random.Random(args.seed))
+            results["stores"][name] = metrics
+            print(f"  writes: {metrics['write_blobs_per_s']:.0f} blobs/s, inodes: {metrics['inodes']}")
+            print(f"  random read: p50 {metrics['random_read']['p50_ms']:.3f} ms, "
+                  f"p95 {metrics['random_read']['p95_ms']:.3f} ms")
+            print(f"  list: {metrics['list_ms']:.1f} ms, full scan: {metrics['full_scan_mb_per_s']:.0f} MB/s")
+
+        if "flat" in args.stores and len(args.stores) > 1:
+            # Cost of moving an existing installation to each other layout
+            flat = FlatImageStore(os.path.join(workdir, "flat"))
+            for name in args.stores:
+                if name == "flat":
+                    continue
+                root = os.path.join(workdir, f"migrated_{name}")
+                os.makedirs(root)
+                start = time.perf_counter()
+                migrate_image_store(flat, build_store(name, root))
+                seconds = time.perf_counter() - start
+                results["stores"][name]["migrate_from_flat_blobs_per_s"] = args.images / seconds
+                print(f"  flat -> {name} migration: {args.images / seconds:.0f} blobs/s")
+                shutil.rmtree(root, ignore_errors=True)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}")
+
+if __name__ == "__main__":
+    main()
+
+
+#!Python run script
+#all three layouts on the disk that holds data/images (use a cold cache for realistic reads)
+#python benchmark_image_store.py --workdir data --output bench_results/image_store_v1.json
+#quick run
+#python benchmark_image_store.py --images 10000 --reads 500
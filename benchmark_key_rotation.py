@@ -0,0 +1,110 @@
+import argparse
+import io
+import json
+import os
+import platform
+import shutil
+import tempfile
+import time
+from encryption import ImageEncryptor, KeyProvider
+from image_stores import FlatImageStore, PackedImageStore
+from key_rotation import KeyRotation, _PlaintextReader
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='Master key rotation cost by image size: rewrap vs full re-encryption')
+    parser.add_argument('--sizes-kb', nargs='+', type=int, default=[16, 256, 4096],
+                        help='Image sizes to test, in KiB')
+    parser.add_argument('--files', type=int, default=2000,
+                        help='Encrypted files per size')
+    parser.add_argument('--workers', nargs='+', type=int, default=[1, 8],
+                        help='Rotation thread counts to time')
+    parser.add_argument('--store', type=str, default='flat', choices=['flat', 'packed'],
+                        help='Image store layout to rotate')
+    parser.add_argument('--workdir', type=str, default=None,
+                        help='Directory for the scratch store (use the disk the real images live on)')
+    parser.add_argument('--output', type=str, default='key_rotation_benchmark.json',
+                        help='JSON file to write results to')
+    return parser.parse_args()
+
+def build_store(name, root):
+    return FlatImageStore(root) if name == "flat" else PackedImageStore(os.path.join(root, "pack"))
+
+def time_reencrypt(store, encryptor, names):
+    """
+    What rotation cost before envelope encryption: decrypt and re-encrypt every file
+
+    Returns:
+        float: Seconds
+    """
+    start = time.perf_counter()
+    for blob_name in names:
+        with store.open_read(blob_name) as src, store.open_write(blob_name) as dst:
+            encryptor.encrypt_stream(_PlaintextReader(encryptor.iter_decrypt_stream(src)), dst)
+    return time.perf_counter() - start
+
+def benchmark_size(args, size_kb, workdir):
+    root = os.path.join(workdir, f"{size_kb}kb")
+    os.makedirs(root)
+    provider = KeyProvider(os.path.join(root, "bench_key.bin"), env_var=None, lock_memory=False)
+    encryptor = ImageEncryptor(key_provider=provider)
+    store = build_store(args.store, root)
+
+    payload = os.urandom(size_kb * 1024)
+    names = [f"{i}.enc" for i in range(args.files)]
+    for blob_name in names:
+        with store.open_write(blob_name) as dst:
+            encryptor.encrypt_stream(io.BytesIO(payload), dst)
+
+    result = {"size_kb": size_kb, "files": args.files, "rotation": {}}
+    for workers in args.workers:
+        start = time.perf_counter()
+        outcome = KeyRotation(store=store, encryptor=encryptor, workers=workers).run()
+        seconds = time.perf_counter() - start
+        if not outcome["completed"]:
+            raise RuntimeError(f"Rotation did not complete: {outcome}")
+        result["rotation"][f"workers_{workers}"] = {
+            "seconds": seconds,
+            "ms_per_file": seconds * 1000 / args.files,
+            "rewrapped": outcome["rewrapped"],
+        }
+
+    seconds = time_reencrypt(store, encryptor, names)
+    result["full_reencrypt"] = {"seconds": seconds, "ms_per_file": seconds * 1000 / args.files}
+    shutil.rmtree(root, ignore_errors=True)
+    return result
+
+def main():
+    args = parse_arguments()
+    results = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "parameters": {"files": args.files, "store": args.store, "workers": args.workers},
+        "sizes": [],
+    }
+
+    workdir = tempfile.mkdtemp(prefix="key_rotation_bench_", dir=args.workdir)
+    try:
+        for size_kb in args.sizes_kb:
+            print(f"Benchmarking {args.files} files of {size_kb} KiB...")
+            result = benchmark_size(args, size_kb, workdir)
+            results["sizes"].append(result)
+            for label, metrics in result["rotation"].items():
+                print(f"  rewrap ({label}): {metrics['ms_per_file']:.3f} ms/file")
+            print(f"  full re-encrypt: {result['full_reencrypt']['ms_per_file']:.3f} ms/file")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}")
+
+if __name__ == "__main__":
+    main()
+
+
+#!Python run script
+#rewrap cost should stay flat across sizes while full re-encryption grows with them
+#python benchmark_key_rotation.py --workdir data --output bench_results/key_rotation_v1.json
+#packed store, more threads
+#python benchmark_key_rotation.py --store packed --workers 1 4 16
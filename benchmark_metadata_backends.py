@@ -0,0 +1,145 @@
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import tempfile
+import time
+import numpy as np
+from config import MYSQL_CONFIG
+import database
+from metadata_backends import MySQLBackend, SQLiteBackend, set_backend
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='Side-by-side latency benchmark of the metadata backends')
+    parser.add_argument('--backends', nargs='+', default=['sqlite', 'mysql'], choices=['sqlite', 'mysql'],
+                        help='Backends to benchmark')
+    parser.add_argument('--rows', type=int, default=10000,
+                        help='Cases registered before the read benchmarks')
+    parser.add_argument('--operations', type=int, default=500,
+                        help='Timed calls per operation')
+    parser.add_argument('--batch-size', type=int, default=50,
+                        help='Embedding IDs per batch lookup')
+    parser.add_argument('--mysql-database', type=str, default='child_safety_bench',
+                        help='Scratch MySQL database (created and dropped; never the live one)')
+    parser.add_argument('--seed', type=int, default=42,
+                        help='Random seed for reproducible runs')
+    parser.add_argument('--output', type=str, default='metadata_backend_benchmark.json',
+                        help='JSON file to write results to')
+    return parser.parse_args()
+
+def percentiles(samples_ms):
+    samples_ms = np.asarray(samples_ms)
+    return {
+        "p50_ms": float(np.percentile(samples_ms, 50)),
+        "p95_ms": float(np.percentile(samples_ms, 95)),
+        "p99_ms": float(np.percentile(samples_ms, 99)),
+        "mean_ms": float(samples_ms.mean()),
+    }
+
+def timed(function, arguments):
+    samples = []
+    for argument in arguments:
+        start = time.perf_counter()
+        function(argument)
+        samples.append((time.perf_counter() - start) * 1000)
+    return percentiles(samples)
+
+def benchmark_backend(args, rng):
+    """
+    Time the public database.py functions against whichever backend is active
+
+    Returns:
+        dict: Latency percentiles per operation
+    """
+    database.create_database()
+    database.create_metadata_table()
+
+    # Registration path: one insert and commit per case, as register_lost_child does
+    names = [f"Child {i % 1000}" for i in range(args.rows)]
+    insert = timed(
+        lambda i: database.insert_child_metadata(
+            names[i], rng.randint(1, 17), rng.choice(["Male", "Female", "Other"]),
+            "9" + str(rng.randrange(10 ** 9)).zfill(9), i, f"bench/{i}.enc", None, "Mumbai"
+        ),
+        range(args.rows)
+    )
+
+    ids = [rng.randrange(args.rows) for _ in range(args.operations)]
+    batches = [rng.sample(range(args.rows), args.batch_size) for _ in range(args.operations)]
+    cursors = [rng.randrange(args.rows) for _ in range(args.operations)]
+    prefixes = [f"child {rng.randrange(100)}" for _ in range(args.operations)]
+
+    return {
+        "insert": insert,
+        "get_by_embedding_id": timed(database.get_child_by_embedding_id, ids),
+        "get_by_embedding_ids_batch": timed(database.get_children_by_embedding_ids, batches),
+        "open_cases_page": timed(database.get_open_cases_page, cursors),
+        "count_open_cases": timed(lambda _: database.count_open_cases(), range(args.operations)),
+        "search_by_name": timed(database.search_open_cases_by_name, prefixes),
+        # 'Resolved' rather than 'Closed' so the benchmark never touches the FAISS tombstones
+        "update_case_status": timed(lambda i: database.update_case_status(i, 'Resolved'), ids),
+    }
+
+def main():
+    args = parse_arguments()
+    if args.mysql_database == MYSQL_CONFIG["database"]:
+        raise SystemExit("Refusing to benchmark against the live database")
+
+    # Measure the stores themselves, not the in-process cache in front of them
+    database._metadata_cache.max_entries = 0
+    database.invalidate_metadata_cache()
+
+    results = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "parameters": {
+            "rows": args.rows,
+            "operations": args.operations,
+            "batch_size": args.batch_size,
+            "seed": args.seed,
+        },
+        "backends": {},
+    }
+
+    workdir = tempfile.mkdtemp(prefix="metadata_backend_bench_")
+    try:
+        for name in args.backends:
+            print(f"Benchmarking {name}...")
+            if name == "sqlite":
+                backend = SQLiteBackend(os.path.join(workdir, "bench.db"))
+            else:
+                backend = MySQLBackend(dict(MYSQL_CONFIG, database=args.mysql_database))
+            set_backend(backend)
+
+            try:
+                metrics = benchmark_backend(args, random.Random(args.seed))
+            finally:
+                if name == "mysql":
+                    conn = backend.connect()
+                    try:
+                        conn.cursor().execute(f"DROP DATABASE IF EXISTS {args.mysql_database}")
+                    finally:
+                        conn.close()
+
+            results["backends"][name] = metrics
+            for operation, stats in metrics.items():
+                print(f"  {operation}: p50 {stats['p50_ms']:.3f} ms, p95 {stats['p95_ms']:.3f} ms")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}")
+
+if __name__ == "__main__":
+    main()
+
+
+#!Python run script
+#both backends (MySQL needs DB_PASSWORD in .env; scratch database dropped afterwards)
+#python benchmark_metadata_backends.py --output bench_results/metadata_backends_v1.json
+#SQLite only, e.g. on a field laptop
+#python benchmark_metadata_backends.py --backends sqlite
@@ -0,0 +1,110 @@
+import argparse
+import io
+import json
+import os
+import platform
+import shutil
+import tempfile
+import time
+from encryption import KEY_BLOCK_SIZE, ImageEncryptor, KeyProvider
+from image_stores import FlatImageStore, PackedImageStore
+from storage import shred_stored_blob
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='Secure delete cost by image size: crypto-shredding vs multi-pass overwrite')
+    parser.add_argument('--sizes-kb', nargs='+', type=int, default=[64, 1024, 8192],
+                        help='Image sizes to test, in KiB')
+    parser.add_argument('--files', type=int, default=200,
+                        help='Encrypted files deleted per size and mode')
+    parser.add_argument('--passes', type=int, default=3,
+                        help='Overwrite passes for the overwrite mode')
+    parser.add_argument('--store', type=str, default='flat', choices=['flat', 'packed'],
+                        help='Image store layout to delete from')
+    parser.add_argument('--workdir', type=str, default=None,
+                        help='Directory for the scratch store (use the disk the real images live on)')
+    parser.add_argument('--output', type=str, default='secure_delete_benchmark.json',
+                        help='JSON file to write results to')
+    return parser.parse_args()
+
+def build_store(name, root):
+    return FlatImageStore(root) if name == "flat" else PackedImageStore(os.path.join(root, "pack"))
+
+def time_mode(args, mode, size_kb, root):
+    """
+    Delete freshly written files in one mode
+
+    Returns:
+        dict: Inline delete time, background reclaim time and bytes written by the delete
+    """
+    provider = KeyProvider(os.path.join(root, "bench_key.bin"), env_var=None, lock_memory=False)
+    encryptor = ImageEncryptor(key_provider=provider)
+    store = build_store(args.store, root)
+
+    payload = os.urandom(size_kb * 1024)
+    names = [f"{i}.enc" for i in range(args.files)]
+    for blob_name in names:
+        with store.open_write(blob_name) as dst:
+            encryptor.encrypt_stream(io.BytesIO(payload), dst)
+    with store.open_read(names[0]) as src:
+        file_size = src.seek(0, os.SEEK_END)
+
+    start = time.perf_counter()
+    for blob_name in names:
+        if mode == "shred":
+            ok = shred_stored_blob(store, blob_name, args.passes, encryptor)
+        else:
+            ok = store.delete(blob_name, args.passes)
+        if not ok:
+            raise RuntimeError(f"Failed to delete {blob_name}")
+    delete_seconds = time.perf_counter() - start
+
+    # The part the image reaper does later, off the cleanup path
+    start = time.perf_counter()
+    store.reclaim()
+    reclaim_seconds = time.perf_counter() - start
+
+    return {
+        "delete_ms_per_file": delete_seconds * 1000 / args.files,
+        "reclaim_ms_per_file": reclaim_seconds * 1000 / args.files,
+        "bytes_written_per_file": KEY_BLOCK_SIZE if mode == "shred" else file_size * args.passes,
+    }
+
+def main():
+    args = parse_arguments()
+    results = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "parameters": {"files": args.files, "passes": args.passes, "store": args.store},
+        "sizes": [],
+    }
+
+    workdir = tempfile.mkdtemp(prefix="secure_delete_bench_", dir=args.workdir)
+    try:
+        for size_kb in args.sizes_kb:
+            print(f"Benchmarking {args.files} files of {size_kb} KiB...")
+            result = {"size_kb": size_kb}
+            for mode in ("overwrite", "shred"):
+                root = os.path.join(workdir, f"{size_kb}kb_{mode}")
+                os.makedirs(root)
+                result[mode] = time_mode(args, mode, size_kb, root)
+                print(f"  {mode}: {result[mode]['delete_ms_per_file']:.3f} ms/file inline, "
+                      f"{result[mode]['reclaim_ms_per_file']:.3f} ms/file reclaimed later")
+                shutil.rmtree(root, ignore_errors=True)
+            results["sizes"].append(result)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}")
+
+if __name__ == "__main__":
+    main()
+
+
+#!Python run script
+#shredding should stay flat across sizes while overwrite time grows with them
+#python benchmark_secure_delete.py --workdir data --output bench_results/secure_delete_v1.json
+#packed store
+#python benchmark_secure_delete.py --store packed --sizes-kb 64 1024
@@ -0,0 +1,246 @@
+import argparse
+import json
+import logging
+import os
+import platform
+import shutil
+import tempfile
+import time
+import faiss
+import numpy as np
+import psutil
+from config import EMBEDDING_DIM, SIMILARITY_THRESHOLD
+from vector_store import VectorStore
+
+# Index configurations compared at every gallery size. IVF variants are trained
+# on a sample of the gallery before vectors are added.
+INDEX_CONFIGURATIONS = {
+    "flat": "IDMap,Flat",
+    "hnsw32": "IDMap,HNSW32",
+    "ivf_flat": "IDMap,IVF{nlist},Flat",
+    "ivf_pq": "IDMap,IVF{nlist},PQ64",
+}
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='Synthetic-scale benchmark for VectorStore')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000],
+                        help='Gallery sizes to benchmark')
+    parser.add_argument('--configs', nargs='+', default=list(INDEX_CONFIGURATIONS),
+                        choices=list(INDEX_CONFIGURATIONS),
+                        help='Index configurations to benchmark')
+    parser.add_argument('--queries', type=int, default=1000,
+                        help='Number of query embeddings per run')
+    parser.add_argument('--batch-size', type=int, default=100,
+                        help='Queries per batch for batch latency')
+    parser.add_argument('--top-k', type=int, default=5,
+                        help='Neighbours retrieved per query')
+    parser.add_argument('--clusters', type=int, default=1000,
+                        help='Number of identity clusters in the synthetic gallery')
+    parser.add_argument('--seed', type=int, default=42,
+                        help='Random seed for reproducible runs')
+    parser.add_argument('--output', type=str, default='vector_store_benchmark.json',
+                        help='JSON file to write results to')
+    return parser.parse_args()
+
+def normalize(vectors):
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+def generate_gallery(n, n_clusters, rng, dim=EMBEDDING_DIM, spread=0.35, chunk=100000):
+    """
+    Generate clustered, L2-normalised embeddings that mimic several photos per identity
+
+    Args:
+        n (int): Number of embeddings
+        n_clusters (int): Number of identity centres
+        rng (numpy.random.Generator): Random generator
+        dim (int): Embedding dimension
+        spread (float): Within-cluster noise relative to the unit-norm centre
+        chunk (int): Rows generated at a time to bound temporary memory
+
+    Returns:
+        numpy.ndarray: Embeddings of shape (n, dim), float32
+    """
+    centres = normalize(rng.standard_normal((n_clusters, dim)).astype(np.float32))
+    gallery = np.empty((n, dim), dtype=np.float32)
+    for start in range(0, n, chunk):
+        stop = min(start + chunk, n)
+        labels = rng.integers(0, n_clusters, stop - start)
+        noise = rng.standard_normal((stop - start, dim)).astype(np.float32) * (spread / np.sqrt(dim))
+        gallery[start:stop] = normalize(centres[labels] + noise)
+    return gallery
+
+def generate_queries(gallery, n_queries, rng, spread=0.2):
+    """
+    Perturb random gallery members so each query has a known near neighbour
+    """
+    picks = rng.integers(0, len(gallery), n_queries)
+    noise = rng.standard_normal((n_queries, gallery.shape[1])).astype(np.float32)
+    noise *= spread / np.sqrt(gallery.shape[1])
+    return normalize(gallery[picks] + noise)
+
+def ground_truth(gallery, queries, top_k):
+    """
+    Exact top-k neighbours computed with a brute-force index
+    """
+    exact = faiss.IndexFlatL2(gallery.shape[1])
+    exact.add(gallery)
+    _, neighbours = exact.search(queries, top_k)
+    return neighbours
+
+def percentiles(samples_ms):
+    samples_ms = np.asarray(samples_ms)
+    return {
+        "p50_ms": float(np.percentile(samples_ms, 50)),
+        "p95_ms": float(np.percentile(samples_ms, 95)),
+        "p99_ms": float(np.percentile(samples_ms, 99)),
+        "mean_ms": float(samples_ms.mean()),
+    }
+
+def rss_mb():
+    return psutil.Process().memory_info().rss / (1024 * 1024)
+
+def benchmark_configuration(name, description, gallery, queries, truth, args, workdir):
+    """
+    Measure one index configuration against one gallery
+
+    Returns:
+        dict: Metrics for this configuration
+    """
+    n = len(gallery)
+    nlist = max(1, min(4096, int(4 * np.sqrt(n))))
+    description = description.format(nlist=nlist)
+    index_path = os.path.join(workdir, f"{name}_{n}.bin")
+    tombstone_path = os.path.join(workdir, f"{name}_{n}_tombstones.bin")
+    ids = np.arange(n, dtype=np.int64)
+
+    rss_before = rss_mb()
+    store = VectorStore(EMBEDDING_DIM, index_path, tombstone_path, description)
+
+    # Training (IVF/PQ only)
+    train_seconds = 0.0
+    if not store.index.is_trained:
+        sample = gallery[:min(n, max(nlist * 40, 10000))]
+        start = time.perf_counter()
+        store.index.train(sample)
+        train_seconds = time.perf_counter() - start
+
+    # Add throughput, one persist at the end like a bulk import
+    start = time.perf_counter()
+    for batch_start in range(0, n, 10000):
+        store.add_embeddings(gallery[batch_start:batch_start + 10000],
+                             ids[batch_start:batch_start + 10000], save=False)
+    add_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    store.save_index()
+    save_seconds = time.perf_counter() - start
+    rss_after_add = rss_mb()
+    file_size = os.path.getsize(index_path)
+
+    del store
+    start = time.perf_counter()
+    store = VectorStore(EMBEDDING_DIM, index_path, tombstone_path, description)
+    load_seconds = time.perf_counter() - start
+
+    # IVF variants probe a fixed number of lists so latency and recall are comparable
+    base_index = faiss.downcast_index(store.index.index)
+    if hasattr(base_index, 'nprobe'):
+        base_index.nprobe = min(nlist, 16)
+
+    # Single-query latency through the public search path
+    single_ms = []
+    for query in queries:
+        start = time.perf_counter()
+        store.search_embeddings(query, args.top_k, SIMILARITY_THRESHOLD)
+        single_ms.append((time.perf_counter() - start) * 1000)
+
+    # Batch latency, reported per batch
+    batch_ms = []
+    for batch_start in range(0, len(queries), args.batch_size):
+        batch = queries[batch_start:batch_start + args.batch_size]
+        start = time.perf_counter()
+        store.search_embeddings_batch(batch, args.top_k, SIMILARITY_THRESHOLD)
+        batch_ms.append((time.perf_counter() - start) * 1000)
+
+    # Recall of raw neighbours against brute-force ground truth
+    _, found = store.index.search(queries, args.top_k)
+    hits = sum(len(set(f) & set(t)) for f, t in zip(found, truth))
+    recall = hits / truth.size
+
+    return {
+        "index_description": description,
+        "train_seconds": train_seconds,
+        "add_seconds": add_seconds,
+        "add_throughput_per_second": n / add_seconds if add_seconds else None,
+        "save_seconds": save_seconds,
+        "load_seconds": load_seconds,
+        "file_size_bytes": file_size,
+        "rss_mb_before": rss_before,
+        "rss_mb_after_add": rss_after_add,
+        "single_query": percentiles(single_ms),
+        "batch_query": dict(percentiles(batch_ms), batch_size=args.batch_size),
+        f"recall_at_{args.top_k}": recall,
+    }
+
+def main():
+    args = parse_arguments()
+
+    # Search logging is per result and would dominate the timings
+    logging.basicConfig(level=logging.WARNING)
+    logging.getLogger('vector_store').setLevel(logging.WARNING)
+
+    rng = np.random.default_rng(args.seed)
+    results = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "faiss": faiss.__version__,
+        "numpy": np.__version__,
+        "parameters": {
+            "queries": args.queries,
+            "batch_size": args.batch_size,
+            "top_k": args.top_k,
+            "clusters": args.clusters,
+            "seed": args.seed,
+        },
+        "runs": {},
+    }
+
+    workdir = tempfile.mkdtemp(prefix="vector_store_bench_")
+    try:
+        for n in args.sizes:
+            print(f"Generating {n} synthetic embeddings...")
+            gallery = generate_gallery(n, args.clusters, rng)
+            queries = generate_queries(gallery, args.queries, rng)
+            truth = ground_truth(gallery, queries, args.top_k)
+
+            results["runs"][str(n)] = {}
+            for name in args.configs:
+                print(f"  {name}...")
+                metrics = benchmark_configuration(
+                    name, INDEX_CONFIGURATIONS[name], gallery, queries, truth, args, workdir
+                )
+                results["runs"][str(n)][name] = metrics
+                print(f"    add {metrics['add_throughput_per_second']:.0f}/s, "
+                      f"p50 {metrics['single_query']['p50_ms']:.2f} ms, "
+                      f"recall {metrics[f'recall_at_{args.top_k}']:.3f}")
+
+                # Keep disk usage to one index at a time
+                for filename in os.listdir(workdir):
+                    os.remove(os.path.join(workdir, filename))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}")
+
+if __name__ == "__main__":
+    main()
+
+
+#!Python run script
+#full run (10k/100k/1M, all index configurations)
+#python benchmark_vector_store.py --output bench_results/vector_store_v1.json
+#quick run
+#python benchmark_vector_store.py --sizes 10000 --configs flat hnsw32 --queries 200
@@ -0,0 +1,131 @@
+import atexit
+import logging
+import threading
+from config import ARCHIVE_BATCH_SIZE, ARCHIVE_INTERVAL
+from database import archive_inactive_cases, restore_reopened_cases, count_cases_by_table
+
+def _move_all(move, batch_size, stopped=None):
+    """
+    Repeat a batched move until a batch comes back short
+
+    Returns:
+        tuple: (cases moved, whether a batch failed)
+    """
+    moved = 0
+    while stopped is None or not stopped.is_set():
+        count = move(batch_size)
+        if count is False:
+            return moved, True
+        moved += count
+        if count < batch_size:
+            break
+    return moved, False
+
+class CaseArchiver:
+    def __init__(self, batch_size=ARCHIVE_BATCH_SIZE, interval=ARCHIVE_INTERVAL):
+        """
+        Background mover that keeps Children_Metadata down to open cases
+
+        Every interval seconds, resolved and closed cases are moved to the
+        archive table in batches of batch_size, one transaction per batch, and
+        archived cases that were reopened are moved back. Open-case queries
+        then only touch the rows they can return.
+
+        Args:
+            batch_size (int): Cases moved per transaction
+            interval (float): Seconds between passes
+        """
+        self.batch_size = batch_size
+        self.interval = interval
+
+        self.wakeup = threading.Event()
+        self.stopped = threading.Event()
+        self.pass_lock = threading.Lock()
+        self.stats_lock = threading.Lock()
+
+        self.stats = {"archived": 0, "restored": 0, "passes": 0, "failed_batches": 0}
+
+        self.wakeup.set()
+        self.thread = threading.Thread(target=self._run, name="case-archiver", daemon=True)
+        self.thread.start()
+        atexit.register(self.close)
+
+    def run_once(self):
+        """
+        Archive every inactive case and restore every reopened one
+
+        Returns:
+            dict: Cases archived and restored by this pass
+        """
+        with self.pass_lock:
+            archived, archive_failed = _move_all(archive_inactive_cases, self.batch_size, self.stopped)
+            restored, restore_failed = _move_all(restore_reopened_cases, self.batch_size, self.stopped)
+        with self.stats_lock:
+            self.stats["archived"] += archived
+            self.stats["restored"] += restored
+            self.stats["passes"] += 1
+            self.stats["failed_batches"] += archive_failed + restore_failed
+        if archived or restored:
+            logging.info(f"Case archive pass: {archived} archived, {restored} restored")
+        return {"archived": archived, "restored": restored}
+
+    def _run(self):
+        while not self.stopped.is_set():
+            self.wakeup.wait(self.interval)
+            self.wakeup.clear()
+            if self.stopped.is_set():
+                break
+            try:
+                self.run_once()
+            except Exception as e:
+                logging.error(f"Case archiver error: {e}")
+
+    def close(self):
+        """
+        Stop the mover thread (a pass in progress finishes its current batch)
+        """
+        if self.stopped.is_set():
+            return
+        self.stopped.set()
+        self.wakeup.set()
+        self.thread.join(timeout=5)
+
+    def get_stats(self):
+        """
+        Report mover activity
+
+        Returns:
+            dict: Moved counts plus current case counts per table
+        """
+        with self.stats_lock:
+            stats = dict(self.stats)
+        stats["cases"] = count_cases_by_table()
+        return stats
+
+_archiver = None
+_archiver_lock = threading.Lock()
+
+def get_case_archiver():
+    """
+    Get the process-wide case archiver, starting its thread on first use
+
+    Returns:
+        CaseArchiver: Shared archiver
+    """
+    global _archiver
+    with _archiver_lock:
+        if _archiver is None:
+            _archiver = CaseArchiver()
+        return _archiver
+
+# Utility functions
+def archive_cases(batch_size=ARCHIVE_BATCH_SIZE):
+    """
+    Convenience function to run one archive pass in the calling thread
+
+    Returns:
+        dict: Cases archived and restored
+    """
+    archived, _ = _move_all(archive_inactive_cases, batch_size)
+    restored, _ = _move_all(restore_reopened_cases, batch_size)
+    return {"archived": archived, "restored": restored}
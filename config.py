@@ -12,12 +12,85 @@ MYSQL_CONFIG = {
     "database": "child_safety"
 }
 
+# Metadata store: "mysql" (server above) or "sqlite" (single file, no server needed)
+METADATA_BACKEND = os.getenv("METADATA_BACKEND", "mysql").lower()
+
+# Connection pool (shared by every function in database.py)
+MYSQL_POOL_SIZE = int(os.getenv("MYSQL_POOL_SIZE", "5"))
+MYSQL_POOL_TIMEOUT = 10  # Seconds to wait for a free pooled connection
+MYSQL_POOL_PING_INTERVAL = 30  # Idle seconds after which a pooled connection is pinged before reuse
+MYSQL_RECONNECT_ATTEMPTS = 3  # Reconnect attempts for a connection that fails its health check
+
+# In-process cache of Children_Metadata rows read by embedding ID
+METADATA_CACHE_SIZE = 2048  # Cached rows per process (0 disables the cache)
+METADATA_CACHE_TTL = 60  # Seconds before a cached row is re-read (bounds staleness from other processes)
+
+# Cleanup of old closed cases
+CLEANUP_BATCH_SIZE = 500  # Cases selected, wiped and deleted per batch
+CLEANUP_WORKERS = 4  # Threads deleting encrypted images in parallel
+# "shred" destroys each file's data key in place (a few dozen bytes) and unlinks the
+# ciphertext later in the background; "overwrite" rewrites whole files SECURE_DELETE_PASSES times
+SECURE_DELETE_MODE = os.getenv("SECURE_DELETE_MODE", "shred").lower()
+SECURE_DELETE_PASSES = 3  # Random overwrite passes before an image is unlinked (overwrite mode and older-format files)
+SECURE_DELETE_CHUNK_SIZE = 1024 * 1024  # Bytes of random data written at a time
+RECLAIM_INTERVAL = 300.0  # Seconds between background passes freeing the space of shredded images
+PACK_RECLAIM_FRACTION = 0.25  # Compact the image pack once this share of it is dead bytes
+
+# Bulk import (main.py import manifest.csv images/)
+IMPORT_BATCH_SIZE = 64  # Manifest rows detected, embedded and persisted together
+IMPORT_WORKERS = 4  # Threads decoding and encrypting images
+
+# Sightings (identification match history)
+SIGHTINGS_FLUSH_ROWS = 100  # Buffered sightings that trigger a flush
+SIGHTINGS_FLUSH_INTERVAL = 2.0  # Maximum seconds a sighting waits in the buffer
+SIGHTINGS_MAX_BUFFER = 10000  # Oldest sightings are dropped beyond this while the database is unreachable
+SIGHTINGS_STORE_EMBEDDINGS = False  # Keep the query embedding with each sighting
+
+# Schema migrations (migrations.py)
+MIGRATION_CHUNK_SIZE = 1000  # Rows copied per transaction while a table is rebuilt online
+MIGRATION_LOCK_TIMEOUT = 60  # Seconds to wait for another process's migration to finish (MySQL)
+
+# Index outbox (FAISS mutations recorded with case status changes, applied in the background)
+OUTBOX_BATCH_SIZE = 500  # Outbox rows applied per batch
+OUTBOX_POLL_INTERVAL = 5.0  # Seconds between checks for rows written by other processes
+
+# Case archive (resolved and closed cases moved out of Children_Metadata)
+ARCHIVE_BATCH_SIZE = 500  # Cases moved per transaction
+ARCHIVE_INTERVAL = 60.0  # Seconds between background archive passes
+
+# Reconciliation (FAISS/metadata drift repair)
+RECONCILE_GRACE_SECONDS = 30.0  # Age of the index snapshot before vectors without metadata are re-checked and removed
+
 # Paths Configuration
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+SQLITE_DB_PATH = os.path.join(BASE_DIR, "data", "child_safety.db")
 FAISS_INDEX_PATH = os.path.join(BASE_DIR, "data", "embeddings", "faiss_index.bin")
+FAISS_TOMBSTONE_PATH = os.path.join(BASE_DIR, "data", "embeddings", "faiss_tombstones.bin")
 IMAGE_STORAGE_PATH = os.path.join(BASE_DIR, "data", "images")
+IMAGE_PACK_DIR = os.path.join(IMAGE_STORAGE_PATH, "pack")  # Pack file and offset index of the packed image store
 YOLO_FACE_MODEL_PATH = os.path.join(BASE_DIR, "models", "yolov8s-widerface.pt")
 
+# Encrypted image layout: "flat" (one directory), "sharded" (hash subdirectories) or "packed" (one pack file)
+IMAGE_STORE_BACKEND = os.getenv("IMAGE_STORE_BACKEND", "flat").lower()
+IMAGE_SHARD_DEPTH = 2  # Levels of 256 subdirectories in the sharded layout
+
+# Image encryption key: IMAGE_ENCRYPTION_KEY (64 hex chars or base64 of 32 bytes) takes
+# precedence over the key file, which is generated on first use if missing
+ENCRYPTION_KEY_PATH = os.getenv("ENCRYPTION_KEY_PATH", os.path.join(BASE_DIR, "encryption_key.bin"))
+ENCRYPTION_KEY_ENV = "IMAGE_ENCRYPTION_KEY"
+ENCRYPTION_KEY_MLOCK = os.getenv("ENCRYPTION_KEY_MLOCK", "0") == "1"  # Keep the cached key out of swap
+ENCRYPTION_KEY_CHECK_INTERVAL = 5  # Seconds between checks of the key file for a rotation by another process
+ENCRYPTION_CHUNK_SIZE = 1024 * 1024  # Plaintext bytes per authenticated chunk in encrypted files
+
+# Master key rotation (python main.py rotate-key): each file's data key is rewrapped in place
+ROTATION_WORKERS = 8  # Threads rewrapping key blocks in parallel
+ROTATION_BATCH_SIZE = 256  # Files journaled and rewrapped together
+ROTATION_MAX_PASSES = 3  # Sweeps over the store to catch files written during the rotation
+
+# Encrypted thumbnails stored next to each image (data/images/<id>.thumb<size>.enc)
+THUMBNAIL_SIZES = (200, 300)  # Longest side in pixels; the GUI shows matches at 200 and previews at 300
+THUMBNAIL_QUALITY = 85  # JPEG quality of the thumbnails
+
 # Ensure directories exist
 os.makedirs(os.path.dirname(FAISS_INDEX_PATH), exist_ok=True)
 os.makedirs(IMAGE_STORAGE_PATH, exist_ok=True)
@@ -25,4 +98,14 @@ os.makedirs(IMAGE_STORAGE_PATH, exist_ok=True)
 # Additional configuration parameters
 EMBEDDING_DIM = 512  # Dimension of facial embeddings
 SIMILARITY_THRESHOLD = 0.6  # Default similarity threshold for face matching
-MAX_MATCHES = 5  # Maximum number of matches to return
\ No newline at end of file
+MAX_MATCHES = 5  # Maximum number of matches to return
+CASE_PAGE_SIZE = 100  # Open cases fetched per page in the Manage Cases list
+FAISS_INDEX_DESCRIPTION = "IDMap,Flat"  # faiss.index_factory string for new indexes (exact L2 search)
+TOMBSTONE_COMPACTION_FRACTION = 0.2  # Purge closed embeddings once this share of the index is tombstoned
+QUERY_CACHE_SIZE = 1024  # Cached search results per process (0 disables the cache)
+QUERY_CACHE_QUANT_STEP = 0.02  # Embedding components are rounded to this step to build the cache key
+
+# Recognition server (keeps models and the gallery loaded for CLI clients)
+SERVER_HOST = os.getenv("RECOGNITION_SERVER_HOST", "127.0.0.1")
+SERVER_PORT = int(os.getenv("RECOGNITION_SERVER_PORT", "8765"))
+SERVER_TIMEOUT = 300  # Seconds a CLI client waits for a response (video can be slow)
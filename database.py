@@ -1,58 +1,201 @@
-import mysql.connector
-from config import MYSQL_CONFIG
 import logging
-import os
-from config import FAISS_INDEX_PATH, IMAGE_STORAGE_PATH
-import faiss
-import numpy as np
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from config import (
+    IMAGE_STORAGE_PATH,
+    METADATA_CACHE_SIZE,
+    METADATA_CACHE_TTL,
+    CASE_PAGE_SIZE,
+    CLEANUP_BATCH_SIZE,
+    CLEANUP_WORKERS,
+    SECURE_DELETE_MODE,
+    ARCHIVE_BATCH_SIZE
+)
+from storage import delete_stored_image
+from metadata_backends import DatabaseError, ARCHIVE_TABLE, METADATA_COLUMNS, get_backend
+from migrations import migrate_schema
+
+def get_pool():
+    """
+    Get the MySQL connection pool of the active backend
+
+    Returns:
+        ConnectionPool or None: Shared pool, or None when the backend is not MySQL
+    """
+    return getattr(get_backend(), "pool", None)
+
+def get_pool_stats():
+    """
+    Convenience function to report connection statistics of the active backend
+
+    Returns:
+        dict: Pool (or backend) statistics
+    """
+    return get_backend().stats()
 
 def create_connection():
     """
-    Create a database connection with improved error handling
+    Get a database connection from the configured backend with improved error handling
 
     Returns:
-        mysql.connector.connection: Database connection
+        Connection: Database connection (close() returns it to the pool), or None on failure
     """
     try:
-        return mysql.connector.connect(
-            host=MYSQL_CONFIG["host"],
-            user=MYSQL_CONFIG["user"],
-            password=MYSQL_CONFIG["password"],
-            database=MYSQL_CONFIG["database"]
-        )
-    except mysql.connector.Error as e:
+        return get_backend().connect()
+    except DatabaseError as e:
         logging.error(f"Database Connection Error: {e}")
         return None
 
+class MetadataCache:
+    def __init__(self, max_entries=METADATA_CACHE_SIZE, ttl=METADATA_CACHE_TTL):
+        """
+        Bounded in-process LRU cache of Children_Metadata rows keyed by embedding ID
+
+        Writes made through this module invalidate the affected IDs immediately;
+        the TTL bounds staleness for writes made by other processes.
+
+        Args:
+            max_entries (int): Maximum cached rows (0 disables caching)
+            ttl (float): Seconds a cached row stays valid
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.query_seconds = 0.0
+        self.queried_rows = 0
+
+    def get(self, embedding_id):
+        """
+        Look up a cached row
+
+        Returns:
+            dict or None: Copy of the cached row, or None on a miss
+        """
+        with self.lock:
+            entry = self.entries.get(embedding_id)
+            if entry is None:
+                self.misses += 1
+                return None
+            stored_at, row = entry
+            if time.monotonic() - stored_at > self.ttl:
+                del self.entries[embedding_id]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self.entries.move_to_end(embedding_id)
+            self.hits += 1
+            return dict(row)
+
+    def put(self, embedding_id, row):
+        if self.max_entries <= 0:
+            return
+        with self.lock:
+            self.entries[embedding_id] = (time.monotonic(), dict(row))
+            self.entries.move_to_end(embedding_id)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def record_query(self, seconds, rows):
+        """
+        Record the cost of a database read so time saved by hits can be estimated
+        """
+        with self.lock:
+            self.query_seconds += seconds
+            self.queried_rows += max(rows, 1)
+
+    def invalidate(self, embedding_ids):
+        with self.lock:
+            for embedding_id in embedding_ids:
+                if self.entries.pop(int(embedding_id), None) is not None:
+                    self.invalidations += 1
+
+    def clear(self):
+        with self.lock:
+            self.invalidations += len(self.entries)
+            self.entries.clear()
+
+    def stats(self):
+        """
+        Report cache effectiveness
+
+        Returns:
+            dict: Hit/miss counts, hit rate and estimated query time saved
+        """
+        with self.lock:
+            lookups = self.hits + self.misses
+            seconds_per_row = self.query_seconds / self.queried_rows if self.queried_rows else 0.0
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "entries": len(self.entries),
+                "avg_query_ms_per_row": seconds_per_row * 1000,
+                "query_seconds_saved": seconds_per_row * self.hits,
+            }
+
+_metadata_cache = MetadataCache()
+
+def get_metadata_cache_stats():
+    """
+    Convenience function to report metadata cache statistics
+
+    Returns:
+        dict: Cache statistics
+    """
+    return _metadata_cache.stats()
+
+def invalidate_metadata_cache(embedding_ids=None):
+    """
+    Drop cached rows for the given embedding IDs, or everything when none are given
+    """
+    if embedding_ids is None:
+        _metadata_cache.clear()
+    else:
+        _metadata_cache.invalidate(embedding_ids)
+
 def create_database():
     """
     Create the child_safety database if it doesn't exist
     """
+    return get_backend().create_database()
+
+def create_metadata_table():
+    """
+    Create Children_Metadata table with comprehensive constraints
+    """
+    conn = create_connection()
+    if not conn:
+        return False
+
     try:
-        # Connect without specifying a database
-        conn = mysql.connector.connect(
-            host=MYSQL_CONFIG["host"],
-            user=MYSQL_CONFIG["user"],
-            password=MYSQL_CONFIG["password"]
-        )
         cursor = conn.cursor()
-        
-        # Create database if not exists
-        cursor.execute(f"CREATE DATABASE IF NOT EXISTS {MYSQL_CONFIG['database']}")
+        get_backend().create_schema(cursor)
+        # Status changes write their index mutations here in the same transaction
+        get_backend().create_outbox_schema(cursor)
+        get_backend().create_archive_schema(cursor)
         conn.commit()
-        
-        logging.info(f"Database {MYSQL_CONFIG['database']} created or already exists")
-        
-        cursor.close()
-        conn.close()
-        return True
-    except mysql.connector.Error as e:
-        logging.error(f"Database Creation Error: {e}")
+        logging.info("Children_Metadata table created successfully")
+    except DatabaseError as e:
+        logging.error(f"Table Creation Error: {e}")
         return False
+    finally:
+        conn.close()
 
-def create_metadata_table():
+    # Bring tables created by earlier versions up to the current layout
+    return migrate_schema() is not False
+
+def create_sightings_table():
     """
-    Create Children_Metadata table with comprehensive constraints
+    Create the Sightings table that records identification matches
     """
     conn = create_connection()
     if not conn:
@@ -60,34 +203,33 @@ def create_metadata_table():
 
     try:
         cursor = conn.cursor()
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS Children_Metadata (
-                child_id INT AUTO_INCREMENT PRIMARY KEY,
-                name VARCHAR(255) NOT NULL,
-                age INT CHECK (age > 0 AND age < 18),
-                gender ENUM('Male', 'Female', 'Other') NOT NULL,
-                guardian_contact VARCHAR(20) NOT NULL,
-                embedding_id VARCHAR(255) UNIQUE,
-                image_url VARCHAR(255) UNIQUE,
-                case_status ENUM('Open', 'Resolved', 'Closed') DEFAULT 'Open',
-                distinguishing_features TEXT,
-                last_known_location VARCHAR(255),
-                registration_timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
-                
-                INDEX idx_embedding_id (embedding_id),
-                INDEX idx_case_status (case_status)
-            )
-        ''')
+        get_backend().create_sightings_schema(cursor)
         conn.commit()
-        logging.info("Children_Metadata table created successfully")
         return True
-    except mysql.connector.Error as e:
-        logging.error(f"Table Creation Error: {e}")
+    except DatabaseError as e:
+        logging.error(f"Sightings Table Creation Error: {e}")
         return False
     finally:
         conn.close()
 
+def normalize_name(name):
+    """
+    Normalise a name the same way as the name_normalized column
+    
+    Args:
+        name (str): Name as typed
+    
+    Returns:
+        str: Lower-cased name without surrounding spaces
+    """
+    return (name or "").strip(" ").lower()
+
+def _name_prefix_pattern(term):
+    # Escape LIKE wildcards so user input is matched literally; '!' is used as
+    # the escape character because MySQL and SQLite read backslashes differently
+    escaped = normalize_name(term).replace("!", "!!").replace("%", "!%").replace("_", "!_")
+    return escaped + "%"
+
 def insert_child_metadata(
     name, 
     age, 
@@ -106,7 +248,7 @@ def insert_child_metadata(
         age (int): Child's age
         gender (str): Child's gender
         guardian_contact (str): Guardian's contact information
-        embedding_id (str): Unique embedding identifier
+        embedding_id (int): Unique embedding identifier
         image_url (str): Path to encrypted image
         distinguishing_features (str, optional): Unique identifying features
         last_known_location (str, optional): Last known location
@@ -131,34 +273,94 @@ def insert_child_metadata(
             age, 
             gender, 
             guardian_contact, 
-            str(embedding_id), 
+            int(embedding_id), 
             image_url,
             distinguishing_features,
             last_known_location
         ))
         conn.commit()
+        _metadata_cache.invalidate([embedding_id])
         
         # Return the ID of the inserted record
         inserted_id = cursor.lastrowid
         logging.info(f"Child metadata inserted successfully. ID: {inserted_id}")
         return inserted_id
-    except mysql.connector.Error as e:
+    except DatabaseError as e:
         logging.error(f"Metadata Insertion Error: {e}")
         conn.rollback()
         return False
     finally:
         conn.close()
 
-def get_child_by_embedding_id(embedding_id):
+def insert_children_metadata(children):
+    """
+    Insert many children with one executemany and a single commit
+    
+    Args:
+        children (list): Dicts with the insert_child_metadata arguments as keys
+            (distinguishing_features and last_known_location may be omitted)
+    
+    Returns:
+        int or False: Number of rows inserted, or False if the batch was rolled back
+    """
+    if not children:
+        return 0
+
+    conn = create_connection()
+    if not conn:
+        return False
+
+    try:
+        cursor = conn.cursor()
+        query = """
+        INSERT INTO Children_Metadata 
+        (name, age, gender, guardian_contact, embedding_id, image_url, 
+         distinguishing_features, last_known_location) 
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+        """
+        cursor.executemany(query, [
+            (
+                child['name'],
+                child['age'],
+                child['gender'],
+                child['guardian_contact'],
+                int(child['embedding_id']),
+                child['image_url'],
+                child.get('distinguishing_features'),
+                child.get('last_known_location')
+            )
+            for child in children
+        ])
+        conn.commit()
+        _metadata_cache.invalidate(child['embedding_id'] for child in children)
+        
+        logging.info(f"Inserted metadata for {len(children)} children")
+        return len(children)
+    except DatabaseError as e:
+        logging.error(f"Bulk Metadata Insertion Error: {e}")
+        conn.rollback()
+        return False
+    finally:
+        conn.close()
+
+def get_child_by_embedding_id(embedding_id, include_history=True):
     """
     Retrieve child metadata by embedding_id
     
+    Resolved cases stay searchable in FAISS after they are archived, so
+    lookups of search results fall back to the archive by default.
+    
     Args:
         embedding_id (int/str): Embedding ID to search
+        include_history (bool): Also look in the archive of resolved and closed cases
     
     Returns:
         dict: Child metadata or None
     """
+    cached = _metadata_cache.get(int(embedding_id))
+    if cached is not None:
+        return cached
+
     conn = create_connection()
     if not conn:
         logging.error("Database connection failed")
@@ -167,19 +369,95 @@ def get_child_by_embedding_id(embedding_id):
     try:
         cursor = conn.cursor(dictionary=True)
         query = "SELECT * FROM Children_Metadata WHERE embedding_id = %s"
-        cursor.execute(query, (str(embedding_id),))
+        start = time.perf_counter()
+        cursor.execute(query, (int(embedding_id),))
         result = cursor.fetchone()
+        _metadata_cache.record_query(time.perf_counter() - start, 1)
+        
+        if result:
+            _metadata_cache.put(int(embedding_id), result)
+        elif include_history:
+            # Archived rows are read rarely and are not cached
+            cursor.execute(f"SELECT * FROM {ARCHIVE_TABLE} WHERE embedding_id = %s", (int(embedding_id),))
+            result = cursor.fetchone()
         
         if not result:
             logging.warning(f"No child found with Embedding ID: {embedding_id}")
         
         return result
-    except mysql.connector.Error as e:
+    except DatabaseError as e:
         logging.error(f"Metadata Retrieval Error: {e}")
         return None
     finally:
         conn.close()
 
+def get_children_by_embedding_ids(embedding_ids, chunk_size=500, include_history=True):
+    """
+    Retrieve child metadata for many embedding IDs in as few round-trips as possible
+    
+    IDs missing from Children_Metadata are looked up in the archive by
+    default, so matches on archived resolved cases keep their details.
+    
+    Args:
+        embedding_ids (iterable): Embedding IDs to look up
+        chunk_size (int): Maximum IDs per IN (...) query
+        include_history (bool): Also look in the archive of resolved and closed cases
+    
+    Returns:
+        dict: Child metadata keyed by integer embedding ID (missing IDs are absent)
+    """
+    unique_ids = list(dict.fromkeys(int(embedding_id) for embedding_id in embedding_ids))
+    if not unique_ids:
+        return {}
+
+    children = {}
+    for embedding_id in unique_ids:
+        cached = _metadata_cache.get(embedding_id)
+        if cached is not None:
+            children[embedding_id] = cached
+    uncached_ids = [embedding_id for embedding_id in unique_ids if embedding_id not in children]
+    if not uncached_ids:
+        return children
+
+    conn = create_connection()
+    if not conn:
+        logging.error("Database connection failed")
+        return children
+
+    try:
+        cursor = conn.cursor(dictionary=True)
+        for start in range(0, len(uncached_ids), chunk_size):
+            chunk = uncached_ids[start:start + chunk_size]
+            placeholders = ", ".join(["%s"] * len(chunk))
+            query = f"SELECT * FROM Children_Metadata WHERE embedding_id IN ({placeholders})"
+            query_start = time.perf_counter()
+            cursor.execute(query, chunk)
+            rows = cursor.fetchall()
+            _metadata_cache.record_query(time.perf_counter() - query_start, len(rows))
+            for row in rows:
+                children[int(row['embedding_id'])] = row
+                _metadata_cache.put(int(row['embedding_id']), row)
+        
+        if include_history:
+            archived_ids = [embedding_id for embedding_id in uncached_ids if embedding_id not in children]
+            for start in range(0, len(archived_ids), chunk_size):
+                chunk = archived_ids[start:start + chunk_size]
+                placeholders = ", ".join(["%s"] * len(chunk))
+                cursor.execute(f"SELECT * FROM {ARCHIVE_TABLE} WHERE embedding_id IN ({placeholders})", chunk)
+                for row in cursor.fetchall():
+                    children[int(row['embedding_id'])] = row
+        
+        missing = len(unique_ids) - len(children)
+        if missing:
+            logging.warning(f"No child found for {missing} of {len(unique_ids)} embedding IDs")
+        
+        return children
+    except DatabaseError as e:
+        logging.error(f"Metadata Retrieval Error: {e}")
+        return children
+    finally:
+        conn.close()
+
 def update_case_status(embedding_id, status='Closed'):
     """
     Update case status without immediate deletion
@@ -191,53 +469,232 @@ def update_case_status(embedding_id, status='Closed'):
     Returns:
         bool: True if update successful, False otherwise
     """
+    result = close_cases([embedding_id], status).get(int(embedding_id))
+    return result in ("updated", "unchanged")
+
+# Index mutation recorded in Index_Outbox when a case is closed
+OUTBOX_TOMBSTONE = "tombstone"
+
+def close_cases(embedding_ids, status='Closed', chunk_size=500):
+    """
+    Change the status of many cases in one transaction
+    
+    All rows are updated with chunked UPDATE ... IN statements, in
+    Children_Metadata or the archive, wherever each case currently is. When closing,
+    the FAISS tombstones the cases need are written to Index_Outbox in the
+    same transaction and applied by the background outbox applier, so the
+    caller only waits for the database commit.
+    
+    Args:
+        embedding_ids (iterable): Embedding IDs of the cases
+        status (str): New case status (default 'Closed')
+        chunk_size (int): Maximum IDs per IN (...) statement
+    
+    Returns:
+        dict: Result per integer embedding ID: "updated", "unchanged"
+            (already in that status), "not_found" or "error"
+    """
+    unique_ids = list(dict.fromkeys(int(embedding_id) for embedding_id in embedding_ids))
+    if not unique_ids:
+        return {}
+
     conn = create_connection()
     if not conn:
         logging.error("Database connection failed")
-        return False
+        return {embedding_id: "error" for embedding_id in unique_ids}
 
     try:
         cursor = conn.cursor()
         
-        # First, retrieve current child details
-        child_details = get_child_by_embedding_id(embedding_id)
+        # Current status of every requested case (on this connection and transaction)
+        current = {}
+        for table in ("Children_Metadata", ARCHIVE_TABLE):
+            remaining = [embedding_id for embedding_id in unique_ids if embedding_id not in current]
+            for start in range(0, len(remaining), chunk_size):
+                chunk = remaining[start:start + chunk_size]
+                placeholders = ", ".join(["%s"] * len(chunk))
+                cursor.execute(
+                    f"SELECT embedding_id, case_status FROM {table} WHERE embedding_id IN ({placeholders})",
+                    chunk
+                )
+                current.update((int(embedding_id), case_status) for embedding_id, case_status in cursor.fetchall())
         
-        if not child_details:
-            logging.error(f"No child found with embedding ID: {embedding_id}")
-            return False
+        results = {}
+        to_update = []
+        for embedding_id in unique_ids:
+            if embedding_id not in current:
+                logging.error(f"No child found with embedding ID: {embedding_id}")
+                results[embedding_id] = "not_found"
+            elif current[embedding_id] == status:
+                results[embedding_id] = "unchanged"
+            else:
+                results[embedding_id] = "updated"
+                to_update.append(embedding_id)
         
-        # Update case status (we're no longer deleting immediately)
-        query = "UPDATE Children_Metadata SET case_status = %s WHERE embedding_id = %s"
-        cursor.execute(query, (status, str(embedding_id)))
+        # Update case status (we're no longer deleting immediately). Both tables
+        # are updated so a case the archiver moves meanwhile is still changed.
+        for start in range(0, len(to_update), chunk_size):
+            chunk = to_update[start:start + chunk_size]
+            placeholders = ", ".join(["%s"] * len(chunk))
+            for table in ("Children_Metadata", ARCHIVE_TABLE):
+                cursor.execute(
+                    f"UPDATE {table} SET case_status = %s WHERE embedding_id IN ({placeholders})",
+                    [status] + chunk
+                )
+        
+        # If status is Closed, queue tombstones so searches skip the embeddings
+        # but keep the database records and image files. Already-closed cases
+        # are queued again in case an earlier closure's tombstone was lost;
+        # applying a tombstone twice is harmless.
+        tombstone_ids = [embedding_id for embedding_id in unique_ids if results[embedding_id] != "not_found"]
+        if status == 'Closed' and tombstone_ids:
+            cursor.executemany(
+                "INSERT INTO Index_Outbox (embedding_id, operation) VALUES (%s, %s)",
+                [(embedding_id, OUTBOX_TOMBSTONE) for embedding_id in tombstone_ids]
+            )
         conn.commit()
+        _metadata_cache.invalidate(to_update)
         
-        # If status is Closed, remove the embedding from FAISS index
-        # but keep the database record and image file
-        if status == 'Closed':
-            try:
-                index = faiss.read_index(FAISS_INDEX_PATH)
-                index.remove_ids(np.array([int(embedding_id)], dtype=np.int64))
-                faiss.write_index(index, FAISS_INDEX_PATH)
-                logging.info(f"Removed embedding {embedding_id} from FAISS index")
-            except Exception as e:
-                logging.error(f"Error removing embedding from FAISS: {e}")
+        if status == 'Closed' and tombstone_ids:
+            from index_outbox import notify_index_outbox
+            notify_index_outbox()
         
-        logging.info(f"Updated case status to {status} for embedding ID: {embedding_id}")
-        return True
+        logging.info(f"Updated case status to {status} for {len(to_update)} of {len(unique_ids)} embedding IDs")
+        return results
     
     except Exception as e:
         logging.error(f"Case Status Update Error: {e}")
         conn.rollback()
+        return {embedding_id: "error" for embedding_id in unique_ids}
+    finally:
+        conn.close()
+
+def fetch_index_outbox(limit=500):
+    """
+    Retrieve the oldest pending index mutations
+    
+    Args:
+        limit (int): Maximum rows to return
+    
+    Returns:
+        list or None: (outbox_id, embedding_id, operation) tuples in commit order,
+            or None if the outbox could not be read
+    """
+    conn = create_connection()
+    if not conn:
+        return None
+
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT outbox_id, embedding_id, operation FROM Index_Outbox ORDER BY outbox_id LIMIT %s",
+            (limit,)
+        )
+        return [(int(outbox_id), int(embedding_id), operation)
+                for outbox_id, embedding_id, operation in cursor.fetchall()]
+    except DatabaseError as e:
+        logging.error(f"Index Outbox Retrieval Error: {e}")
+        return None
+    finally:
+        conn.close()
+
+def delete_index_outbox(outbox_ids, chunk_size=500):
+    """
+    Remove index mutations that have been applied
+    
+    Args:
+        outbox_ids (list): Outbox row IDs
+        chunk_size (int): Maximum IDs per DELETE ... IN statement
+    
+    Returns:
+        bool: True if the rows were removed
+    """
+    if not outbox_ids:
+        return True
+
+    conn = create_connection()
+    if not conn:
+        return False
+
+    try:
+        cursor = conn.cursor()
+        for start in range(0, len(outbox_ids), chunk_size):
+            chunk = outbox_ids[start:start + chunk_size]
+            placeholders = ", ".join(["%s"] * len(chunk))
+            cursor.execute(f"DELETE FROM Index_Outbox WHERE outbox_id IN ({placeholders})", chunk)
+        conn.commit()
+        return True
+    except DatabaseError as e:
+        logging.error(f"Index Outbox Deletion Error: {e}")
+        conn.rollback()
         return False
     finally:
         conn.close()
 
-def cleanup_closed_cases(older_than_days=30):
+def count_index_outbox():
+    """
+    Count index mutations still waiting to be applied
+    
+    Returns:
+        int or None: Pending rows, or None if the outbox could not be read
+    """
+    conn = create_connection()
+    if not conn:
+        return None
+
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT COUNT(*) FROM Index_Outbox")
+        return cursor.fetchone()[0]
+    except DatabaseError as e:
+        logging.error(f"Index Outbox Count Error: {e}")
+        return None
+    finally:
+        conn.close()
+
+def _delete_case_rows(cursor, table, cases):
+    """
+    Delete cases and their sightings in the caller's transaction
+
+    Args:
+        cursor: Open cursor
+        table (str): Children_Metadata or the archive table
+        cases (list): Rows starting with (child_id, embedding_id)
+    """
+    placeholders = ", ".join(["%s"] * len(cases))
+    cursor.execute(
+        f"DELETE FROM {table} WHERE child_id IN ({placeholders})",
+        [case[0] for case in cases]
+    )
+    # A purged child's match history (and stored query embeddings) goes with it,
+    # and is not attributed to a later child that reuses the embedding ID
+    cursor.execute(
+        f"DELETE FROM Sightings WHERE embedding_id IN ({placeholders})",
+        [case[1] for case in cases]
+    )
+
+def cleanup_closed_cases(older_than_days=30, batch_size=CLEANUP_BATCH_SIZE,
+                         workers=CLEANUP_WORKERS, progress_callback=None):
     """
     Delete closed cases that are older than the specified number of days
     
+    Cases are processed in batches selected through the (case_status,
+    last_updated) index of the archive, then of Children_Metadata for cases
+    closed since the last archive pass. The
+    encrypted images of a batch are securely deleted in parallel first
+    (SECURE_DELETE_MODE: their data keys destroyed, or the files overwritten),
+    and only the rows whose image is gone are deleted, together with their
+    Sightings, with one DELETE ... IN per table and batch. Shredded
+    ciphertext is freed afterwards by the image reaper.
+    An interrupted run therefore leaves every unfinished case in the table,
+    and the next run picks up where it stopped. Cases whose image could not
+    be wiped are skipped and kept for a later run.
+    
     Args:
         older_than_days (int): Number of days after which to delete closed cases
+        batch_size (int): Cases handled per batch
+        workers (int): Threads deleting images in parallel
+        progress_callback (callable, optional): Called with a progress dict after each batch
     
     Returns:
         int: Number of cases deleted
@@ -247,65 +704,277 @@ def cleanup_closed_cases(older_than_days=30):
         logging.error("Database connection failed")
         return 0
 
+    deleted_count = 0
+    failed_count = 0
+    batch_number = 0
+
     try:
         cursor = conn.cursor()
+
+        # Fix the cutoff on the server's clock, the one last_updated is written with,
+        # so rows closed while the cleanup runs are left alone
+        cursor.execute(f"SELECT {get_backend().days_ago_sql()}", (older_than_days,))
+        cutoff = cursor.fetchone()[0]
         
-        # Find closed cases older than the specified period
-        query = """
-        SELECT embedding_id, image_url 
-        FROM Children_Metadata 
-        WHERE case_status = 'Closed' 
-        AND last_updated < DATE_SUB(NOW(), INTERVAL %s DAY)
-        """
-        cursor.execute(query, (older_than_days,))
-        cases_to_delete = cursor.fetchall()
+        # Find closed cases older than the specified period, archived or not yet archived
+        total = 0
+        for table in ("Children_Metadata", ARCHIVE_TABLE):
+            cursor.execute(
+                f"SELECT COUNT(*) FROM {table} "
+                "WHERE case_status = 'Closed' AND last_updated < %s",
+                (cutoff,)
+            )
+            total += cursor.fetchone()[0]
         
-        if not cases_to_delete:
+        if not total:
             logging.info("No old closed cases to delete")
             return 0
         
-        # Process each case for deletion
-        deleted_count = 0
-        for case in cases_to_delete:
-            embedding_id = case[0]
-            image_url = case[1]
-            
-            # Delete the record from the database
-            delete_query = "DELETE FROM Children_Metadata WHERE embedding_id = %s"
-            cursor.execute(delete_query, (embedding_id,))
-            
-            # Delete the encrypted image if it exists
-            if image_url and os.path.exists(image_url):
-                try:
-                    # Secure deletion method
-                    def secure_delete(file_path, passes=3):
-                        import secrets
-                        
-                        file_size = os.path.getsize(file_path)
-                        
-                        # Overwrite file multiple times
-                        for _ in range(passes):
-                            with open(file_path, 'wb') as f:
-                                f.write(secrets.token_bytes(file_size))
-                        
-                        # Then remove the file
-                        os.remove(file_path)
-                        logging.info(f"Securely deleted: {file_path}")
-                    
-                    secure_delete(image_url)
-                except Exception as e:
-                    logging.error(f"Error removing encrypted image: {e}")
-            
-            deleted_count += 1
+        batches = [(table, None) for table in (ARCHIVE_TABLE, "Children_Metadata")]
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            while batches:
+                table, last_seen = batches[0]
+                # Keyset on (last_updated, child_id) moves past cases kept after a failed wipe
+                query = f"""
+                SELECT child_id, embedding_id, image_url, last_updated
+                FROM {table}
+                WHERE case_status = 'Closed' AND last_updated < %s
+                """
+                params = [cutoff]
+                if last_seen is not None:
+                    query += " AND (last_updated > %s OR (last_updated = %s AND child_id > %s))"
+                    params.extend([last_seen[0], last_seen[0], last_seen[1]])
+                query += " ORDER BY last_updated, child_id LIMIT %s"
+                params.append(batch_size)
+                
+                cursor.execute(query, params)
+                cases_to_delete = cursor.fetchall()
+                # End the read snapshot so the next batch sees committed deletes
+                conn.commit()
+                if not cases_to_delete:
+                    batches.pop(0)
+                    continue
+                
+                batch_number += 1
+                batches[0] = (table, (cases_to_delete[-1][3], cases_to_delete[-1][0]))
+                
+                # Delete the encrypted images before their rows so no image is orphaned
+                wiped = list(executor.map(
+                    lambda image_url: delete_stored_image(image_url) if image_url else True,
+                    [case[2] for case in cases_to_delete]
+                ))
+                removable = [case for case, ok in zip(cases_to_delete, wiped) if ok]
+                failed_count += len(cases_to_delete) - len(removable)
+                
+                if removable:
+                    _delete_case_rows(cursor, table, removable)
+                    conn.commit()
+                    _metadata_cache.invalidate(case[1] for case in removable)
+                    deleted_count += len(removable)
+                
+                progress = {
+                    "batch": batch_number,
+                    "deleted": deleted_count,
+                    "failed": failed_count,
+                    "total": total,
+                }
+                logging.info(f"Cleanup batch {batch_number}: {deleted_count}/{total} deleted, {failed_count} failed")
+                if progress_callback:
+                    progress_callback(progress)
         
-        conn.commit()
         logging.info(f"Deleted {deleted_count} old closed cases")
+        if deleted_count and SECURE_DELETE_MODE == "shred":
+            from image_reaper import notify_image_reaper
+            notify_image_reaper()
         return deleted_count
     
     except Exception as e:
         logging.error(f"Error cleaning up closed cases: {e}")
         conn.rollback()
-        return 0
+        return deleted_count
+    finally:
+        conn.close()
+
+def purge_cases(embedding_ids, chunk_size=500, workers=CLEANUP_WORKERS):
+    """
+    Permanently delete cases now, whatever their status
+    
+    Each case's encrypted image and thumbnails are securely deleted first
+    (SECURE_DELETE_MODE), then its row, in Children_Metadata or the archive,
+    and its Sightings are deleted and a FAISS tombstone is queued in
+    Index_Outbox, all in one transaction. Cases whose image could not be
+    wiped are kept, so no row is lost while its image remains.
+    
+    Args:
+        embedding_ids (iterable): Embedding IDs of the cases
+        chunk_size (int): Maximum IDs per IN (...) statement
+        workers (int): Threads deleting images in parallel
+    
+    Returns:
+        dict: Result per integer embedding ID: "deleted", "not_found" or "error"
+    """
+    unique_ids = list(dict.fromkeys(int(embedding_id) for embedding_id in embedding_ids))
+    if not unique_ids:
+        return {}
+
+    conn = create_connection()
+    if not conn:
+        logging.error("Database connection failed")
+        return {embedding_id: "error" for embedding_id in unique_ids}
+
+    try:
+        cursor = conn.cursor()
+        
+        cases = {}
+        for table in ("Children_Metadata", ARCHIVE_TABLE):
+            remaining = [embedding_id for embedding_id in unique_ids if embedding_id not in cases]
+            for start in range(0, len(remaining), chunk_size):
+                chunk = remaining[start:start + chunk_size]
+                placeholders = ", ".join(["%s"] * len(chunk))
+                cursor.execute(
+                    f"SELECT child_id, embedding_id, image_url FROM {table} WHERE embedding_id IN ({placeholders})",
+                    chunk
+                )
+                cases.update((int(row[1]), (table, row)) for row in cursor.fetchall())
+        conn.commit()
+        
+        results = {embedding_id: "not_found" for embedding_id in unique_ids if embedding_id not in cases}
+        for embedding_id in results:
+            logging.error(f"No child found with embedding ID: {embedding_id}")
+        
+        # Delete the encrypted images before their rows so no image is orphaned
+        found = list(cases.values())
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            wiped = list(executor.map(
+                lambda image_url: delete_stored_image(image_url) if image_url else True,
+                [row[2] for _, row in found]
+            ))
+        
+        removable = []
+        for (table, row), ok in zip(found, wiped):
+            if ok:
+                removable.append((table, row))
+            else:
+                logging.error(f"Could not wipe the image of embedding ID {row[1]}; case kept")
+                results[int(row[1])] = "error"
+        
+        for table in ("Children_Metadata", ARCHIVE_TABLE):
+            rows = [row for row_table, row in removable if row_table == table]
+            for start in range(0, len(rows), chunk_size):
+                _delete_case_rows(cursor, table, rows[start:start + chunk_size])
+        if removable:
+            # Searches skip the embeddings at once; compaction drops them from the index
+            cursor.executemany(
+                "INSERT INTO Index_Outbox (embedding_id, operation) VALUES (%s, %s)",
+                [(int(row[1]), OUTBOX_TOMBSTONE) for _, row in removable]
+            )
+        conn.commit()
+        
+        purged = [int(row[1]) for _, row in removable]
+        _metadata_cache.invalidate(purged)
+        results.update((embedding_id, "deleted") for embedding_id in purged)
+        
+        if purged:
+            from index_outbox import notify_index_outbox
+            notify_index_outbox()
+            if SECURE_DELETE_MODE == "shred":
+                from image_reaper import notify_image_reaper
+                notify_image_reaper()
+        
+        logging.info(f"Permanently deleted {len(purged)} of {len(unique_ids)} cases")
+        return results
+    
+    except Exception as e:
+        logging.error(f"Case Purge Error: {e}")
+        conn.rollback()
+        return {embedding_id: "error" for embedding_id in unique_ids}
+    finally:
+        conn.close()
+
+def _move_cases(source, target, statuses, batch_size):
+    """
+    Move one batch of cases with the given statuses from one table to the other
+
+    The copy and the delete run in one transaction, so a case is always in
+    exactly one of the two tables.
+
+    Returns:
+        int or False: Cases moved, or False if the batch was rolled back
+    """
+    conn = create_connection()
+    if not conn:
+        return False
+
+    status_placeholders = ", ".join(["%s"] * len(statuses))
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            f"SELECT child_id, embedding_id FROM {source} WHERE case_status IN ({status_placeholders}) LIMIT %s",
+            list(statuses) + [batch_size]
+        )
+        rows = cursor.fetchall()
+        if not rows:
+            conn.commit()
+            return 0
+
+        child_ids = [row[0] for row in rows]
+        placeholders = ", ".join(["%s"] * len(child_ids))
+        # Re-check the status so a case changed since the SELECT stays where it is
+        condition = f"child_id IN ({placeholders}) AND case_status IN ({status_placeholders})"
+        params = child_ids + list(statuses)
+        columns = ", ".join(METADATA_COLUMNS)
+        cursor.execute(f"INSERT INTO {target} ({columns}) SELECT {columns} FROM {source} WHERE {condition}", params)
+        moved = cursor.rowcount
+        cursor.execute(f"DELETE FROM {source} WHERE {condition}", params)
+        conn.commit()
+        _metadata_cache.invalidate(row[1] for row in rows)
+        return moved
+    except DatabaseError as e:
+        logging.error(f"Case Archive Error moving {source} -> {target}: {e}")
+        conn.rollback()
+        return False
+    finally:
+        conn.close()
+
+def archive_inactive_cases(batch_size=ARCHIVE_BATCH_SIZE):
+    """
+    Move one batch of resolved and closed cases out of Children_Metadata into the archive
+
+    Returns:
+        int or False: Cases archived, or False on error
+    """
+    return _move_cases("Children_Metadata", ARCHIVE_TABLE, ("Resolved", "Closed"), batch_size)
+
+def restore_reopened_cases(batch_size=ARCHIVE_BATCH_SIZE):
+    """
+    Move one batch of archived cases whose status is Open again back into Children_Metadata
+
+    Returns:
+        int or False: Cases restored, or False on error
+    """
+    return _move_cases(ARCHIVE_TABLE, "Children_Metadata", ("Open",), batch_size)
+
+def count_cases_by_table():
+    """
+    Count cases per status in Children_Metadata and in the archive
+
+    Returns:
+        dict: {"active": {status: count}, "archive": {status: count}}
+    """
+    conn = create_connection()
+    if not conn:
+        return {}
+
+    try:
+        cursor = conn.cursor()
+        counts = {}
+        for key, table in (("active", "Children_Metadata"), ("archive", ARCHIVE_TABLE)):
+            cursor.execute(f"SELECT case_status, COUNT(*) FROM {table} GROUP BY case_status")
+            counts[key] = dict(cursor.fetchall())
+        return counts
+    except DatabaseError as e:
+        logging.error(f"Case Count Error: {e}")
+        return {}
     finally:
         conn.close()
 
@@ -345,6 +1014,10 @@ def initialize_database():
         logging.error("Failed to create metadata table")
         return False
     
+    if not create_sightings_table():
+        logging.error("Failed to create sightings table")
+        return False
+    
     # Schedule cleanup check
     schedule_monthly_cleanup()
     
@@ -371,12 +1044,298 @@ def search_open_cases():
         
         return open_cases
     
-    except mysql.connector.Error as e:
+    except DatabaseError as e:
         logging.error(f"Open Cases Retrieval Error: {e}")
         return []
     finally:
         conn.close()
 
+# Columns shown in the Manage Cases list; embedding_id identifies the row for selection
+CASE_LIST_COLUMNS = "child_id, embedding_id, name, age, gender, guardian_contact, last_known_location"
+
+def get_open_cases_page(after_child_id=0, limit=CASE_PAGE_SIZE):
+    """
+    Retrieve one page of open cases using keyset pagination on child_id
+    
+    Each page costs the same however deep the user has scrolled, because
+    idx_case_status stores (case_status, child_id) and the query seeks
+    straight to after_child_id instead of skipping OFFSET rows.
+    
+    Args:
+        after_child_id (int): Last child_id of the previous page (0 for the first page)
+        limit (int): Maximum rows per page
+    
+    Returns:
+        list: Open cases with only the listed columns, ordered by child_id
+    """
+    conn = create_connection()
+    if not conn:
+        logging.error("Database connection failed")
+        return []
+
+    try:
+        cursor = conn.cursor(dictionary=True)
+        query = f"""
+        SELECT {CASE_LIST_COLUMNS}
+        FROM Children_Metadata
+        WHERE case_status = 'Open' AND child_id > %s
+        ORDER BY child_id
+        LIMIT %s
+        """
+        cursor.execute(query, (after_child_id, limit))
+        return cursor.fetchall()
+    
+    except DatabaseError as e:
+        logging.error(f"Open Cases Page Retrieval Error: {e}")
+        return []
+    finally:
+        conn.close()
+
+def count_open_cases():
+    """
+    Count open cases from idx_case_status without reading table rows
+    
+    Returns:
+        int: Number of open cases
+    """
+    conn = create_connection()
+    if not conn:
+        logging.error("Database connection failed")
+        return 0
+
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT COUNT(*) FROM Children_Metadata WHERE case_status = 'Open'")
+        return cursor.fetchone()[0]
+    
+    except DatabaseError as e:
+        logging.error(f"Open Cases Count Error: {e}")
+        return 0
+    finally:
+        conn.close()
+
+def search_open_cases_by_name(term, after=None, limit=CASE_PAGE_SIZE):
+    """
+    Find open cases whose name starts with a search term, one page at a time
+    
+    The prefix match runs as a range scan on idx_open_name, which stores
+    (case_status, name_normalized, child_id), so results come back in index
+    order and the next page seeks past the last row seen instead of re-reading.
+    
+    Args:
+        term (str): Name prefix (case-insensitive)
+        after (tuple, optional): (name_normalized, child_id) of the last row of the previous page
+        limit (int): Maximum rows per page
+    
+    Returns:
+        list: Matching open cases ordered by name, including name_normalized for the next cursor
+    """
+    conn = create_connection()
+    if not conn:
+        logging.error("Database connection failed")
+        return []
+
+    try:
+        cursor = conn.cursor(dictionary=True)
+        query = f"""
+        SELECT {CASE_LIST_COLUMNS}, name_normalized
+        FROM Children_Metadata
+        WHERE case_status = 'Open' AND name_normalized LIKE %s ESCAPE '!'
+        """
+        params = [_name_prefix_pattern(term)]
+        if after is not None:
+            query += " AND (name_normalized > %s OR (name_normalized = %s AND child_id > %s))"
+            params.extend([after[0], after[0], after[1]])
+        query += " ORDER BY name_normalized, child_id LIMIT %s"
+        params.append(limit)
+
+        cursor.execute(query, params)
+        return cursor.fetchall()
+    
+    except DatabaseError as e:
+        logging.error(f"Case Name Search Error: {e}")
+        return []
+    finally:
+        conn.close()
+
+def count_open_cases_by_name(term):
+    """
+    Count open cases whose name starts with a search term, from idx_open_name alone
+    
+    Args:
+        term (str): Name prefix (case-insensitive)
+    
+    Returns:
+        int: Number of matching open cases
+    """
+    conn = create_connection()
+    if not conn:
+        logging.error("Database connection failed")
+        return 0
+
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT COUNT(*) FROM Children_Metadata "
+            "WHERE case_status = 'Open' AND name_normalized LIKE %s ESCAPE '!'",
+            (_name_prefix_pattern(term),)
+        )
+        return cursor.fetchone()[0]
+    
+    except DatabaseError as e:
+        logging.error(f"Case Name Count Error: {e}")
+        return 0
+    finally:
+        conn.close()
+
+def get_guardian_contacts_by_name(name, limit=CASE_PAGE_SIZE):
+    """
+    Get the distinct guardian contacts of open cases registered under a name
+    
+    Args:
+        name (str): Child's name (case-insensitive exact match)
+        limit (int): Maximum contacts to return
+    
+    Returns:
+        list: Guardian contacts in registration order, without duplicates
+    """
+    conn = create_connection()
+    if not conn:
+        logging.error("Database connection failed")
+        return []
+
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            SELECT guardian_contact
+            FROM Children_Metadata
+            WHERE case_status = 'Open' AND name_normalized = %s
+            GROUP BY guardian_contact
+            ORDER BY MIN(child_id)
+            LIMIT %s
+            """,
+            (normalize_name(name), limit)
+        )
+        return [row[0] for row in cursor.fetchall()]
+    
+    except DatabaseError as e:
+        logging.error(f"Guardian Contact Retrieval Error: {e}")
+        return []
+    finally:
+        conn.close()
+
+def insert_sightings(sightings):
+    """
+    Insert a batch of sightings with one executemany and a single commit
+    
+    Args:
+        sightings (list): Tuples of (embedding_id, similarity, source, frame_timestamp, embedding bytes or None)
+    
+    Returns:
+        int or False: Number of rows inserted, or False if the batch was rolled back
+    """
+    if not sightings:
+        return 0
+
+    conn = create_connection()
+    if not conn:
+        return False
+
+    try:
+        cursor = conn.cursor()
+        cursor.executemany(
+            """
+            INSERT INTO Sightings (embedding_id, similarity, source, frame_timestamp, embedding)
+            VALUES (%s, %s, %s, %s, %s)
+            """,
+            [(int(embedding_id), similarity, source, frame_timestamp, embedding)
+             for embedding_id, similarity, source, frame_timestamp, embedding in sightings]
+        )
+        conn.commit()
+        return len(sightings)
+    except DatabaseError as e:
+        logging.error(f"Sightings Insertion Error: {e}")
+        conn.rollback()
+        return False
+    finally:
+        conn.close()
+
+SIGHTING_COLUMNS = "sighting_id, embedding_id, similarity, source, frame_timestamp"
+
+def get_sightings_for_child(embedding_id, start=None, end=None, limit=1000, include_embeddings=False):
+    """
+    Retrieve the sightings of one child, newest first, using idx_sightings_child_time
+    
+    Args:
+        embedding_id (int): Child's embedding ID
+        start (datetime, optional): Earliest frame timestamp (inclusive)
+        end (datetime, optional): Latest frame timestamp (exclusive)
+        limit (int): Maximum sightings to return
+        include_embeddings (bool): Also return the stored query embedding bytes
+    
+    Returns:
+        list: Sightings as dicts
+    """
+    conn = create_connection()
+    if not conn:
+        logging.error("Database connection failed")
+        return []
+
+    try:
+        cursor = conn.cursor(dictionary=True)
+        columns = SIGHTING_COLUMNS + (", embedding" if include_embeddings else "")
+        query = f"SELECT {columns} FROM Sightings WHERE embedding_id = %s"
+        params = [int(embedding_id)]
+        if start is not None:
+            query += " AND frame_timestamp >= %s"
+            params.append(start)
+        if end is not None:
+            query += " AND frame_timestamp < %s"
+            params.append(end)
+        query += " ORDER BY frame_timestamp DESC LIMIT %s"
+        params.append(limit)
+
+        cursor.execute(query, params)
+        return cursor.fetchall()
+    except DatabaseError as e:
+        logging.error(f"Sightings Retrieval Error: {e}")
+        return []
+    finally:
+        conn.close()
+
+def get_sightings_in_range(start, end, limit=1000):
+    """
+    Retrieve all sightings in a time range, oldest first, using idx_sightings_time
+    
+    Args:
+        start (datetime): Earliest frame timestamp (inclusive)
+        end (datetime): Latest frame timestamp (exclusive)
+        limit (int): Maximum sightings to return
+    
+    Returns:
+        list: Sightings as dicts
+    """
+    conn = create_connection()
+    if not conn:
+        logging.error("Database connection failed")
+        return []
+
+    try:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute(
+            f"SELECT {SIGHTING_COLUMNS} FROM Sightings "
+            "WHERE frame_timestamp >= %s AND frame_timestamp < %s "
+            "ORDER BY frame_timestamp LIMIT %s",
+            (start, end, limit)
+        )
+        return cursor.fetchall()
+    except DatabaseError as e:
+        logging.error(f"Sightings Retrieval Error: {e}")
+        return []
+    finally:
+        conn.close()
+
 # Initialize database setup function
 def initialize_database():
     """
@@ -392,6 +1351,10 @@ def initialize_database():
         logging.error("Failed to create metadata table")
         return False
     
+    if not create_sightings_table():
+        logging.error("Failed to create sightings table")
+        return False
+    
     logging.info("Database initialization complete")
     return True
 
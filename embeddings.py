@@ -57,9 +57,48 @@ class FaceEmbedding:
             logging.error(f"Embedding extraction error: {e}")
             return None
 
-def extract_embedding(face):
+    def extract_embeddings(self, faces, batch_size=32):
+        """
+        Extract embeddings for several faces with batched forward passes
+        
+        Args:
+            faces (list): Face crops as numpy.ndarray
+            batch_size (int): Faces per forward pass
+        
+        Returns:
+            list: One L2-normalised embedding (or None for an invalid face) per input face
+        """
+        embeddings = [None] * len(faces)
+        valid = [i for i, face in enumerate(faces) if face is not None and face.size > 0]
+        
+        for start in range(0, len(valid), batch_size):
+            indices = valid[start:start + batch_size]
+            try:
+                # Same preprocessing as extract_embedding, stacked into one tensor
+                batch = np.stack([
+                    (cv2.resize(faces[i].astype(np.float32), (160, 160)) / 255.0 - 0.5) * 2.0
+                    for i in indices
+                ])
+                batch_tensor = torch.tensor(batch).permute(0, 3, 1, 2).float().to(self.device)
+                
+                with torch.no_grad():
+                    batch_embeddings = self.model(batch_tensor).cpu().numpy()
+                
+                batch_embeddings /= np.linalg.norm(batch_embeddings, axis=1, keepdims=True)
+                for i, embedding in zip(indices, batch_embeddings):
+                    embeddings[i] = embedding
+            except Exception as e:
+                logging.error(f"Batch embedding extraction error: {e}")
+        
+        return embeddings
+
+def extract_embedding(face, embedder=None):
     """
     Convenience function with comprehensive error handling
+    
+    Args:
+        face (numpy.ndarray): Face crop
+        embedder (FaceEmbedding, optional): Already loaded model to reuse
     """
     try:
         # Validate input
@@ -67,7 +106,8 @@ def extract_embedding(face):
             logging.error("Invalid face image for embedding")
             return None
         
-        embedder = FaceEmbedding()
+        if embedder is None:
+            embedder = FaceEmbedding()
         return embedder.extract_embedding(face)
     except Exception as e:
         logging.error(f"Embedding extraction failed: {e}")
@@ -1,17 +1,120 @@
 from Crypto.Cipher import AES
 from Crypto.Random import get_random_bytes
+import base64
+import binascii
+import contextlib
+import ctypes
+import hashlib
+import io
+import logging
 import os
+import struct
+import sys
+import threading
+import time
+from config import (
+    ENCRYPTION_KEY_PATH, ENCRYPTION_KEY_ENV, ENCRYPTION_KEY_MLOCK, ENCRYPTION_KEY_CHECK_INTERVAL, ENCRYPTION_CHUNK_SIZE
+)
 
-class ImageEncryptor:
-    def __init__(self, key_path='encryption_key.bin'):
+KEY_SIZE = 32
+
+# Chunked container: MAGIC + chunk size (uint32) + nonce prefix, then one
+# ciphertext + 16-byte tag record per chunk. Files without a magic are in
+# the original nonce(16) + tag(16) + ciphertext format.
+#
+# Version 3 (envelope) follows that data header with a fixed-size key block:
+# master key ID + wrap nonce + the file's own data key encrypted with the
+# master key. Chunks are encrypted with the data key, so rotating the master
+# key only rewrites the key block in place. Version 2 files use the master key
+# for their chunks directly.
+STREAM_MAGIC = b"CSENCv2\x00"
+ENVELOPE_MAGIC = b"CSENCv3\x00"
+STREAM_NONCE_PREFIX_SIZE = 7
+STREAM_HEADER_SIZE = len(STREAM_MAGIC) + 4 + STREAM_NONCE_PREFIX_SIZE
+STREAM_TAG_SIZE = 16
+KEY_ID_SIZE = 8
+KEY_BLOCK_OFFSET = STREAM_HEADER_SIZE
+KEY_BLOCK_SIZE = KEY_ID_SIZE + 12 + KEY_SIZE + STREAM_TAG_SIZE
+ENVELOPE_HEADER_SIZE = STREAM_HEADER_SIZE + KEY_BLOCK_SIZE
+
+def key_id(key):
+    """
+    Short fingerprint naming a master key in the key blocks it wrapped
+    
+    Returns:
+        bytes: KEY_ID_SIZE-byte ID
+    """
+    return hashlib.sha256(b"child-safety-image-master-key" + bytes(key)).digest()[:KEY_ID_SIZE]
+
+def _lock_memory(buffer):
+    """
+    Ask the OS to keep a buffer in RAM (mlock / VirtualLock) so the key is never swapped out
+    
+    Returns:
+        bool: True if the pages were locked
+    """
+    address = ctypes.addressof((ctypes.c_char * len(buffer)).from_buffer(buffer))
+    try:
+        if sys.platform == "win32":
+            return bool(ctypes.windll.kernel32.VirtualLock(ctypes.c_void_p(address), ctypes.c_size_t(len(buffer))))
+        libc = ctypes.CDLL(None, use_errno=True)
+        return libc.mlock(ctypes.c_void_p(address), ctypes.c_size_t(len(buffer))) == 0
+    except (AttributeError, OSError):
+        return False
+
+@contextlib.contextmanager
+def _open_source(source):
+    # Paths are opened (and closed) here; file objects are used as given
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, 'rb') as src:
+            yield src
+    else:
+        yield source
+
+class KeyProvider:
+    def __init__(self, key_path=ENCRYPTION_KEY_PATH, env_var=ENCRYPTION_KEY_ENV, lock_memory=ENCRYPTION_KEY_MLOCK,
+                 check_interval=ENCRYPTION_KEY_CHECK_INTERVAL):
         """
-        Initialize image encryption
+        Load the AES key once per process and hand out the cached copy
+        
+        The key comes from the env_var environment variable if it is set
+        (64 hex characters or base64 of 32 bytes), otherwise from key_path,
+        which is created with a new random key if it does not exist.
+        
+        This is the master key: it wraps each file's data key. During and
+        after a rotation, <key_path>.next (the rotation target) and
+        <key_path>.retired (the key it replaced) are also kept so files
+        wrapped by either still open.
         
         Args:
-            key_path (str): Path to store/load encryption key
+            key_path (str): Key file
+            env_var (str): Environment variable holding the key
+            lock_memory (bool): Lock the cached key in RAM
+            check_interval (float): Minimum seconds between checks of the key file for a rotation
         """
         self.key_path = key_path
-        self.key = self._load_or_generate_key()
+        self.next_key_path = f"{key_path}.next"
+        self.retired_key_path = f"{key_path}.retired"
+        self.env_var = env_var
+        self.lock_memory = lock_memory
+        self.check_interval = check_interval
+        self.source = None
+        self.locked = False
+        self._key = None
+        self._key_stamp = None
+        self._key_checked_at = 0.0
+        self._keyring = None
+        self._lock = threading.RLock()
+
+    def _decode_env_key(self, value):
+        value = value.strip()
+        try:
+            key = bytes.fromhex(value) if len(value) == KEY_SIZE * 2 else base64.b64decode(value, validate=True)
+        except (ValueError, binascii.Error):
+            raise ValueError(f"{self.env_var} is neither hex nor base64")
+        if len(key) != KEY_SIZE:
+            raise ValueError(f"{self.env_var} must decode to {KEY_SIZE} bytes, got {len(key)}")
+        return key
 
     def _load_or_generate_key(self):
         """
@@ -20,55 +123,565 @@ class ImageEncryptor:
         Returns:
             bytes: 32-byte encryption key
         """
+        env_value = os.getenv(self.env_var) if self.env_var else None
+        if env_value:
+            self.source = f"env:{self.env_var}"
+            return self._decode_env_key(env_value)
+
+        self.source = f"file:{self.key_path}"
         if os.path.exists(self.key_path):
             with open(self.key_path, 'rb') as f:
                 return f.read()
         
-        # Generate new key
-        key = get_random_bytes(32)
-        with open(self.key_path, 'wb') as f:
+        # Generate new key, readable only by the owner
+        key = get_random_bytes(KEY_SIZE)
+        fd = os.open(self.key_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, 'wb') as f:
             f.write(key)
+        logging.info(f"Generated new image encryption key at {self.key_path}")
         
         return key
 
-    def encrypt_image(self, input_path, output_path):
+    def _key_file_stamp(self):
+        try:
+            stat = os.stat(self.key_path)
+            return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        except FileNotFoundError:
+            return None
+
+    def _key_file_replaced(self, force=False):
+        # At most one stat per check_interval unless forced; the key file is only replaced by a rotation
+        if self._key_stamp is None:
+            return False
+        now = time.monotonic()
+        if not force and now - self._key_checked_at < self.check_interval:
+            return False
+        self._key_checked_at = now
+        stamp = self._key_file_stamp()
+        return stamp is not None and stamp != self._key_stamp
+
+    def get_key(self):
+        """
+        Get the current master key, reading the key file again only if a rotation replaced it
+        
+        The file is checked at most once per check_interval seconds, so a
+        long-running process starts wrapping new data keys with the new master
+        key within that interval of a rotation in another process promoting
+        it. Files wrapped with the replaced key meanwhile still open through the
+        retired key, and the next rotation moves them over.
+        
+        Returns:
+            bytearray: 32-byte key (shared; do not modify)
+        """
+        key = self._key
+        if key is not None and not self._key_file_replaced():
+            return key
+        with self._lock:
+            if self._key is not None and self._key_file_replaced(force=True):
+                logging.info("Image master key was rotated by another process, reloading")
+                # Not clear(); other threads may be using the old keys right now
+                self._key = None
+                self._keyring = None
+            if self._key is None:
+                # Stamped before reading, so a replacement racing the read only causes one more reload
+                stamp = self._key_file_stamp()
+                key = bytearray(self._load_or_generate_key())
+                if self.lock_memory:
+                    self.locked = _lock_memory(key)
+                    if not self.locked:
+                        logging.warning("Could not lock the encryption key in memory; continuing unlocked")
+                if self.source.startswith("file:"):
+                    self._key_stamp = stamp or self._key_file_stamp()
+                    self._key_checked_at = time.monotonic()
+                else:
+                    self._key_stamp = None
+                self._key = key
+            return self._key
+
+    def _read_key_file(self, path):
+        with open(path, 'rb') as f:
+            key = bytearray(f.read())
+        if len(key) != KEY_SIZE:
+            raise ValueError(f"{path} does not hold a {KEY_SIZE}-byte key")
+        return key
+
+    def get_keyring(self):
+        """
+        Get every master key that may have wrapped a stored file's data key
+        
+        Returns:
+            dict: Key by key_id(), the current key first
+        """
+        keyring = self._keyring
+        if keyring is not None:
+            return keyring
+        with self._lock:
+            if self._keyring is None:
+                current = self.get_key()
+                keyring = {key_id(current): current}
+                for path in (self.next_key_path, self.retired_key_path):
+                    if os.path.exists(path):
+                        key = self._read_key_file(path)
+                        if self.lock_memory:
+                            _lock_memory(key)
+                        keyring.setdefault(key_id(key), key)
+                self._keyring = keyring
+            return self._keyring
+
+    def find_key(self, wanted_key_id):
+        """
+        Get the master key with the given ID
+        
+        The key files are only read again when a file names a key this
+        process has not seen yet (a rotation ran in another process).
+        
+        Returns:
+            bytearray or None: Key, or None if no known key has that ID
+        """
+        key = self.get_keyring().get(wanted_key_id)
+        if key is None:
+            with self._lock:
+                self._keyring = None
+            key = self.get_keyring().get(wanted_key_id)
+        return key
+
+    def create_next_key(self):
+        """
+        Get the rotation target key, generating <key_path>.next if a rotation is not already under way
+        
+        Returns:
+            bytearray: Next master key
+        """
+        self.get_key()
+        if not self.source.startswith("file:"):
+            raise ValueError(f"The master key comes from {self.env_var}; rotate it there, not with key files")
+        with self._lock:
+            if not os.path.exists(self.next_key_path):
+                fd = os.open(self.next_key_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(get_random_bytes(KEY_SIZE))
+                    f.flush()
+                    os.fsync(f.fileno())
+                logging.info(f"Generated next image master key at {self.next_key_path}")
+            self._keyring = None
+            return self._read_key_file(self.next_key_path)
+
+    def promote_next_key(self):
+        """
+        Make the next key current once every file is wrapped by it
+        
+        The previous retired key is destroyed and the current one becomes
+        retired. Other processes notice the replaced key file within their
+        check_interval and wrap new files with the new key from then on; files
+        they wrote before noticing are wrapped with the retired key, which the
+        next rotation moves over before destroying it.
+        """
+        with self._lock:
+            if os.path.exists(self.retired_key_path):
+                with open(self.retired_key_path, 'r+b') as f:
+                    f.write(os.urandom(KEY_SIZE))
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.remove(self.retired_key_path)
+            # Copy rather than rename, so the key file never goes missing; a process
+            # loading it at that moment would otherwise generate a new key
+            current = self._read_key_file(self.key_path)
+            fd = os.open(self.retired_key_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+            with os.fdopen(fd, 'wb') as f:
+                f.write(current)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(self.next_key_path, self.key_path)
+            # Reload on next use; not clear(), other threads may be using the cached keys right now
+            self._key = None
+            self._keyring = None
+
+    def clear(self):
+        """
+        Overwrite the cached keys; the next get_key() loads them again
+        """
+        with self._lock:
+            for key in list((self._keyring or {}).values()) + [self._key]:
+                if key is not None:
+                    key[:] = bytes(len(key))
+            self._key = None
+            self._key_stamp = None
+            self._keyring = None
+            self.locked = False
+
+_key_provider = None
+_key_provider_lock = threading.Lock()
+
+def get_key_provider():
+    """
+    Get the process-wide key provider configured in config.py
+    
+    Returns:
+        KeyProvider: Shared provider
+    """
+    global _key_provider
+    with _key_provider_lock:
+        if _key_provider is None:
+            _key_provider = KeyProvider()
+        return _key_provider
+
+class ImageEncryptor:
+    def __init__(self, key_path=None, key_provider=None):
+        """
+        Initialize image encryption
+        
+        Args:
+            key_path (str, optional): Path to store/load encryption key (defaults to the shared provider)
+            key_provider (KeyProvider, optional): Source of the key
+        """
+        if key_provider is None:
+            key_provider = KeyProvider(key_path, env_var=None) if key_path else get_key_provider()
+        self.key_provider = key_provider
+        self.key_path = key_provider.key_path
+
+    @property
+    def key(self):
+        return self.key_provider.get_key()
+
+    def encrypt_image(self, input_path, output_path, chunk_size=ENCRYPTION_CHUNK_SIZE):
         """
-        Encrypt an image file
+        Encrypt an image (or any file) into the chunked container format
         
         Args:
             input_path (str): Source image path
             output_path (str): Encrypted image path
+            chunk_size (int): Plaintext bytes per authenticated chunk
+        """
+        with open(input_path, 'rb') as src:
+            self._encrypt_to_file(src, output_path, chunk_size)
+
+    def encrypt_bytes(self, data, output_path, chunk_size=ENCRYPTION_CHUNK_SIZE):
+        """
+        Encrypt in-memory data (e.g. an encoded thumbnail) into the chunked container format
+        
+        Args:
+            data (bytes): Plaintext
+            output_path (str): Encrypted file path
+            chunk_size (int): Plaintext bytes per authenticated chunk
+        """
+        self._encrypt_to_file(io.BytesIO(data), output_path, chunk_size)
+
+    def _encrypt_to_file(self, src, output_path, chunk_size):
+        # Written under a temporary name so a reader never sees a half-written file
+        temp_path = f"{output_path}.part"
+        try:
+            with open(temp_path, 'wb') as dst:
+                self.encrypt_stream(src, dst, chunk_size)
+            os.replace(temp_path, output_path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def encrypt_stream(self, src, dst, chunk_size=ENCRYPTION_CHUNK_SIZE, master_key=None):
+        """
+        Encrypt a readable binary stream chunk by chunk under a new data key
+        
+        Only two chunks are held in memory at a time, whatever the stream length.
+        
+        Args:
+            src: Readable binary file object
+            dst: Writable binary file object
+            chunk_size (int): Plaintext bytes per authenticated chunk
+            master_key (bytes, optional): Key wrapping the data key (defaults to the current master key)
+        
+        Returns:
+            int: Plaintext bytes encrypted
+        """
+        header = ENVELOPE_MAGIC + struct.pack(">I", chunk_size) + get_random_bytes(STREAM_NONCE_PREFIX_SIZE)
+        data_key = bytearray(get_random_bytes(KEY_SIZE))
+        dst.write(header)
+        dst.write(self.wrap_data_key(data_key, header, master_key))
+
+        total = 0
+        index = 0
+        chunk = src.read(chunk_size)
+        try:
+            while True:
+                # Read ahead so the last chunk can be marked as such
+                next_chunk = src.read(chunk_size) if len(chunk) == chunk_size else b""
+                last = not next_chunk
+                ciphertext, tag = self._chunk_cipher(data_key, header, index, last).encrypt_and_digest(chunk)
+                dst.write(ciphertext)
+                dst.write(tag)
+                total += len(chunk)
+                if last:
+                    return total
+                chunk = next_chunk
+                index += 1
+        finally:
+            data_key[:] = bytes(KEY_SIZE)
+
+    def _chunk_cipher(self, key, header, index, last):
+        # Nonce = file prefix + chunk index + last-chunk flag, and the data header
+        # is authenticated with every chunk, so chunks cannot be reordered, dropped,
+        # moved between files or truncated at a chunk boundary without failing
+        nonce = header[-STREAM_NONCE_PREFIX_SIZE:] + struct.pack(">IB", index, int(last))
+        cipher = AES.new(key, AES.MODE_GCM, nonce=nonce)
+        cipher.update(header)
+        return cipher
+
+    def wrap_data_key(self, data_key, header, master_key=None):
+        """
+        Encrypt a file's data key under a master key
+        
+        Args:
+            data_key (bytes): The file's data key
+            header (bytes): The file's data header (bound to the wrapped key)
+            master_key (bytes, optional): Wrapping key (defaults to the current master key)
+        
+        Returns:
+            bytes: KEY_BLOCK_SIZE-byte key block
+        """
+        master_key = self.key if master_key is None else master_key
+        wrapping_key_id = key_id(master_key)
+        cipher = AES.new(master_key, AES.MODE_GCM, nonce=get_random_bytes(12))
+        cipher.update(header + wrapping_key_id)
+        wrapped, tag = cipher.encrypt_and_digest(bytes(data_key))
+        return wrapping_key_id + cipher.nonce + wrapped + tag
+
+    def unwrap_data_key(self, key_block, header):
         """
-        cipher = AES.new(self.key, AES.MODE_GCM)
+        Recover a file's data key with whichever known master key wrapped it
         
-        with open(input_path, 'rb') as f:
-            data = f.read()
+        Raises:
+            ValueError: If the master key is unknown or the key block fails authentication
+        """
+        wrapping_key_id = key_block[:KEY_ID_SIZE]
+        master_key = self.key_provider.find_key(wrapping_key_id)
+        if master_key is None:
+            raise ValueError(f"File was encrypted under unknown master key {wrapping_key_id.hex()}")
+        nonce = key_block[KEY_ID_SIZE:KEY_ID_SIZE + 12]
+        wrapped = key_block[KEY_ID_SIZE + 12:KEY_ID_SIZE + 12 + KEY_SIZE]
+        cipher = AES.new(master_key, AES.MODE_GCM, nonce=nonce)
+        cipher.update(header + wrapping_key_id)
+        return cipher.decrypt_and_verify(wrapped, key_block[-STREAM_TAG_SIZE:])
+
+    def read_key_block(self, src):
+        """
+        Read the data header and key block of an envelope-encrypted file
         
-        ciphertext, tag = cipher.encrypt_and_digest(data)
+        Args:
+            src: Seekable binary file object positioned anywhere
         
-        with open(output_path, 'wb') as f:
-            f.write(cipher.nonce)
-            f.write(tag)
-            f.write(ciphertext)
+        Returns:
+            tuple or None: (data header, key block), or None for formats without a key block
+        """
+        src.seek(0)
+        header = src.read(ENVELOPE_HEADER_SIZE)
+        if len(header) < ENVELOPE_HEADER_SIZE or not header.startswith(ENVELOPE_MAGIC):
+            return None
+        return header[:STREAM_HEADER_SIZE], header[STREAM_HEADER_SIZE:]
+
+    def destroy_data_key(self, f):
+        """
+        Crypto-shred an envelope-encrypted file by overwriting its key block in place
+
+        The wrapped data key exists nowhere else, so once it is replaced with
+        random bytes the chunks cannot be decrypted, whatever the file size.
+        A copy of the old block the disk may still hold (SSD remapping,
+        copy-on-write filesystems) stays wrapped by the master key, and the
+        second master key rotation after the shred destroys that key.
+
+        Args:
+            f: Seekable binary file object opened for update
+
+        Returns:
+            bool: True if the key was destroyed, False for formats without a key block
+        """
+        if self.read_key_block(f) is None:
+            return False
+        f.seek(KEY_BLOCK_OFFSET)
+        f.write(get_random_bytes(KEY_BLOCK_SIZE))
+        f.flush()
+        os.fsync(f.fileno())
+        return True
+
+    def _read_header(self, src):
+        """
+        Read the container header, or rewind and return None for the single-message format
+        
+        Returns:
+            tuple or None: (data header, chunk size, chunk key, header size)
+        """
+        header = src.read(STREAM_HEADER_SIZE)
+        if len(header) == STREAM_HEADER_SIZE and header.startswith((STREAM_MAGIC, ENVELOPE_MAGIC)):
+            chunk_size = struct.unpack(">I", header[len(STREAM_MAGIC):len(STREAM_MAGIC) + 4])[0]
+            if chunk_size == 0:
+                raise ValueError("Encrypted file header is corrupt")
+            if header.startswith(STREAM_MAGIC):
+                return header, chunk_size, self.key, STREAM_HEADER_SIZE
+            key_block = src.read(KEY_BLOCK_SIZE)
+            if len(key_block) < KEY_BLOCK_SIZE:
+                raise ValueError("Encrypted file is truncated")
+            return header, chunk_size, self.unwrap_data_key(key_block, header), ENVELOPE_HEADER_SIZE
+        src.seek(0)
+        return None
+
+    def _decrypt_legacy(self, src):
+        # Original format: nonce(16) + tag(16) + ciphertext, one GCM message
+        nonce = src.read(16)
+        tag = src.read(16)
+        ciphertext = src.read()
+        cipher = AES.new(self.key, AES.MODE_GCM, nonce=nonce)
+        return cipher.decrypt_and_verify(ciphertext, tag)
+
+    def iter_decrypt_stream(self, src):
+        """
+        Decrypt a seekable binary stream, yielding verified plaintext chunks
+        
+        Files in the original single-message format are decrypted whole and
+        yielded as one chunk.
+        
+        Args:
+            src: Readable, seekable binary file object
+        
+        Yields:
+            bytes: Plaintext, in order
+        
+        Raises:
+            ValueError: If the file is truncated or fails authentication
+        """
+        parsed = self._read_header(src)
+        if parsed is None:
+            yield self._decrypt_legacy(src)
+            return
+
+        header, chunk_size, chunk_key, _ = parsed
+        record_size = chunk_size + STREAM_TAG_SIZE
+        index = 0
+        record = src.read(record_size)
+        while True:
+            if len(record) < STREAM_TAG_SIZE:
+                raise ValueError("Encrypted file is truncated")
+            next_record = src.read(record_size) if len(record) == record_size else b""
+            last = not next_record
+            cipher = self._chunk_cipher(chunk_key, header, index, last)
+            yield cipher.decrypt_and_verify(record[:-STREAM_TAG_SIZE], record[-STREAM_TAG_SIZE:])
+            if last:
+                return
+            record = next_record
+            index += 1
 
     def decrypt_image(self, input_path, output_path):
         """
-        Decrypt an encrypted image file
+        Decrypt an encrypted image file (chunked or original format)
         
         Args:
             input_path (str): Encrypted image path
             output_path (str): Decrypted image path
         """
-        with open(input_path, 'rb') as f:
-            nonce = f.read(16)
-            tag = f.read(16)
-            ciphertext = f.read()
+        try:
+            with open(input_path, 'rb') as src, open(output_path, 'wb') as dst:
+                for chunk in self.iter_decrypt_stream(src):
+                    dst.write(chunk)
+        except ValueError:
+            # Do not leave a partial plaintext behind a failed verification
+            os.remove(output_path)
+            raise
+
+    def decrypt_bytes(self, source):
+        """
+        Decrypt an encrypted file into memory
         
-        cipher = AES.new(self.key, AES.MODE_GCM, nonce=nonce)
-        data = cipher.decrypt_and_verify(ciphertext, tag)
+        Args:
+            source (str or file): Encrypted file path, or a seekable binary file object
+        
+        Returns:
+            bytes: Plaintext
+        """
+        with _open_source(source) as src:
+            return b"".join(self.iter_decrypt_stream(src))
+
+    def _container_layout(self, src):
+        """
+        Returns:
+            tuple: (header or None for the original format, chunk size, chunk key, header size, encrypted size)
+        """
+        size = src.seek(0, os.SEEK_END)
+        src.seek(0)
+        parsed = self._read_header(src)
+        if parsed is None:
+            return None, None, None, 0, size
+        return parsed + (size,)
+
+    def get_plaintext_size(self, source):
+        """
+        Size of the decrypted content, from the container layout alone
+        
+        Args:
+            source (str or file): Encrypted file path, or a seekable binary file object
+        
+        Returns:
+            int: Plaintext bytes
+        """
+        with _open_source(source) as src:
+            header, chunk_size, _, header_size, size = self._container_layout(src)
+        if header is None:
+            return size - 32
+        full_records, remainder = divmod(size - header_size, chunk_size + STREAM_TAG_SIZE)
+        return full_records * chunk_size + max(remainder - STREAM_TAG_SIZE, 0)
+
+    def read_range(self, source, offset, length):
+        """
+        Decrypt only the chunks covering plaintext bytes [offset, offset + length)
         
-        with open(output_path, 'wb') as f:
-            f.write(data)
+        Args:
+            source (str or file): Encrypted file path, or a seekable binary file object
+            offset (int): First plaintext byte
+            length (int): Number of bytes wanted
+        
+        Returns:
+            bytes: Plaintext range (shorter if it runs past the end)
+        
+        Raises:
+            ValueError: If a covering chunk fails authentication
+        """
+        with _open_source(source) as src:
+            header, chunk_size, chunk_key, header_size, size = self._container_layout(src)
+            if header is None:
+                return self._decrypt_legacy(src)[offset:offset + length]
+
+            record_size = chunk_size + STREAM_TAG_SIZE
+            chunk_count = max(-(-(size - header_size) // record_size), 1)
+            full_records, remainder = divmod(size - header_size, record_size)
+            plaintext_size = full_records * chunk_size + max(remainder - STREAM_TAG_SIZE, 0)
+            first = offset // chunk_size
+            end = min(offset + length, plaintext_size)
+            if length <= 0 or offset >= end:
+                return b""
+
+            parts = []
+            for index in range(first, (end - 1) // chunk_size + 1):
+                src.seek(header_size + index * record_size)
+                record = src.read(record_size)
+                if len(record) < STREAM_TAG_SIZE:
+                    raise ValueError("Encrypted file is truncated")
+                cipher = self._chunk_cipher(chunk_key, header, index, index == chunk_count - 1)
+                parts.append(cipher.decrypt_and_verify(record[:-STREAM_TAG_SIZE], record[-STREAM_TAG_SIZE:]))
+
+        data = b"".join(parts)
+        start = offset - first * chunk_size
+        return data[start:start + end - offset]
+
+_image_encryptor = None
+
+def get_image_encryptor():
+    """
+    Get the process-wide encryptor backed by the shared key provider
+    
+    Returns:
+        ImageEncryptor: Shared encryptor
+    """
+    global _image_encryptor
+    if _image_encryptor is None:
+        _image_encryptor = ImageEncryptor()
+    return _image_encryptor
 
 # Utility functions for direct use
 def encrypt_image(input_path, output_path):
@@ -79,8 +692,17 @@ def encrypt_image(input_path, output_path):
         input_path (str): Source image path
         output_path (str): Encrypted image path
     """
-    encryptor = ImageEncryptor()
-    encryptor.encrypt_image(input_path, output_path)
+    get_image_encryptor().encrypt_image(input_path, output_path)
+
+def encrypt_image_bytes(data, output_path):
+    """
+    Convenience function to encrypt in-memory image data
+    
+    Args:
+        data (bytes): Encoded image
+        output_path (str): Encrypted image path
+    """
+    get_image_encryptor().encrypt_bytes(data, output_path)
 
 def decrypt_image(input_path, output_path):
     """
@@ -90,5 +712,30 @@ def decrypt_image(input_path, output_path):
         input_path (str): Encrypted image path
         output_path (str): Decrypted image path
     """
-    encryptor = ImageEncryptor()
-    encryptor.decrypt_image(input_path, output_path)
\ No newline at end of file
+    get_image_encryptor().decrypt_image(input_path, output_path)
+
+def decrypt_image_bytes(input_path):
+    """
+    Convenience function to decrypt image into memory, without writing plaintext to disk
+    
+    Args:
+        input_path (str): Encrypted image path
+    
+    Returns:
+        bytes: Decrypted image
+    """
+    return get_image_encryptor().decrypt_bytes(input_path)
+
+def read_encrypted_range(input_path, offset, length):
+    """
+    Convenience function to decrypt a byte range without decrypting the whole file
+    
+    Args:
+        input_path (str): Encrypted file path
+        offset (int): First plaintext byte
+        length (int): Number of bytes wanted
+    
+    Returns:
+        bytes: Plaintext range
+    """
+    return get_image_encryptor().read_range(input_path, offset, length)
\ No newline at end of file
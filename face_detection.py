@@ -90,6 +90,41 @@ class FaceDetector:
             self.logger.error(traceback.format_exc())
             return []
             
+    def detect_faces_in_images(self, images, batch_size=16):
+        """
+        Detect faces in several decoded images with batched model calls
+        
+        Args:
+            images (list): Images as numpy.ndarray (BGR)
+            batch_size (int): Images passed to the model per call
+        
+        Returns:
+            list: One list of 160x160 face crops per input image
+        """
+        faces_per_image = []
+        for start in range(0, len(images), batch_size):
+            batch = images[start:start + batch_size]
+            try:
+                results = self.model(batch, verbose=False)
+            except Exception as e:
+                self.logger.error(f"Batch face detection error: {e}")
+                faces_per_image.extend([] for _ in batch)
+                continue
+
+            for image, r in zip(batch, results):
+                faces = []
+                for box in r.boxes:
+                    x1, y1, x2, y2 = map(int, box.xyxy[0])
+                    if x2 <= x1 or y2 <= y1:
+                        continue
+                    face = image[y1:y2, x1:x2]
+                    if face.size > 0:
+                        faces.append(cv2.resize(face, (160, 160)))
+                faces_per_image.append(faces)
+        
+        self.logger.info(f"Detected faces in {sum(1 for f in faces_per_image if f)} of {len(images)} images")
+        return faces_per_image
+
     def detect_faces_in_webcam(self, duration=0, similarity_callback=None):
         """
         Detect faces from webcam feed with real-time processing
@@ -215,7 +250,7 @@ class FaceDetector:
             return []
 
 def detect_faces(input_path, is_video=False, is_webcam=False, output_path=None, webcam_duration=0, 
-                similarity_callback=None):
+                similarity_callback=None, detector=None):
     """
     Unified face detection function with enhanced logging and webcam support
     
@@ -226,11 +261,13 @@ def detect_faces(input_path, is_video=False, is_webcam=False, output_path=None,
         output_path (str, optional): Path to save output video
         webcam_duration (int): Duration in seconds for webcam (0 for indefinite)
         similarity_callback (function): Callback for processing detected faces
+        detector (FaceDetector, optional): Already loaded detector to reuse
         
     Returns:
         list: Detected face images
     """
-    detector = FaceDetector()
+    if detector is None:
+        detector = FaceDetector()
     
     if is_webcam:
         # Webcam processing
@@ -20,12 +20,24 @@ from vector_store import add_embedding_to_faiss, search_faiss
 from database import (
     insert_child_metadata,
     get_child_by_embedding_id,
+    get_children_by_embedding_ids,
     update_case_status,
-    initialize_database
+    close_cases,
+    purge_cases,
+    initialize_database,
+    get_open_cases_page,
+    count_open_cases,
+    search_open_cases_by_name,
+    count_open_cases_by_name,
+    get_guardian_contacts_by_name
 )
-from storage import store_encrypted_image, retrieve_encrypted_image
-from config import IMAGE_STORAGE_PATH
+from storage import store_encrypted_image, retrieve_thumbnail_to_memory, image_reference, stored_image_exists
+from config import CASE_PAGE_SIZE
 from notification import notify_guardian_async
+from sightings import record_sightings
+from index_outbox import get_index_outbox_applier
+from case_archive import get_case_archiver
+from image_reaper import get_image_reaper
 
 class SignupFrame(tk.Frame):
      def __init__(self, master, switch_to_login):
@@ -257,6 +269,15 @@ class ChildSafetyApp(tk.Tk):
         # Initialize database
         initialize_database()
 
+        # Apply tombstones left in the index outbox by closes that were not applied yet
+        get_index_outbox_applier()
+
+        # Move resolved and closed cases out of the open-case table in the background
+        get_case_archiver()
+
+        # Free the space of images shredded by earlier cleanups
+        get_image_reaper()
+
         # Check for scheduled cleanup
         self.check_for_scheduled_cleanup()
         
@@ -304,40 +325,11 @@ class ChildSafetyApp(tk.Tk):
         
     def get_all_guardian_contacts(self, child_name):
         """Get all guardian contacts registered for a child with the same name"""
-        try:
-            # Create a database connection
-            from database import create_connection
-            conn = create_connection()
-            if not conn:
-                return []
-                
-            cursor = conn.cursor(dictionary=True)
-            
-            # Query to find all guardian contacts for a child with the same name
-            query = "SELECT guardian_contact FROM Children_Metadata WHERE name = %s AND case_status = 'Open'"
-            cursor.execute(query, (child_name,))
-            
-            # Get all results
-            results = cursor.fetchall()
-            
-            # Extract guardian contacts
-            guardian_contacts = [result['guardian_contact'] for result in results]
-            
-            # Remove duplicates while preserving order
-            unique_contacts = []
-            for contact in guardian_contacts:
-                if contact not in unique_contacts:
-                    unique_contacts.append(contact)
-            
-            conn.close()
-            return unique_contacts
-            
-        except Exception as e:
-            print(f"Error getting guardian contacts: {e}")
-            return []
+        return get_guardian_contacts_by_name(child_name)
 
     def cleanup_temp_files(self):
         """Remove all temporary files when closing the application"""
+        # temp_decrypts is no longer written; it is still emptied of plaintext left by older versions
         temp_dirs = ["temp_captures", "temp_decrypts"]
         for temp_dir in temp_dirs:
             if os.path.exists(temp_dir):
@@ -446,40 +438,6 @@ class ChildSafetyApp(tk.Tk):
 
     # Add this function to your gui.py file
 
-    def get_all_guardian_contacts(self, child_name):
-        """Get all guardian contacts registered for a child with the same name"""
-        try:
-            # Create a database connection
-            from database import create_connection
-            conn = create_connection()
-            if not conn:
-                return []
-                
-            cursor = conn.cursor(dictionary=True)
-            
-            # Query to find all guardian contacts for a child with the same name
-            query = "SELECT guardian_contact FROM Children_Metadata WHERE name = %s AND case_status = 'Open'"
-            cursor.execute(query, (child_name,))
-            
-            # Get all results
-            results = cursor.fetchall()
-            
-            # Extract guardian contacts
-            guardian_contacts = [result['guardian_contact'] for result in results]
-            
-            # Remove duplicates while preserving order
-            unique_contacts = []
-            for contact in guardian_contacts:
-                if contact not in unique_contacts:
-                    unique_contacts.append(contact)
-            
-            conn.close()
-            return unique_contacts
-            
-        except Exception as e:
-            print(f"Error getting guardian contacts: {e}")
-            return []
-
     def notify_identified_guardian(self):
         """Notify all guardians of the currently identified child"""
         # First check if we have identification results
@@ -751,40 +709,6 @@ class ChildSafetyApp(tk.Tk):
         # Image path variable
         self.register_image_path = None
     
-    def get_all_guardian_contacts(self, child_name):
-        """Get all guardian contacts registered for a child with the same name"""
-        try:
-            # Create a database connection
-            from database import create_connection
-            conn = create_connection()
-            if not conn:
-                return []
-                
-            cursor = conn.cursor(dictionary=True)
-            
-            # Query to find all guardian contacts for a child with the same name
-            query = "SELECT guardian_contact FROM Children_Metadata WHERE name = %s AND case_status = 'Open'"
-            cursor.execute(query, (child_name,))
-            
-            # Get all results
-            results = cursor.fetchall()
-            
-            # Extract guardian contacts
-            guardian_contacts = [result['guardian_contact'] for result in results]
-            
-            # Remove duplicates while preserving order
-            unique_contacts = []
-            for contact in guardian_contacts:
-                if contact not in unique_contacts:
-                    unique_contacts.append(contact)
-            
-            conn.close()
-            return unique_contacts
-            
-        except Exception as e:
-            print(f"Error getting guardian contacts: {e}")
-            return []
-
     def notify_identified_guardian(self):
         """Notify all guardians of the currently identified child"""
         # First check if we have identification results
@@ -1180,20 +1104,41 @@ class ChildSafetyApp(tk.Tk):
         clear_filter_btn = ttk.Button(search_filter_frame, text="Clear Filter", command=self.refresh_cases)
         clear_filter_btn.pack(side="left", padx=5, pady=5)
 
+        # Close every selected case at once (Ctrl/Shift-click to select several) — Developer only
+        if self.role == "Developer":
+            close_selected_btn = ttk.Button(
+                search_filter_frame,
+                text="Close Selected Cases",
+                command=self.close_selected_case
+            )
+            close_selected_btn.pack(side="right", padx=5, pady=5)
+
         # Treeview
-        cases_frame = ttk.LabelFrame(self.case_tab, text="Open Cases")
-        cases_frame.pack(padx=10, pady=10, fill="both", expand=True)
+        self.cases_frame = ttk.LabelFrame(self.case_tab, text="Open Cases")
+        self.cases_frame.pack(padx=10, pady=10, fill="both", expand=True)
         
-        # Create treeview for open cases
+        # Create treeview for open cases; pages are fetched as the user scrolls
         columns = ("ID", "Name", "Age", "Gender", "Guardian Contact", "Last Known Location")
-        self.cases_tree = ttk.Treeview(cases_frame, columns=columns, show="headings")
+        self.cases_scrollbar = ttk.Scrollbar(self.cases_frame, orient="vertical")
+        self.cases_tree = ttk.Treeview(self.cases_frame, columns=columns, show="headings",
+                                       selectmode="extended", yscrollcommand=self.on_cases_scrolled)
+        self.cases_scrollbar.config(command=self.cases_tree.yview)
         
         # Define headings
         for col in columns:
             self.cases_tree.heading(col, text=col)
             self.cases_tree.column(col, width=100)
         
+        self.cases_scrollbar.pack(side="right", fill="y", pady=5)
         self.cases_tree.pack(padx=5, pady=5, fill="both", expand=True)
+        
+        # Keyset paging state for the case list (full list or name search)
+        self.cases_fetch_page = None
+        self.cases_cursor = None
+        self.cases_cursor_of = None
+        self.cases_total = 0
+        self.cases_has_more = False
+        self.cases_loading = False
         self.cases_tree.bind("<Double-1>", self.on_case_selected)
 
     def close_searched_case(self):
@@ -1261,7 +1206,7 @@ class ChildSafetyApp(tk.Tk):
                 options_dialog.destroy()
                 
                 # Get case details to check if it exists and is open
-                child_details = get_child_by_embedding_id(int(embedding_id))
+                child_details = get_child_by_embedding_id(int(embedding_id), include_history=True)
                 
                 if not child_details:
                     messagebox.showerror("Error", "Case not found")
@@ -1284,7 +1229,8 @@ class ChildSafetyApp(tk.Tk):
                     if not confirm:
                         return
                     
-                    if update_case_status(embedding_id, "Closed", delete_after_days=0):
+                    results = purge_cases([int(embedding_id)])
+                    if results.get(int(embedding_id)) == "deleted":
                         messagebox.showinfo("Success", "Case closed and deleted successfully")
                         # Clear the case details
                         self.case_details_text.delete("1.0", tk.END)
@@ -1355,12 +1301,8 @@ class ChildSafetyApp(tk.Tk):
                 return
             
             # Check if all cases are already closed
-            all_closed = True
-            for eid in embedding_ids:
-                child = get_child_by_embedding_id(int(eid))
-                if child and child['case_status'] == "Open":
-                    all_closed = False
-                    break
+            children = get_children_by_embedding_ids(embedding_ids)
+            all_closed = not any(child['case_status'] == "Open" for child in children.values())
             
             if all_closed:
                 messagebox.showinfo("Info", "All identified cases are already closed")
@@ -1436,15 +1378,16 @@ class ChildSafetyApp(tk.Tk):
                     if not confirm:
                         return
                 
-                # Close all the cases
-                success_count = 0
-                delete_after_days = 0 if option == "immediate" else 30
-                
-                for eid in embedding_ids:
-                    child = get_child_by_embedding_id(int(eid))
-                    if child and child['case_status'] == "Open":
-                        if update_case_status(eid, "Closed", delete_after_days=delete_after_days):
-                            success_count += 1
+                # Close (or delete) all the open cases in one transaction
+                children = get_children_by_embedding_ids(embedding_ids)
+                open_ids = [int(eid) for eid in embedding_ids
+                            if children.get(int(eid)) and children[int(eid)]['case_status'] == "Open"]
+                if option == "immediate":
+                    results = purge_cases(open_ids)
+                    success_count = sum(1 for result in results.values() if result == "deleted")
+                else:
+                    results = close_cases(open_ids, "Closed")
+                    success_count = sum(1 for result in results.values() if result == "updated")
                 
                 if success_count > 0:
                     messagebox.showinfo(
@@ -1781,11 +1724,11 @@ class ChildSafetyApp(tk.Tk):
                     continue
                 
                 # Search for matches
-                matches = search_faiss(embedding, top_k=5, similarity_threshold=0.50)
+                scored_matches = search_faiss(embedding, top_k=5, similarity_threshold=0.50, with_scores=True)
+                record_sightings(scored_matches, f"gui:{self.identify_input_path}", embedding=embedding)
                 
-                if matches[0] != -1:
-                    # Add matches to the unique set
-                    unique_matches.update(matches)
+                # Add matches to the unique set
+                unique_matches.update(embedding_id for embedding_id, _ in scored_matches)
             
             if unique_matches:
                 # Convert to list and sort for consistent output
@@ -1796,12 +1739,15 @@ class ChildSafetyApp(tk.Tk):
                 # Track already printed child IDs
                 printed_child_ids = set()
                 
+                # Retrieve all child details in one round-trip; reused for the image grid below
+                children = get_children_by_embedding_ids(sorted_matches)
+                
                 for embedding_id in sorted_matches:
                     # Convert numpy.int64 to regular integer
                     embedding_id = int(embedding_id)
                     
                     # Retrieve child details
-                    child_details = get_child_by_embedding_id(embedding_id)
+                    child_details = children.get(embedding_id)
                     
                     if child_details and child_details['child_id'] not in printed_child_ids:
                         results += f"Child ID: {child_details['child_id']}\n"
@@ -1833,7 +1779,7 @@ class ChildSafetyApp(tk.Tk):
                     # Display all match images
                     for i, embedding_id in enumerate(sorted_matches):
                         # Get child details
-                        child_details = get_child_by_embedding_id(int(embedding_id))
+                        child_details = children.get(int(embedding_id))
                         if not child_details:
                             continue
                             
@@ -1867,7 +1813,8 @@ class ChildSafetyApp(tk.Tk):
         try:
             embedding_id = int(self.embedding_id_entry.get().strip())
             
-            child_details = get_child_by_embedding_id(embedding_id)
+            # Searching by ID also finds resolved and closed cases that have been archived
+            child_details = get_child_by_embedding_id(embedding_id, include_history=True)
             
             if child_details:
                 details = f"Child ID: {child_details['child_id']}\n"
@@ -1913,43 +1860,24 @@ class ChildSafetyApp(tk.Tk):
             self.notify_guardian_details_btn.config(state="disabled")
     
     def refresh_cases(self):
-        """Refresh the list of open cases"""
+        """Refresh the list of open cases, loading only the first page"""
         try:
             # Clear search entry
             if hasattr(self, 'case_search_entry'):
                 self.case_search_entry.delete(0, tk.END)
             
-            # Clear existing cases
-            for item in self.cases_tree.get_children():
-                self.cases_tree.delete(item)
-            
-            # Import the search_open_cases function
-            from database import search_open_cases
-            
-            # Get open cases
-            open_cases = search_open_cases()
-            
-            # Populate tree
-            for case in open_cases:
-                self.cases_tree.insert(
-                    "", "end",
-                    values=(
-                        case['child_id'],
-                        case['name'],
-                        case['age'],
-                        case['gender'],
-                        case['guardian_contact'],
-                        case['last_known_location'] or "N/A"
-                    ),
-                    tags=(str(case['embedding_id']),)  # Store embedding_id as a tag
-                )
+            self.start_case_listing(
+                lambda cursor: get_open_cases_page(cursor or 0, CASE_PAGE_SIZE),
+                lambda case: case['child_id'],
+                count_open_cases()
+            )
         
         except Exception as e:
             messagebox.showerror("Error", f"Error refreshing cases: {e}")
 
     def filter_cases(self):
-        """Filter cases by name (case-insensitive)"""
-        search_term = self.case_search_entry.get().strip().lower()
+        """Filter cases by name prefix (case-insensitive), searched in the database"""
+        search_term = self.case_search_entry.get().strip()
         
         if not search_term:
             # If search term is empty, just refresh all cases
@@ -1957,21 +1885,49 @@ class ChildSafetyApp(tk.Tk):
             return
         
         try:
-            # Clear existing cases in the treeview
-            for item in self.cases_tree.get_children():
-                self.cases_tree.delete(item)
-            
-            # Import the search_open_cases function
-            from database import search_open_cases
-            
-            # Get all open cases first
-            open_cases = search_open_cases()
+            total = count_open_cases_by_name(search_term)
+            self.start_case_listing(
+                lambda cursor: search_open_cases_by_name(search_term, cursor, CASE_PAGE_SIZE),
+                lambda case: (case['name_normalized'], case['child_id']),
+                total
+            )
             
-            # Filter cases by name (case-insensitive)
-            filtered_cases = [case for case in open_cases if search_term in case['name'].lower()]
+            # Show feedback on results
+            if total == 0:
+                messagebox.showinfo("Search Results", "No matching cases found")
+        
+        except Exception as e:
+            messagebox.showerror("Error", f"Error filtering cases: {e}")
+
+    def start_case_listing(self, fetch_page, cursor_of, total):
+        """
+        Clear the case list and load the first page from a keyset-paged query
+        
+        Args:
+            fetch_page (callable): Returns the page after a cursor (None for the first page)
+            cursor_of (callable): Builds the cursor from the last row of a page
+            total (int): Number of rows the query can return
+        """
+        for item in self.cases_tree.get_children():
+            self.cases_tree.delete(item)
+        
+        self.cases_fetch_page = fetch_page
+        self.cases_cursor_of = cursor_of
+        self.cases_cursor = None
+        self.cases_total = total
+        self.cases_has_more = True
+        self.load_next_cases_page()
+
+    def load_next_cases_page(self):
+        """Append the next page of cases to the tree"""
+        if self.cases_loading or not self.cases_has_more:
+            return
+        
+        self.cases_loading = True
+        try:
+            cases = self.cases_fetch_page(self.cases_cursor)
             
-            # Populate tree with filtered cases
-            for case in filtered_cases:
+            for case in cases:
                 self.cases_tree.insert(
                     "", "end",
                     values=(
@@ -1985,12 +1941,26 @@ class ChildSafetyApp(tk.Tk):
                     tags=(str(case['embedding_id']),)  # Store embedding_id as a tag
                 )
             
-            # Show feedback on results
-            if not filtered_cases:
-                messagebox.showinfo("Search Results", "No matching cases found")
+            if cases:
+                self.cases_cursor = self.cases_cursor_of(cases[-1])
+            # A short page means we have reached the end
+            self.cases_has_more = len(cases) == CASE_PAGE_SIZE
+            
+            loaded = len(self.cases_tree.get_children())
+            self.cases_frame.config(text=f"Open Cases ({loaded} of {max(self.cases_total, loaded)} loaded)")
         
         except Exception as e:
-            messagebox.showerror("Error", f"Error filtering cases: {e}")
+            self.cases_has_more = False
+            messagebox.showerror("Error", f"Error loading cases: {e}")
+        finally:
+            self.cases_loading = False
+
+    def on_cases_scrolled(self, first, last):
+        """Keep the scrollbar in sync and fetch another page near the bottom of the list"""
+        self.cases_scrollbar.set(first, last)
+        if self.cases_has_more and float(last) >= 0.9:
+            # Defer so the tree finishes its own redraw before rows are appended
+            self.after_idle(self.load_next_cases_page)
     
     def on_case_selected(self, event):
         """Handle case selection event"""
@@ -2004,31 +1974,42 @@ class ChildSafetyApp(tk.Tk):
         self.search_case()
     
     def close_selected_case(self):
-        """Close the selected case"""
+        """Close every selected case in one transaction"""
         selected_items = self.cases_tree.selection()
         
         if not selected_items:
-            messagebox.showinfo("Info", "Please select a case to close")
+            messagebox.showinfo("Info", "Please select one or more cases to close")
             return
         
-        selected_item = selected_items[0]
-        embedding_id = self.cases_tree.item(selected_item, "tags")[0]
+        embedding_ids = [int(self.cases_tree.item(item, "tags")[0]) for item in selected_items]
+        names = {int(self.cases_tree.item(item, "tags")[0]): self.cases_tree.item(item, "values")[1]
+                 for item in selected_items}
         
         # Confirm before closing
         confirm = messagebox.askyesno(
             "Confirm",
-            "Are you sure you want to close this case? This action cannot be undone."
+            f"Are you sure you want to close {len(embedding_ids)} case(s)? This action cannot be undone."
         )
         
-        if confirm:
-            # Close the case
-            from database import update_case_status
-            
-            if update_case_status(embedding_id, "Closed"):
-                messagebox.showinfo("Success", "Case closed successfully")
-                self.refresh_cases()
-            else:
-                messagebox.showerror("Error", "Failed to close case")
+        if not confirm:
+            return
+        
+        results = close_cases(embedding_ids, "Closed")
+        closed = [eid for eid, result in results.items() if result in ("updated", "unchanged")]
+        failed = [eid for eid, result in results.items() if result not in ("updated", "unchanged")]
+        
+        if failed:
+            details = "\n".join(f"{names.get(eid, '')} (ID: {eid}): {results[eid].replace('_', ' ')}"
+                                for eid in failed)
+            messagebox.showerror(
+                "Error",
+                f"Closed {len(closed)} of {len(results)} case(s). These could not be closed:\n{details}"
+            )
+        else:
+            messagebox.showinfo("Success", f"Closed {len(closed)} case(s) successfully")
+        
+        if closed:
+            self.refresh_cases()
     
     def clear_register_form(self):
         """Clear registration form fields"""
@@ -2044,27 +2025,15 @@ class ChildSafetyApp(tk.Tk):
     def retrieve_and_display_image(self, embedding_id, target_label):
         """Retrieve and display an encrypted image"""
         try:
-            # Generate encrypted image path
-            encrypted_path = os.path.join(IMAGE_STORAGE_PATH, f"{embedding_id}.enc")
+            # Reference to the encrypted image in whichever image store is configured
+            encrypted_path = image_reference(embedding_id)
             
-            if not os.path.exists(encrypted_path):
+            if not stored_image_exists(encrypted_path):
                 target_label.config(text="Image not found", image="")
                 return False
             
-            # Create temp directory for decryption
-            temp_dir = "temp_decrypts"
-            os.makedirs(temp_dir, exist_ok=True)
-            
-            # Generate temp file for decrypted image
-            temp_path = os.path.join(temp_dir, f"temp_{embedding_id}.jpg")
-            
-            # Decrypt the image
-            from storage import retrieve_encrypted_image
-            retrieve_encrypted_image(encrypted_path, temp_path)
-            
-            # Display the image
-            image = Image.open(temp_path)
-            image = self.resize_image(image, 200)  # Smaller size for multiple images
+            # Decrypt the small pre-rendered thumbnail in memory; no plaintext copy touches disk
+            image = Image.open(retrieve_thumbnail_to_memory(encrypted_path, 200))  # Smaller size for multiple images
             photo = ImageTk.PhotoImage(image)
             target_label.config(image=photo)
             target_label.image = photo  # Keep a reference
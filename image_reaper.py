@@ -0,0 +1,127 @@
+import atexit
+import logging
+import threading
+from config import RECLAIM_INTERVAL
+from image_stores import get_image_store
+
+class ImageReaper:
+    def __init__(self, store=None, interval=RECLAIM_INTERVAL):
+        """
+        Background remover of the ciphertext left behind by shredded images
+
+        delete_stored_image() in shred mode destroys an image's data key and
+        discards it from the store, which makes it unreadable at once; freeing
+        its bytes (unlinking the files, or compacting the pack) happens here,
+        off the cleanup path. Discarded blobs are found by scanning the store,
+        so whatever a stopped process left behind is freed by the next one.
+
+        Args:
+            store (ImageStore, optional): Store to reclaim (defaults to the configured one)
+            interval (float): Seconds between passes
+        """
+        self.store = store
+        self.interval = interval
+
+        self.wakeup = threading.Event()
+        self.stopped = threading.Event()
+        self.pass_lock = threading.Lock()
+        self.stats_lock = threading.Lock()
+
+        self.stats = {"reclaimed_bytes": 0, "passes": 0, "failed_passes": 0}
+
+        self.wakeup.set()
+        self.thread = threading.Thread(target=self._run, name="image-reaper", daemon=True)
+        self.thread.start()
+        atexit.register(self.close)
+
+    def notify(self):
+        """
+        Wake the reaper after images were shredded
+        """
+        self.wakeup.set()
+
+    def run_once(self):
+        """
+        Free the space of every discarded image
+
+        Returns:
+            int: Bytes freed
+        """
+        with self.pass_lock:
+            try:
+                freed = (self.store or get_image_store()).reclaim()
+            except Exception as e:
+                logging.error(f"Image reaper error: {e}")
+                with self.stats_lock:
+                    self.stats["failed_passes"] += 1
+                return 0
+        with self.stats_lock:
+            self.stats["reclaimed_bytes"] += freed
+            self.stats["passes"] += 1
+        if freed:
+            logging.info(f"Reclaimed {freed} bytes of shredded images")
+        return freed
+
+    def _run(self):
+        while not self.stopped.is_set():
+            self.wakeup.wait(self.interval)
+            self.wakeup.clear()
+            if self.stopped.is_set():
+                break
+            self.run_once()
+
+    def close(self):
+        """
+        Stop the reaper thread and free what is left
+        """
+        if self.stopped.is_set():
+            return
+        self.stopped.set()
+        self.wakeup.set()
+        self.thread.join(timeout=5)
+        self.run_once()
+
+    def get_stats(self):
+        """
+        Report reaper activity
+
+        Returns:
+            dict: Bytes freed and pass counts
+        """
+        with self.stats_lock:
+            return dict(self.stats)
+
+_reaper = None
+_reaper_lock = threading.Lock()
+
+def get_image_reaper():
+    """
+    Get the process-wide image reaper, starting its thread on first use
+
+    Returns:
+        ImageReaper: Shared reaper
+    """
+    global _reaper
+    with _reaper_lock:
+        if _reaper is None:
+            _reaper = ImageReaper()
+        return _reaper
+
+# Utility functions
+def notify_image_reaper():
+    """
+    Convenience function to have shredded images freed in the background
+    """
+    try:
+        get_image_reaper().notify()
+    except Exception as e:
+        logging.error(f"Error starting image reaper: {e}")
+
+def reclaim_shredded_images():
+    """
+    Convenience function to free the space of shredded images now
+
+    Returns:
+        int: Bytes freed
+    """
+    return get_image_reaper().run_once()
@@ -0,0 +1,716 @@
+import contextlib
+import hashlib
+import io
+import logging
+import os
+import shutil
+import sqlite3
+import struct
+import tempfile
+import threading
+try:
+    import fcntl
+except ImportError:
+    # Windows
+    fcntl = None
+    import msvcrt
+from config import (
+    IMAGE_STORE_BACKEND,
+    IMAGE_STORAGE_PATH,
+    IMAGE_SHARD_DEPTH,
+    IMAGE_PACK_DIR,
+    SECURE_DELETE_PASSES,
+    SECURE_DELETE_CHUNK_SIZE,
+    PACK_RECLAIM_FRACTION
+)
+
+# Record framing in a pack file: magic + name length (uint16) + data length (uint64) + name + data.
+# Deleting a blob rewrites its magic, so rebuild_index() never brings it back.
+PACK_RECORD_MAGIC = b"CSPK"
+PACK_DELETED_MAGIC = b"CSPX"
+PACK_RECORD_HEADER = struct.Struct(">4sHQ")
+
+# File stores rename discarded blobs to this suffix until reclaim() unlinks them
+DISCARDED_SUFFIX = ".shredded"
+
+def overwrite_range(f, offset, size, passes=SECURE_DELETE_PASSES, chunk_size=SECURE_DELETE_CHUNK_SIZE):
+    """
+    Overwrite part of an open file with random data, one fixed-size chunk at a time
+
+    Args:
+        f: File object opened for update ('r+b')
+        offset (int): First byte to overwrite
+        size (int): Number of bytes to overwrite
+        passes (int): Number of overwrite passes, each flushed to disk before the next
+        chunk_size (int): Bytes of random data written per call
+    """
+    for _ in range(passes):
+        f.seek(offset)
+        remaining = size
+        while remaining > 0:
+            length = min(chunk_size, remaining)
+            f.write(os.urandom(length))
+            remaining -= length
+        f.flush()
+        os.fsync(f.fileno())
+
+def _lock_file(f):
+    """
+    Take an exclusive lock on an open file, waiting for other holders in any process
+    """
+    if fcntl:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        return
+    f.seek(0)
+    while True:
+        try:
+            # LK_LOCK gives up after about 10 seconds; keep waiting
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+            return
+        except OSError:
+            continue
+
+class _BlobWindow(io.RawIOBase):
+    """
+    Seekable view of one blob inside a pack file, so readers see it as a file of its own
+    """
+    def __init__(self, f, offset, length):
+        self.f = f
+        self.offset = offset
+        self.length = length
+        self.position = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def writable(self):
+        return "+" in self.f.mode
+
+    def seek(self, position, whence=os.SEEK_SET):
+        if whence == os.SEEK_CUR:
+            position += self.position
+        elif whence == os.SEEK_END:
+            position += self.length
+        self.position = max(0, position)
+        return self.position
+
+    def tell(self):
+        return self.position
+
+    def read(self, size=-1):
+        remaining = max(self.length - self.position, 0)
+        size = remaining if size is None or size < 0 else min(size, remaining)
+        if size == 0:
+            return b""
+        self.f.seek(self.offset + self.position)
+        data = self.f.read(size)
+        self.position += len(data)
+        return data
+
+    def readinto(self, buffer):
+        data = self.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+    def write(self, data):
+        # In-place updates only; a blob never grows
+        if self.position + len(data) > self.length:
+            raise ValueError("Write past the end of a packed blob")
+        self.f.seek(self.offset + self.position)
+        self.f.write(data)
+        self.position += len(data)
+        return len(data)
+
+    def fileno(self):
+        return self.f.fileno()
+
+    def flush(self):
+        self.f.flush()
+
+    def close(self):
+        if not self.closed:
+            super().close()
+            self.f.close()
+
+class ImageStore:
+    """
+    Where encrypted images live
+
+    storage.py names each blob ("123.enc", "123.thumb200.enc") and streams the
+    encrypted bytes through open_write()/open_read(); a store decides where
+    those bytes go. The location() of a blob is what Children_Metadata.image_url
+    records; stores resolve references by blob name, so rows written under
+    one layout keep working after migrating to another.
+    """
+    name = None
+
+    def location(self, blob_name):
+        """
+        Reference recorded for a blob (a file path for file-based stores)
+        """
+        raise NotImplementedError
+
+    def exists(self, blob_name):
+        raise NotImplementedError
+
+    def open_read(self, blob_name):
+        """
+        Open a blob for reading
+
+        Returns:
+            Seekable binary file object (use as a context manager)
+
+        Raises:
+            FileNotFoundError: If the blob does not exist
+        """
+        raise NotImplementedError
+
+    def open_write(self, blob_name):
+        """
+        Context manager yielding a writable binary file object for a new blob
+
+        The blob becomes visible, replacing any previous one with the same
+        name, only when the block exits without an exception.
+        """
+        raise NotImplementedError
+
+    def open_update(self, blob_name):
+        """
+        Context manager yielding an existing blob opened for in-place rewrites of some of its
+        bytes (its length cannot change)
+
+        Updates of the same blob are serialised across threads and processes
+        for as long as the block runs, so a read-check-write inside it (key
+        rotation, crypto-shredding) cannot interleave with another.
+
+        Raises:
+            FileNotFoundError: If the blob does not exist
+        """
+        raise NotImplementedError
+
+    def delete(self, blob_name, passes=0):
+        """
+        Remove a blob, optionally overwriting its bytes in place first
+
+        Returns:
+            bool: True if the blob was removed or did not exist
+        """
+        raise NotImplementedError
+
+    def discard(self, blob_name):
+        """
+        Remove a blob from the store at once, leaving its bytes for reclaim() to free
+
+        Meant for blobs whose contents were already made unreadable (a
+        destroyed data key), so only the cheap part of a delete happens inline.
+
+        Returns:
+            bool: True if the blob was discarded or did not exist
+        """
+        return self.delete(blob_name)
+
+    def reclaim(self):
+        """
+        Free the space held by discarded blobs
+
+        Returns:
+            int: Bytes freed
+        """
+        return 0
+
+    def names(self):
+        """
+        Iterate over the names of all stored blobs
+        """
+        raise NotImplementedError
+
+    def stats(self):
+        return {"store": self.name}
+
+class FileImageStore(ImageStore):
+    """
+    One file per blob; subclasses choose the path
+    """
+    def __init__(self, root=IMAGE_STORAGE_PATH):
+        self.root = root
+
+    def path(self, blob_name):
+        raise NotImplementedError
+
+    def location(self, blob_name):
+        return self.path(blob_name)
+
+    def exists(self, blob_name):
+        return os.path.exists(self.path(blob_name))
+
+    def open_read(self, blob_name):
+        return open(self.path(blob_name), 'rb')
+
+    @contextlib.contextmanager
+    def open_update(self, blob_name):
+        with open(self.path(blob_name), 'r+b') as f:
+            # Released when the file is closed
+            _lock_file(f)
+            yield f
+
+    @contextlib.contextmanager
+    def open_write(self, blob_name):
+        path = self.path(blob_name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Written under a temporary name so a reader never sees a half-written file
+        temp_path = f"{path}.part"
+        try:
+            with open(temp_path, 'wb') as f:
+                yield f
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def delete(self, blob_name, passes=0):
+        path = self.path(blob_name)
+        try:
+            if passes:
+                with open(path, 'r+b') as f:
+                    overwrite_range(f, 0, os.fstat(f.fileno()).st_size, passes)
+            os.remove(path)
+            return True
+        except FileNotFoundError:
+            return True
+        except OSError as e:
+            logging.error(f"Error deleting {path}: {e}")
+            return False
+
+    def discard(self, blob_name):
+        path = self.path(blob_name)
+        try:
+            os.replace(path, path + DISCARDED_SUFFIX)
+            return True
+        except FileNotFoundError:
+            return True
+        except OSError as e:
+            logging.error(f"Error discarding {path}: {e}")
+            return False
+
+    def reclaim(self):
+        freed = 0
+        for directory, _, files in os.walk(self.root):
+            for filename in files:
+                if not filename.endswith(DISCARDED_SUFFIX):
+                    continue
+                path = os.path.join(directory, filename)
+                try:
+                    size = os.path.getsize(path)
+                    os.remove(path)
+                    freed += size
+                except FileNotFoundError:
+                    continue
+                except OSError as e:
+                    logging.error(f"Error removing discarded image {path}: {e}")
+        return freed
+
+    def _is_blob(self, filename):
+        return filename.endswith(".enc")
+
+class FlatImageStore(FileImageStore):
+    """
+    Every blob directly in IMAGE_STORAGE_PATH (the original layout)
+    """
+    name = "flat"
+
+    def path(self, blob_name):
+        return os.path.join(self.root, blob_name)
+
+    def names(self):
+        with os.scandir(self.root) as entries:
+            for entry in entries:
+                if entry.is_file() and self._is_blob(entry.name):
+                    yield entry.name
+
+class ShardedImageStore(FileImageStore):
+    """
+    Blobs spread over hash-named subdirectories (root/ab/cd/123.enc for depth 2)
+
+    The hash is taken over the part of the name before the first dot, so an
+    image and its thumbnails share a directory.
+    """
+    name = "sharded"
+
+    def __init__(self, root=IMAGE_STORAGE_PATH, depth=IMAGE_SHARD_DEPTH):
+        super().__init__(root)
+        self.depth = depth
+
+    def path(self, blob_name):
+        digest = hashlib.sha256(blob_name.split(".", 1)[0].encode()).hexdigest()
+        shards = [digest[2 * level:2 * level + 2] for level in range(self.depth)]
+        return os.path.join(self.root, *shards, blob_name)
+
+    def names(self):
+        def walk(directory, level):
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if level < self.depth:
+                        if entry.is_dir() and len(entry.name) == 2:
+                            yield from walk(entry.path, level + 1)
+                    elif entry.is_file() and self._is_blob(entry.name):
+                        yield entry.name
+        yield from walk(self.root, 0)
+
+class PackedImageStore(ImageStore):
+    """
+    Blobs appended to one pack file, located through an SQLite offset index
+
+    A few large files instead of one inode per image, and backups read the
+    pack sequentially. Writers append under the index's write lock, so
+    several processes can share a pack. Replaced and deleted blobs leave dead
+    bytes behind until compact() rewrites the pack.
+    """
+    name = "packed"
+
+    def __init__(self, directory=IMAGE_PACK_DIR):
+        self.directory = directory
+        self.index_path = os.path.join(directory, "index.db")
+        self._local = threading.local()
+        os.makedirs(directory, exist_ok=True)
+
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS Blobs ("
+            "name TEXT PRIMARY KEY, record_offset INTEGER NOT NULL, "
+            "data_offset INTEGER NOT NULL, length INTEGER NOT NULL)"
+        )
+        conn.execute("CREATE TABLE IF NOT EXISTS Pack_Meta (id INTEGER PRIMARY KEY CHECK (id = 1), generation INTEGER)")
+        conn.execute("INSERT OR IGNORE INTO Pack_Meta (id, generation) VALUES (1, 0)")
+        conn.commit()
+
+    def _connect(self):
+        # One connection per thread; the index is read on every blob access
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # Autocommit; writers take the write lock explicitly with BEGIN IMMEDIATE
+            conn = sqlite3.connect(self.index_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def _pack_path(self, generation):
+        return os.path.join(self.directory, f"pack-{generation}.bin")
+
+    def _generation(self, conn):
+        return conn.execute("SELECT generation FROM Pack_Meta").fetchone()[0]
+
+    def location(self, blob_name):
+        return blob_name
+
+    def exists(self, blob_name):
+        conn = self._connect()
+        return conn.execute("SELECT 1 FROM Blobs WHERE name = ?", (blob_name,)).fetchone() is not None
+
+    def _open_blob(self, blob_name, mode):
+        conn = self._connect()
+        for attempt in range(2):
+            row = conn.execute(
+                "SELECT data_offset, length, (SELECT generation FROM Pack_Meta) FROM Blobs WHERE name = ?",
+                (blob_name,)
+            ).fetchone()
+            if row is None:
+                raise FileNotFoundError(f"No packed blob named {blob_name}")
+            data_offset, length, generation = row
+            try:
+                return _BlobWindow(open(self._pack_path(generation), mode), data_offset, length)
+            except FileNotFoundError:
+                # compact() switched packs between the lookup and the open; look up again
+                if attempt:
+                    raise
+
+    def open_read(self, blob_name):
+        return self._open_blob(blob_name, 'rb')
+
+    @contextlib.contextmanager
+    def open_update(self, blob_name):
+        # Holding the write lock keeps compact() from copying the blob while it is
+        # changed, and serialises updates of the same blob
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT data_offset, length, (SELECT generation FROM Pack_Meta) FROM Blobs WHERE name = ?",
+                (blob_name,)
+            ).fetchone()
+            if row is None:
+                raise FileNotFoundError(f"No packed blob named {blob_name}")
+            data_offset, length, generation = row
+            with _BlobWindow(open(self._pack_path(generation), 'r+b'), data_offset, length) as window:
+                yield window
+        finally:
+            conn.rollback()
+
+    @contextlib.contextmanager
+    def open_write(self, blob_name):
+        # Encrypt into a spool first so the pack is only locked for the copy
+        with tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024, dir=self.directory) as spool:
+            yield spool
+            length = spool.tell()
+            spool.seek(0)
+            name_bytes = blob_name.encode()
+
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                with open(self._pack_path(self._generation(conn)), 'ab') as pack:
+                    record_offset = pack.seek(0, os.SEEK_END)
+                    pack.write(PACK_RECORD_HEADER.pack(PACK_RECORD_MAGIC, len(name_bytes), length) + name_bytes)
+                    data_offset = pack.tell()
+                    shutil.copyfileobj(spool, pack)
+                    pack.flush()
+                    os.fsync(pack.fileno())
+                conn.execute(
+                    "INSERT OR REPLACE INTO Blobs (name, record_offset, data_offset, length) VALUES (?, ?, ?, ?)",
+                    (blob_name, record_offset, data_offset, length)
+                )
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+
+    def delete(self, blob_name, passes=0):
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT record_offset, data_offset, length FROM Blobs WHERE name = ?", (blob_name,)
+            ).fetchone()
+            if row is not None:
+                record_offset, data_offset, length = row
+                with open(self._pack_path(self._generation(conn)), 'r+b') as pack:
+                    if passes:
+                        overwrite_range(pack, data_offset, length, passes)
+                    pack.seek(record_offset)
+                    pack.write(PACK_DELETED_MAGIC)
+                    pack.flush()
+                    os.fsync(pack.fileno())
+                conn.execute("DELETE FROM Blobs WHERE name = ?", (blob_name,))
+            conn.commit()
+            return True
+        except (sqlite3.Error, OSError) as e:
+            conn.rollback()
+            logging.error(f"Error deleting packed blob {blob_name}: {e}")
+            return False
+
+    def names(self):
+        rows = self._connect().execute("SELECT name FROM Blobs ORDER BY data_offset").fetchall()
+        return iter([row[0] for row in rows])
+
+    def reclaim(self, min_fraction=PACK_RECLAIM_FRACTION):
+        """
+        Compact the pack once enough of it is dead bytes
+
+        Discarding a packed blob only drops its index row; rewriting the pack
+        for every deleted image would cost far more than the delete itself.
+
+        Args:
+            min_fraction (float): Share of the pack that must be dead before compacting
+
+        Returns:
+            int: Bytes freed
+        """
+        stats = self.stats()
+        dead_bytes = stats["pack_bytes"] - stats["live_bytes"]
+        if dead_bytes <= 0 or dead_bytes < stats["pack_bytes"] * min_fraction:
+            return 0
+        return self.compact()
+
+    def compact(self):
+        """
+        Rewrite the pack without dead bytes, keeping blobs in their current order
+
+        Writers wait for the rewrite; readers keep going and switch to the new
+        pack on their next open.
+
+        Returns:
+            int: Bytes reclaimed
+        """
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            generation = self._generation(conn)
+            old_path, new_path = self._pack_path(generation), self._pack_path(generation + 1)
+            rows = conn.execute("SELECT name, data_offset, length FROM Blobs ORDER BY data_offset").fetchall()
+            old_size = os.path.getsize(old_path) if os.path.exists(old_path) else 0
+
+            moved = []
+            with open(old_path if os.path.exists(old_path) else os.devnull, 'rb') as old, open(new_path, 'wb') as new:
+                for blob_name, data_offset, length in rows:
+                    name_bytes = blob_name.encode()
+                    record_offset = new.tell()
+                    new.write(PACK_RECORD_HEADER.pack(PACK_RECORD_MAGIC, len(name_bytes), length) + name_bytes)
+                    moved.append((record_offset, new.tell(), blob_name))
+                    old.seek(data_offset)
+                    remaining = length
+                    while remaining > 0:
+                        data = old.read(min(remaining, 1024 * 1024))
+                        if not data:
+                            raise ValueError(f"Pack ends inside blob {blob_name}")
+                        new.write(data)
+                        remaining -= len(data)
+                new.flush()
+                os.fsync(new.fileno())
+                new_size = new.tell()
+
+            conn.executemany("UPDATE Blobs SET record_offset = ?, data_offset = ? WHERE name = ?", moved)
+            conn.execute("UPDATE Pack_Meta SET generation = ?", (generation + 1,))
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+
+        if os.path.exists(old_path):
+            os.remove(old_path)
+        logging.info(f"Compacted image pack: {old_size - new_size} bytes reclaimed")
+        return old_size - new_size
+
+    def rebuild_index(self):
+        """
+        Recreate the offset index by scanning the pack's record headers (after losing index.db,
+        e.g. when restoring a backup of the pack alone)
+
+        Returns:
+            int: Blobs indexed
+        """
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            entries = {}
+            # The newest pack is the live one; compact() removes the older after switching
+            packs = [name[len("pack-"):-len(".bin")] for name in os.listdir(self.directory)
+                     if name.startswith("pack-") and name.endswith(".bin")]
+            generation = max((int(number) for number in packs if number.isdigit()), default=0)
+            conn.execute("UPDATE Pack_Meta SET generation = ?", (generation,))
+            path = self._pack_path(generation)
+            with open(path, 'rb') as pack:
+                while True:
+                    record_offset = pack.tell()
+                    header = pack.read(PACK_RECORD_HEADER.size)
+                    if len(header) < PACK_RECORD_HEADER.size:
+                        break
+                    magic, name_length, length = PACK_RECORD_HEADER.unpack(header)
+                    if magic not in (PACK_RECORD_MAGIC, PACK_DELETED_MAGIC):
+                        raise ValueError(f"Corrupt pack record at offset {record_offset}")
+                    blob_name = pack.read(name_length).decode()
+                    data_offset = pack.tell()
+                    pack.seek(length, os.SEEK_CUR)
+                    # Later records replace earlier ones with the same name
+                    if magic == PACK_RECORD_MAGIC:
+                        entries[blob_name] = (blob_name, record_offset, data_offset, length)
+                    else:
+                        entries.pop(blob_name, None)
+
+            conn.execute("DELETE FROM Blobs")
+            conn.executemany(
+                "INSERT INTO Blobs (name, record_offset, data_offset, length) VALUES (?, ?, ?, ?)",
+                list(entries.values())
+            )
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        return len(entries)
+
+    def stats(self):
+        conn = self._connect()
+        blobs, live_bytes = conn.execute("SELECT COUNT(*), COALESCE(SUM(length), 0) FROM Blobs").fetchone()
+        path = self._pack_path(self._generation(conn))
+        pack_bytes = os.path.getsize(path) if os.path.exists(path) else 0
+        return {"store": self.name, "blobs": blobs, "live_bytes": live_bytes, "pack_bytes": pack_bytes}
+
+_store = None
+_store_lock = threading.Lock()
+
+def create_image_store(name=IMAGE_STORE_BACKEND):
+    """
+    Build the image store named in config.py
+
+    Args:
+        name (str): "flat", "sharded" or "packed"
+
+    Returns:
+        ImageStore: New store
+    """
+    if name == "flat":
+        return FlatImageStore()
+    if name == "sharded":
+        return ShardedImageStore()
+    if name == "packed":
+        return PackedImageStore()
+    raise ValueError(f"Unknown IMAGE_STORE_BACKEND {name!r}; expected 'flat', 'sharded' or 'packed'")
+
+def get_image_store():
+    """
+    Get the process-wide image store, creating it on first use
+
+    Returns:
+        ImageStore: Shared store
+    """
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = create_image_store()
+        return _store
+
+def set_image_store(store):
+    """
+    Replace the process-wide image store (benchmarks and tools pointing at a scratch store)
+
+    Args:
+        store (ImageStore): Store to use from now on
+    """
+    global _store
+    with _store_lock:
+        _store = store
+
+# Utility functions
+def migrate_image_store(source, target, delete_source=False, progress_callback=None):
+    """
+    Copy every blob from one store to another, e.g. flat -> sharded or flat -> packed
+
+    Blobs are copied still encrypted. Names already in the target are
+    skipped, so an interrupted migration resumes where it stopped. Point
+    IMAGE_STORE_BACKEND at the target once it finishes; image_url values
+    recorded under the old layout keep resolving by blob name.
+
+    Args:
+        source (ImageStore): Store to copy from
+        target (ImageStore): Store to copy into
+        delete_source (bool): Remove each blob from the source once copied
+        progress_callback (callable, optional): Called with (copied, skipped, failed) after each blob
+
+    Returns:
+        dict: Copied, skipped and failed counts
+    """
+    counts = {"copied": 0, "skipped": 0, "failed": 0}
+    for blob_name in source.names():
+        try:
+            if target.exists(blob_name):
+                counts["skipped"] += 1
+            else:
+                with source.open_read(blob_name) as src, target.open_write(blob_name) as dst:
+                    shutil.copyfileobj(src, dst)
+                counts["copied"] += 1
+            if delete_source:
+                source.delete(blob_name)
+        except OSError as e:
+            logging.error(f"Error migrating image {blob_name}: {e}")
+            counts["failed"] += 1
+        if progress_callback:
+            progress_callback(counts["copied"], counts["skipped"], counts["failed"])
+
+    logging.info(
+        f"Image store migration {source.name} -> {target.name}: "
+        f"{counts['copied']} copied, {counts['skipped']} skipped, {counts['failed']} failed"
+    )
+    return counts
@@ -0,0 +1,314 @@
+import csv
+import hashlib
+import itertools
+import json
+import logging
+import os
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+import cv2
+import numpy as np
+import faiss
+from config import IMPORT_BATCH_SIZE, IMPORT_WORKERS
+from database import get_children_by_embedding_ids, get_child_by_embedding_id, insert_children_metadata
+from storage import store_encrypted_image
+from vector_store import VectorStore
+
+# Same ID range register_lost_child draws from
+EMBEDDING_ID_SPACE = 1000000
+
+REQUIRED_COLUMNS = ("image", "name", "age", "gender", "guardian_contact")
+STAGES = ("decode", "detect", "embed", "index", "encrypt", "metadata", "persist")
+
+def checkpoint_path_for(manifest_path):
+    return manifest_path + ".checkpoint.json"
+
+def load_checkpoint(path, manifest_path):
+    """
+    Read the progress saved by an earlier, interrupted import of the same manifest
+
+    Returns:
+        dict: Checkpoint (rows_done and counters), or a fresh one
+    """
+    if os.path.exists(path):
+        with open(path) as f:
+            checkpoint = json.load(f)
+        if checkpoint.get("manifest") == os.path.abspath(manifest_path):
+            return checkpoint
+        logging.warning(f"Ignoring checkpoint {path}: it belongs to {checkpoint.get('manifest')}")
+    return {
+        "manifest": os.path.abspath(manifest_path),
+        "rows_done": 0,
+        "counts": {},
+        "stage_seconds": {stage: 0.0 for stage in STAGES},
+        "elapsed_seconds": 0.0,
+    }
+
+def save_checkpoint(path, checkpoint):
+    # Replace atomically so an interrupted write never loses the previous checkpoint
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(checkpoint, f, indent=2)
+    os.replace(tmp_path, path)
+
+def base_embedding_id(row):
+    """
+    Derive a stable embedding ID from the manifest row so a re-run finds the same ID
+    """
+    key = "|".join(str(row[column]).strip() for column in REQUIRED_COLUMNS)
+    return int(hashlib.blake2b(key.encode('utf-8'), digest_size=8).hexdigest(), 16) % EMBEDDING_ID_SPACE
+
+def is_same_child(existing, row):
+    return (existing['name'] == row['name'].strip()
+            and str(existing['guardian_contact']) == row['guardian_contact'].strip())
+
+def assign_embedding_ids(rows, counts):
+    """
+    Give each row an embedding ID, skipping rows a previous run already imported
+
+    A row whose ID already belongs to the same child is treated as imported.
+    If the ID belongs to a different child, the next free ID is probed.
+
+    Returns:
+        list: (row, embedding_id) pairs still to import
+    """
+    base_ids = [base_embedding_id(row) for row in rows]
+    # Archived cases still own their IDs (and their image files until cleanup)
+    existing = get_children_by_embedding_ids(base_ids, include_history=True)
+
+    assigned = []
+    used = set()
+    for row, embedding_id in zip(rows, base_ids):
+        child = existing.get(embedding_id)
+        if child is not None and is_same_child(child, row):
+            counts["already_imported"] += 1
+            continue
+
+        while embedding_id in used or child is not None:
+            embedding_id = (embedding_id + 1) % EMBEDDING_ID_SPACE
+            child = get_child_by_embedding_id(embedding_id, include_history=True)
+            if child is not None and is_same_child(child, row):
+                break
+        if child is not None:
+            counts["already_imported"] += 1
+            continue
+
+        used.add(embedding_id)
+        assigned.append((row, embedding_id))
+    return assigned
+
+def validate_row(row, images_dir):
+    """
+    Check a manifest row and resolve its image path
+
+    Returns:
+        str or None: Reason the row cannot be imported, or None if it is valid
+    """
+    for column in REQUIRED_COLUMNS:
+        if not (row.get(column) or "").strip():
+            return f"missing {column}"
+    try:
+        age = int(row['age'])
+    except ValueError:
+        return "age is not a number"
+    if not 0 < age < 18:
+        return "age out of range"
+    if row['gender'].strip() not in ('Male', 'Female', 'Other'):
+        return "invalid gender"
+    row['image_path'] = os.path.join(images_dir, row['image'].strip())
+    if not os.path.exists(row['image_path']):
+        return "image not found"
+    return None
+
+class BulkImporter:
+    def __init__(self, batch_size=IMPORT_BATCH_SIZE, workers=IMPORT_WORKERS):
+        """
+        Load the detector, embedding model and FAISS index once for the whole import
+
+        Args:
+            batch_size (int): Manifest rows handled per batch
+            workers (int): Threads decoding and encrypting images
+        """
+        from face_detection import FaceDetector
+        from embeddings import FaceEmbedding
+
+        self.batch_size = batch_size
+        self.workers = workers
+        self.detector = FaceDetector()
+        self.embedder = FaceEmbedding()
+        self.vector_store = VectorStore()
+        self.index_ids = set(faiss.vector_to_array(self.vector_store.index.id_map).tolist()) \
+            if hasattr(self.vector_store.index, 'id_map') else set()
+
+    def _timed(self, stage, timings, function, *args):
+        start = time.perf_counter()
+        result = function(*args)
+        timings[stage] = timings.get(stage, 0.0) + time.perf_counter() - start
+        return result
+
+    def import_batch(self, rows, images_dir, executor, counts, timings):
+        """
+        Import one batch of manifest rows
+
+        Vectors go into the index and are persisted before the metadata insert,
+        as in register_lost_child. A crash between the two is repaired by the
+        next run: it finds the vector already present and only inserts the rows.
+        """
+        valid_rows = []
+        for row in rows:
+            reason = validate_row(row, images_dir)
+            if reason:
+                counts[f"failed_{reason.replace(' ', '_')}"] += 1
+                logging.warning(f"Skipping manifest row {row.get('image')!r}: {reason}")
+            else:
+                valid_rows.append(row)
+
+        pending = assign_embedding_ids(valid_rows, counts)
+        if not pending:
+            return
+
+        images = self._timed("decode", timings, lambda: list(executor.map(
+            lambda item: cv2.imread(item[0]['image_path']), pending)))
+
+        decoded = [(item, image) for item, image in zip(pending, images) if image is not None]
+        counts["failed_unreadable_image"] += len(pending) - len(decoded)
+
+        faces_per_image = self._timed("detect", timings, self.detector.detect_faces_in_images,
+                                      [image for _, image in decoded])
+        # Use the first detected face, as register_lost_child does
+        with_face = [(item, faces[0]) for (item, _), faces in zip(decoded, faces_per_image) if faces]
+        counts["failed_no_face"] += len(decoded) - len(with_face)
+
+        embeddings = self._timed("embed", timings, self.embedder.extract_embeddings,
+                                 [face for _, face in with_face])
+        embedded = [(item, embedding) for (item, _), embedding in zip(with_face, embeddings)
+                    if embedding is not None]
+        counts["failed_embedding"] += len(with_face) - len(embedded)
+        if not embedded:
+            return
+
+        def add_vectors():
+            ids = np.array([embedding_id for (_, embedding_id), _ in embedded], dtype=np.int64)
+            # A vector without metadata under one of our IDs is left over from an
+            # interrupted run (or an orphan reconcile would purge); replace it
+            stale = [embedding_id for embedding_id in ids.tolist() if embedding_id in self.index_ids]
+            if stale:
+                self.vector_store.remove_embeddings(stale, save=False)
+            if not self.vector_store.add_embeddings([embedding for _, embedding in embedded], ids, save=False):
+                raise RuntimeError("Failed to add embeddings to the vector store")
+            self.index_ids.update(ids.tolist())
+        self._timed("index", timings, add_vectors)
+
+        encrypted_paths = self._timed("encrypt", timings, lambda: list(executor.map(
+            lambda item: store_encrypted_image(item[0][0]['image_path'], item[0][1]), embedded)))
+
+        self._timed("persist", timings, self.vector_store.save_index)
+
+        children = [
+            {
+                "name": row['name'].strip(),
+                "age": int(row['age']),
+                "gender": row['gender'].strip(),
+                "guardian_contact": row['guardian_contact'].strip(),
+                "embedding_id": embedding_id,
+                "image_url": encrypted_path,
+                "distinguishing_features": (row.get('distinguishing_features') or "").strip() or None,
+                "last_known_location": (row.get('last_known_location') or "").strip() or None,
+            }
+            for ((row, embedding_id), _), encrypted_path in zip(embedded, encrypted_paths)
+        ]
+        inserted = self._timed("metadata", timings, insert_children_metadata, children)
+        if inserted is False:
+            raise RuntimeError("Bulk metadata insert failed; re-run the import to retry this batch")
+        counts["imported"] += inserted
+
+    def run(self, manifest_path, images_dir, checkpoint_path=None, restart=False, progress_callback=None):
+        """
+        Import every row of a manifest, resuming from the checkpoint if one exists
+
+        Args:
+            manifest_path (str): CSV with image, name, age, gender, guardian_contact
+                and optional distinguishing_features, last_known_location columns
+            images_dir (str): Folder the image column is relative to
+            checkpoint_path (str, optional): Progress file (defaults next to the manifest)
+            restart (bool): Ignore an existing checkpoint
+            progress_callback (callable, optional): Called with the summary after each batch
+
+        Returns:
+            dict: Throughput summary
+        """
+        checkpoint_path = checkpoint_path or checkpoint_path_for(manifest_path)
+        if restart and os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+        checkpoint = load_checkpoint(checkpoint_path, manifest_path)
+        counts = Counter(checkpoint["counts"])
+        timings = dict(checkpoint["stage_seconds"])
+        resumed_from = checkpoint["rows_done"]
+        if resumed_from:
+            logging.info(f"Resuming import of {manifest_path} after {resumed_from} rows")
+
+        start = time.perf_counter()
+        elapsed_before = checkpoint["elapsed_seconds"]
+        with open(manifest_path, newline='', encoding='utf-8-sig') as f, \
+                ThreadPoolExecutor(max_workers=max(1, self.workers)) as executor:
+            reader = csv.DictReader(f)
+            missing = [column for column in REQUIRED_COLUMNS if column not in (reader.fieldnames or [])]
+            if missing:
+                raise ValueError(f"Manifest is missing columns: {', '.join(missing)}")
+
+            # Stream the manifest; only one batch of rows is held at a time
+            rows = itertools.islice(reader, resumed_from, None)
+            while True:
+                batch = list(itertools.islice(rows, self.batch_size))
+                if not batch:
+                    break
+
+                self.import_batch(batch, images_dir, executor, counts, timings)
+
+                checkpoint["rows_done"] += len(batch)
+                checkpoint["counts"] = dict(counts)
+                checkpoint["stage_seconds"] = timings
+                checkpoint["elapsed_seconds"] = elapsed_before + time.perf_counter() - start
+                save_checkpoint(checkpoint_path, checkpoint)
+
+                summary = summarize(checkpoint)
+                logging.info(f"Imported {summary['imported']} of {summary['rows']} rows "
+                             f"({summary['rows_per_second']:.1f} rows/s)")
+                if progress_callback:
+                    progress_callback(summary)
+
+        summary = summarize(checkpoint)
+        summary["resumed_from_row"] = resumed_from
+        return summary
+
+def summarize(checkpoint):
+    """
+    Build the throughput summary from a checkpoint
+
+    Returns:
+        dict: Row counts, failures by reason, rate and per-stage time
+    """
+    counts = checkpoint["counts"]
+    elapsed = checkpoint["elapsed_seconds"]
+    return {
+        "rows": checkpoint["rows_done"],
+        "imported": counts.get("imported", 0),
+        "already_imported": counts.get("already_imported", 0),
+        "failed": {key[len("failed_"):]: value for key, value in counts.items() if key.startswith("failed_") and value},
+        "elapsed_seconds": elapsed,
+        "rows_per_second": checkpoint["rows_done"] / elapsed if elapsed else 0.0,
+        "imported_per_second": counts.get("imported", 0) / elapsed if elapsed else 0.0,
+        "stage_seconds": checkpoint["stage_seconds"],
+    }
+
+def import_manifest(manifest_path, images_dir, batch_size=IMPORT_BATCH_SIZE, workers=IMPORT_WORKERS,
+                    restart=False):
+    """
+    Convenience function to bulk-register children from a CSV manifest and an image folder
+
+    Returns:
+        dict: Throughput summary
+    """
+    importer = BulkImporter(batch_size, workers)
+    return importer.run(manifest_path, images_dir, restart=restart)
@@ -0,0 +1,169 @@
+import atexit
+import logging
+import threading
+from config import OUTBOX_BATCH_SIZE, OUTBOX_POLL_INTERVAL
+from database import OUTBOX_TOMBSTONE, fetch_index_outbox, delete_index_outbox, count_index_outbox
+from tombstones import tombstone_embeddings
+
+class IndexOutboxApplier:
+    def __init__(self, batch_size=OUTBOX_BATCH_SIZE, poll_interval=OUTBOX_POLL_INTERVAL):
+        """
+        Background applier for the FAISS mutations queued in Index_Outbox
+
+        close_cases() commits the status change and its outbox rows together,
+        so a mutation is never lost even if the process dies right after the
+        commit. This thread reads the outbox in commit order, applies each
+        batch with one tombstone write, and deletes the rows only after that
+        write succeeded. Applying a row twice (a crash before the delete, or
+        two processes draining at once) sets bits that are already set.
+
+        Args:
+            batch_size (int): Outbox rows applied per batch
+            poll_interval (float): Seconds between checks for rows from other processes
+        """
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+
+        self.wakeup = threading.Event()
+        self.stopped = threading.Event()
+        self.drain_lock = threading.Lock()
+        self.stats_lock = threading.Lock()
+
+        self.stats = {"applied": 0, "batches": 0, "failed_batches": 0, "compactions_requested": 0}
+
+        # Pick up anything left behind by a process that stopped before applying it
+        self.wakeup.set()
+        self.thread = threading.Thread(target=self._run, name="index-outbox-applier", daemon=True)
+        self.thread.start()
+        atexit.register(self.close)
+
+    def notify(self):
+        """
+        Wake the applier after new outbox rows were committed
+        """
+        self.wakeup.set()
+
+    def _apply(self, rows):
+        tombstone_ids = [embedding_id for _, embedding_id, operation in rows if operation == OUTBOX_TOMBSTONE]
+        unknown = [outbox_id for outbox_id, _, operation in rows if operation != OUTBOX_TOMBSTONE]
+        if unknown:
+            logging.error(f"Discarding index outbox rows with unknown operations: {unknown}")
+
+        if tombstone_ids and not tombstone_embeddings(tombstone_ids):
+            return False
+        return delete_index_outbox([outbox_id for outbox_id, _, _ in rows])
+
+    def drain(self, compact=True):
+        """
+        Apply every pending outbox row
+
+        Args:
+            compact (bool): Request a background index compaction if rows were applied
+
+        Returns:
+            int: Number of rows applied
+        """
+        applied = 0
+        with self.drain_lock:
+            while True:
+                rows = fetch_index_outbox(self.batch_size)
+                if not rows:
+                    break
+
+                if not self._apply(rows):
+                    # Rows stay in the outbox and are retried on the next wakeup
+                    logging.error(f"Failed to apply {len(rows)} index outbox rows; will retry")
+                    with self.stats_lock:
+                        self.stats["failed_batches"] += 1
+                    break
+
+                applied += len(rows)
+                with self.stats_lock:
+                    self.stats["applied"] += len(rows)
+                    self.stats["batches"] += 1
+                if len(rows) < self.batch_size:
+                    break
+
+        if applied:
+            logging.info(f"Applied {applied} index outbox rows")
+        if applied and compact:
+            # One compaction check for the whole drain, not one per closed case
+            from vector_store import compact_faiss_async
+            compact_faiss_async()
+            with self.stats_lock:
+                self.stats["compactions_requested"] += 1
+        return applied
+
+    def _run(self):
+        while not self.stopped.is_set():
+            self.wakeup.wait(self.poll_interval)
+            self.wakeup.clear()
+            if self.stopped.is_set():
+                break
+            try:
+                self.drain()
+            except Exception as e:
+                logging.error(f"Index outbox applier error: {e}")
+
+    def close(self):
+        """
+        Stop the applier thread and apply what is left
+        """
+        if self.stopped.is_set():
+            return
+        self.stopped.set()
+        self.wakeup.set()
+        self.thread.join(timeout=self.poll_interval + 5)
+        try:
+            # Runs from atexit, where no new thread may be started; a later
+            # drain (or compact_faiss()) compacts the tombstones applied here
+            self.drain(compact=False)
+        except Exception as e:
+            logging.error(f"Index outbox applier error: {e}")
+
+    def get_stats(self):
+        """
+        Report applier activity
+
+        Returns:
+            dict: Applied row and batch counts plus rows still pending
+        """
+        with self.stats_lock:
+            stats = dict(self.stats)
+        stats["pending"] = count_index_outbox()
+        return stats
+
+_applier = None
+_applier_lock = threading.Lock()
+
+def get_index_outbox_applier():
+    """
+    Get the process-wide outbox applier, starting its thread on first use
+
+    Returns:
+        IndexOutboxApplier: Shared applier
+    """
+    global _applier
+    with _applier_lock:
+        if _applier is None:
+            _applier = IndexOutboxApplier()
+        return _applier
+
+# Utility functions
+def notify_index_outbox():
+    """
+    Convenience function to have pending index mutations applied in the background
+    """
+    try:
+        get_index_outbox_applier().notify()
+    except Exception as e:
+        logging.error(f"Error starting index outbox applier: {e}")
+
+def apply_index_outbox():
+    """
+    Convenience function to apply every pending index mutation now
+
+    Returns:
+        int: Number of rows applied
+    """
+    return get_index_outbox_applier().drain()
@@ -0,0 +1,264 @@
+import logging
+import os
+import struct
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from config import ROTATION_WORKERS, ROTATION_BATCH_SIZE, ROTATION_MAX_PASSES
+from encryption import KEY_BLOCK_OFFSET, KEY_BLOCK_SIZE, KEY_ID_SIZE, key_id, get_image_encryptor
+from image_stores import get_image_store
+
+class _PlaintextReader:
+    """
+    File-like view of decrypted chunks, so a file can be re-encrypted as a stream
+    """
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.buffer = b""
+
+    def read(self, size):
+        while len(self.buffer) < size:
+            chunk = next(self.chunks, None)
+            if chunk is None:
+                break
+            self.buffer += chunk
+        data, self.buffer = self.buffer[:size], self.buffer[size:]
+        return data
+
+class RotationJournal:
+    def __init__(self, path):
+        """
+        Old key blocks saved before they are overwritten in place
+
+        A key block rewrite is a single small write, but a crash can still
+        tear it; the journal lets the next run put back the old block, which
+        is still valid because the old master key is kept until the
+        rotation finishes.
+
+        Args:
+            path (str): Journal file
+        """
+        self.path = path
+        self.lock = threading.Lock()
+
+    def record(self, entries):
+        """
+        Durably save (blob name, old key block) pairs before their blocks are rewritten
+        """
+        with self.lock, open(self.path, 'ab') as f:
+            for blob_name, key_block in entries:
+                name_bytes = blob_name.encode()
+                f.write(struct.pack(">H", len(name_bytes)) + name_bytes + key_block)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def entries(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'rb') as f:
+            while True:
+                length = f.read(2)
+                if len(length) < 2:
+                    return
+                blob_name = f.read(struct.unpack(">H", length)[0]).decode()
+                key_block = f.read(KEY_BLOCK_SIZE)
+                if len(key_block) < KEY_BLOCK_SIZE:
+                    # Torn final entry: its block was never rewritten
+                    return
+                yield blob_name, key_block
+
+    def clear(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+class KeyRotation:
+    def __init__(self, store=None, encryptor=None, workers=ROTATION_WORKERS, batch_size=ROTATION_BATCH_SIZE):
+        """
+        Move every stored file to a new master key by rewrapping its data key
+
+        Envelope-encrypted files (version 3) only get their key block
+        rewritten in place, a few dozen bytes whatever the file size. Files in
+        the older formats are encrypted under the master key itself and are
+        re-encrypted once, streaming, into the envelope format. Files already
+        under the new key are skipped, so an interrupted rotation resumes
+        where it stopped.
+
+        Args:
+            store (ImageStore, optional): Store to rotate (defaults to the configured one)
+            encryptor (ImageEncryptor, optional): Encryptor whose key provider holds the keys
+            workers (int): Threads rewrapping in parallel
+            batch_size (int): Files journaled and rewrapped together
+        """
+        self.store = store or get_image_store()
+        self.encryptor = encryptor or get_image_encryptor()
+        self.provider = self.encryptor.key_provider
+        self.workers = workers
+        self.batch_size = batch_size
+        self.journal = RotationJournal(f"{self.provider.key_path}.rotation-journal")
+        self.counts = {"rewrapped": 0, "reencrypted": 0, "unchanged": 0, "failed": 0}
+        self.counts_lock = threading.Lock()
+
+    def _count(self, outcome):
+        with self.counts_lock:
+            self.counts[outcome] += 1
+
+    def repair(self):
+        """
+        Restore key blocks whose rewrite was interrupted (run before anything else)
+
+        Returns:
+            int: Blocks restored
+        """
+        restored = 0
+        for blob_name, old_block in self.journal.entries():
+            try:
+                with self.store.open_update(blob_name) as f:
+                    parsed = self.encryptor.read_key_block(f)
+                    if parsed is None:
+                        continue
+                    header, key_block = parsed
+                    try:
+                        self.encryptor.unwrap_data_key(key_block, header)
+                    except ValueError:
+                        f.seek(KEY_BLOCK_OFFSET)
+                        f.write(old_block)
+                        f.flush()
+                        os.fsync(f.fileno())
+                        restored += 1
+            except FileNotFoundError:
+                continue
+        if restored:
+            logging.warning(f"Restored {restored} key blocks torn by an interrupted key rotation")
+        self.journal.clear()
+        return restored
+
+    def _inspect(self, blob_name, target_id):
+        try:
+            with self.store.open_read(blob_name) as f:
+                parsed = self.encryptor.read_key_block(f)
+        except FileNotFoundError:
+            return blob_name, "gone", None
+        if parsed is None:
+            return blob_name, "legacy", None
+        if parsed[1][:KEY_ID_SIZE] == target_id:
+            return blob_name, "unchanged", None
+        return blob_name, "rewrap", parsed
+
+    def _rewrap(self, blob_name, parsed, target_key):
+        header, key_block = parsed
+        data_key = bytearray(self.encryptor.unwrap_data_key(key_block, header))
+        try:
+            new_block = self.encryptor.wrap_data_key(data_key, header, target_key)
+        finally:
+            data_key[:] = bytes(len(data_key))
+        # Checked and written under the blob's update lock, so a shred or another
+        # rewrap cannot land between the two
+        with self.store.open_update(blob_name) as f:
+            if self.encryptor.read_key_block(f) != parsed:
+                # Replaced or shredded since it was inspected; the next sweep looks at it again
+                return
+            f.seek(KEY_BLOCK_OFFSET)
+            f.write(new_block)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _reencrypt(self, blob_name, target_key):
+        with self.store.open_read(blob_name) as src, self.store.open_write(blob_name) as dst:
+            chunks = self.encryptor.iter_decrypt_stream(src)
+            self.encryptor.encrypt_stream(_PlaintextReader(chunks), dst, master_key=target_key)
+
+    def _apply(self, item, target_key):
+        blob_name, action, parsed = item
+        try:
+            if action == "rewrap":
+                self._rewrap(blob_name, parsed, target_key)
+                self._count("rewrapped")
+            else:
+                self._reencrypt(blob_name, target_key)
+                self._count("reencrypted")
+        except FileNotFoundError:
+            # Deleted (or shredded and discarded) since it was inspected
+            return
+        except (OSError, ValueError) as e:
+            logging.error(f"Key rotation failed for {blob_name}: {e}")
+            self._count("failed")
+
+    def _rotate_pass(self, executor, target_key, progress_callback=None):
+        """
+        One sweep over the store
+
+        Returns:
+            int: Files that still needed work at the start of the sweep
+        """
+        target_id = key_id(target_key)
+        names = list(self.store.names())
+        pending = 0
+        unchanged = 0
+        for start in range(0, len(names), self.batch_size):
+            batch = names[start:start + self.batch_size]
+            items = list(executor.map(lambda blob_name: self._inspect(blob_name, target_id), batch))
+            work = [item for item in items if item[1] in ("rewrap", "legacy")]
+            unchanged += sum(1 for item in items if item[1] == "unchanged")
+            pending += len(work)
+
+            rewraps = [(blob_name, parsed[1]) for blob_name, action, parsed in work if action == "rewrap"]
+            if rewraps:
+                self.journal.record(rewraps)
+            list(executor.map(lambda item: self._apply(item, target_key), work))
+            # Every block in the batch is on disk; the journal entries are no longer needed
+            self.journal.clear()
+
+            if progress_callback:
+                with self.counts_lock:
+                    progress_callback(min(start + self.batch_size, len(names)), len(names), dict(self.counts))
+
+        with self.counts_lock:
+            # Files found already rotated by the latest sweep
+            self.counts["unchanged"] = unchanged
+        return pending
+
+    def run(self, progress_callback=None):
+        """
+        Rotate the master key
+
+        Sweeps the store until a sweep finds nothing left to move (files
+        written during a sweep are caught by the next), then makes the new key
+        current. Other processes read the new key on their next encryption
+        and wrap new files with it from then on.
+
+        Args:
+            progress_callback (callable, optional): Called with (files done, files in sweep, counts) per batch
+
+        Returns:
+            dict: Outcome counts plus "completed" (False if files failed and the old key was kept)
+        """
+        self.repair()
+        target_key = self.provider.create_next_key()
+
+        completed = False
+        with ThreadPoolExecutor(max_workers=max(1, self.workers)) as executor:
+            for _ in range(ROTATION_MAX_PASSES):
+                pending = self._rotate_pass(executor, target_key, progress_callback)
+                if self.counts["failed"]:
+                    break
+                if not pending:
+                    # A full sweep found every file already under the new key
+                    completed = True
+                    break
+
+        result = dict(self.counts, completed=completed)
+        if completed:
+            self.provider.promote_next_key()
+            logging.info(f"Image master key rotated: {result}")
+        else:
+            logging.error(f"Image master key rotation incomplete; run it again to resume: {result}")
+        return result
+
+# Utility functions
+def rotate_master_key(workers=ROTATION_WORKERS, progress_callback=None):
+    """
+    Convenience function to rotate the image master key over the configured image store
+
+    Returns:
+        dict: Outcome counts plus "completed"
+    """
+    return KeyRotation(workers=workers).run(progress_callback)
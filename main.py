@@ -6,10 +6,12 @@ from vector_store import add_embedding_to_faiss, search_faiss
 from database import (
     insert_child_metadata, 
     create_metadata_table, 
-    get_child_by_embedding_id,
-    update_case_status
+    get_children_by_embedding_ids,
+    update_case_status,
+    close_cases
 )
 from storage import store_encrypted_image
+from sightings import record_sightings
 import numpy as np
 import logging
 import cv2
@@ -100,6 +102,31 @@ def close_child_case(embedding_id):
         print(f"Error closing case: {e}")
         return False
 
+def close_child_cases(embedding_ids):
+    """
+    Close several cases in one transaction and report the outcome for each ID
+    """
+    try:
+        results = close_cases(embedding_ids)
+        print_close_results(results)
+        return all(result in ("updated", "unchanged") for result in results.values())
+    except Exception as e:
+        logging.error(f"Error closing cases: {e}")
+        print(f"Error closing cases: {e}")
+        return False
+
+def print_close_results(results):
+    messages = {
+        "updated": "has been closed successfully.",
+        "unchanged": "was already closed.",
+        "not_found": "was not found.",
+        "error": "could not be closed.",
+    }
+    for embedding_id, result in results.items():
+        print(f"Case for Embedding ID {embedding_id} {messages.get(result, result)}")
+    closed = sum(1 for result in results.values() if result == "updated")
+    print(f"Closed {closed} of {len(results)} cases.")
+
 def process_face_for_match(face, display_frame=None):
     """
     Process a face and find matches - used as a callback for webcam processing
@@ -117,14 +144,17 @@ def process_face_for_match(face, display_frame=None):
     if embedding is None:
         return []
     
-    # Search for matches
-    matches = search_faiss(embedding, top_k=5, similarity_threshold=SIMILARITY_THRESHOLD)
+    # Search for matches; the sighting is buffered so the webcam loop never waits on the database
+    scored_matches = search_faiss(embedding, top_k=5, similarity_threshold=SIMILARITY_THRESHOLD, with_scores=True)
+    record_sightings(scored_matches, "webcam", embedding=embedding)
+    matches = [embedding_id for embedding_id, _ in scored_matches] or [-1]
     
     if matches[0] != -1 and display_frame is not None:
         # Display match info on frame
+        children = get_children_by_embedding_ids(matches[:3])
         for i, embedding_id in enumerate(matches[:3]):  # Limit to top 3 for display
             embedding_id = int(embedding_id)
-            child_details = get_child_by_embedding_id(embedding_id)
+            child_details = children.get(embedding_id)
             
             if child_details:
                 # Display match on frame
@@ -166,6 +196,12 @@ def identify_found_child(input_path, is_video=False, is_webcam=False, output_vid
         similarity_callback=similarity_callback
     )
     
+    if is_webcam:
+        from vector_store import get_shared_vector_store
+        from database import get_metadata_cache_stats
+        logging.info(f"Webcam query cache: {get_shared_vector_store().query_cache.stats()}")
+        logging.info(f"Webcam metadata cache: {get_metadata_cache_stats()}")
+    
     if not faces:
         logging.warning("No faces detected in the input")
         print("No faces detected.")
@@ -186,11 +222,11 @@ def identify_found_child(input_path, is_video=False, is_webcam=False, output_vid
             continue
         
         # Search for matches
-        matches = search_faiss(embedding, top_k=5, similarity_threshold=SIMILARITY_THRESHOLD)
+        scored_matches = search_faiss(embedding, top_k=5, similarity_threshold=SIMILARITY_THRESHOLD, with_scores=True)
+        record_sightings(scored_matches, f"{'video' if is_video else 'image'}:{input_path}", embedding=embedding)
         
-        if matches[0] != -1:
-            # Add matches to the unique set
-            unique_matches.update(matches)
+        # Add matches to the unique set
+        unique_matches.update(embedding_id for embedding_id, _ in scored_matches)
     
     if unique_matches:
         print("Potential matches found!")
@@ -201,12 +237,15 @@ def identify_found_child(input_path, is_video=False, is_webcam=False, output_vid
         # Track already printed child IDs
         printed_child_ids = set()
         
+        # Retrieve all child details in one query
+        children = get_children_by_embedding_ids(sorted_matches)
+        
         for embedding_id in sorted_matches:
             # Convert numpy.int64 to regular integer
             embedding_id = int(embedding_id)
             
             # Retrieve child details
-            child_details = get_child_by_embedding_id(embedding_id)
+            child_details = children.get(embedding_id)
             
             if child_details:
                 # Check if this child ID has already been printed
@@ -233,6 +272,89 @@ def identify_found_child(input_path, is_video=False, is_webcam=False, output_vid
         logging.info("No matches found in the entire process")
         print("No matches found.")
 
+def print_timings(result):
+    """
+    Print request-level timing returned by the recognition server
+    """
+    timings = result.get("timings_ms", {})
+    stages = ", ".join(f"{stage} {ms:.1f} ms" for stage, ms in timings.items() if stage != "total")
+    print(f"\nServer time: {timings.get('total', 0):.1f} ms ({stages or 'no stages'}), "
+          f"round trip: {result.get('round_trip_ms', 0):.1f} ms")
+
+def register_via_server(image_url, name, age, gender, guardian_contact):
+    """
+    Register a lost child through a running recognition server
+    """
+    from server import call_server
+    result = call_server("register", {
+        "image_path": image_url,
+        "name": name,
+        "age": age,
+        "gender": gender,
+        "guardian_contact": guardian_contact
+    })
+    if result.get("success"):
+        print(f"Child registered successfully with Embedding ID: {result['embedding_id']}")
+    else:
+        print(f"Error registering child: {result.get('error')}")
+    print_timings(result)
+
+def close_via_server(embedding_id):
+    """
+    Close a child's case through a running recognition server
+    """
+    from server import call_server
+    result = call_server("close", {"embedding_id": embedding_id})
+    if result.get("success"):
+        print(f"Case for Embedding ID {embedding_id} has been closed successfully.")
+    else:
+        print(f"Failed to close case for Embedding ID {embedding_id}")
+    print_timings(result)
+    return result.get("success", False)
+
+def close_many_via_server(embedding_ids):
+    """
+    Close several cases through a running recognition server
+    """
+    from server import call_server
+    result = call_server("close", {"embedding_ids": embedding_ids})
+    if "results" in result:
+        print_close_results(result["results"])
+    else:
+        print(f"Failed to close cases: {result.get('error')}")
+    print_timings(result)
+    return result.get("success", False)
+
+def identify_via_server(input_path, is_video=False):
+    """
+    Identify a found child through a running recognition server
+    """
+    from server import call_server
+    result = call_server("identify", {"input_path": input_path, "is_video": is_video})
+
+    if not result.get("success"):
+        print(f"Identification failed: {result.get('error')}")
+    elif not result["faces_detected"]:
+        print("No faces detected.")
+    elif not result["matches"]:
+        print("No matches found.")
+    else:
+        print("Potential matches found!")
+        for child_details in result["matches"]:
+            print("\nChild Details:")
+            print(f"Child ID: {child_details['child_id']}")
+            print(f"Embedding ID: {child_details['embedding_id']}")
+            print(f"Name: {child_details['name']}")
+            print(f"Age: {child_details['age']}")
+            print(f"Gender: {child_details['gender']}")
+            print(f"Guardian Contact: {child_details['guardian_contact']}")
+            print(f"Case Status: {child_details['case_status']}")
+
+            close_case = input("Is this the correct child? Do you want to close this case? (yes/no): ").lower()
+            if close_case in ['yes', 'y']:
+                close_via_server(int(child_details['embedding_id']))
+    print_timings(result)
+
 def main():
     """
     Comprehensive main execution with enhanced error handling and webcam support
@@ -247,15 +369,29 @@ def main():
         ]
     )
     
+    # --server delegates register/identify/close to a running recognition server
+    use_server = "--server" in sys.argv
+    if use_server:
+        sys.argv.remove("--server")
+    
     if len(sys.argv) < 2:
         logging.error("Insufficient arguments")
-        print("Usage: python main.py [register/identify/webcam/close] [args...]")
+        print("Usage: python main.py [register/identify/webcam/close/import/reconcile/archive/migrate/migrate-images/compact-images/rotate-key/serve] [args...] [--server]")
         print("\nExamples:")
         print("  Register: python main.py register image_path name age gender guardian_contact")
         print("  Identify from image: python main.py identify image_path")
         print("  Identify from video: python main.py identify video_path --video")
         print("  Identify from webcam: python main.py webcam")
-        print("  Close case: python main.py close embedding_id")
+        print("  Close cases: python main.py close embedding_id [embedding_id ...]")
+        print("  Bulk import: python main.py import manifest.csv images_dir [--batch-size N] [--restart]")
+        print("  Repair FAISS/MySQL drift: python main.py reconcile [--dry-run] [--reembed]")
+        print("  Archive resolved/closed cases now: python main.py archive")
+        print("  Upgrade the database schema: python main.py migrate [--status] [--chunk-size N]")
+        print("  Change the image storage layout: python main.py migrate-images --to sharded|packed [--from flat] [--delete-source]")
+        print("  Reclaim space in the packed image store: python main.py compact-images")
+        print("  Rotate the image encryption master key: python main.py rotate-key [--workers N]")
+        print("  Start recognition server: python main.py serve")
+        print("  Use a running server: python main.py identify image_path --server")
         sys.exit(1)
     
     action = sys.argv[1]
@@ -270,7 +406,10 @@ def main():
             
             input_path = sys.argv[2]
             name, age, gender, guardian_contact = sys.argv[3:7]
-            register_lost_child(input_path, name, int(age), gender, guardian_contact)
+            if use_server:
+                register_via_server(input_path, name, int(age), gender, guardian_contact)
+            else:
+                register_lost_child(input_path, name, int(age), gender, guardian_contact)
         
         elif action == "identify":
             # Expect at least: python main.py identify input_path [--video]
@@ -282,6 +421,10 @@ def main():
             input_path = sys.argv[2]
             is_video = "--video" in sys.argv or input_path.lower().endswith(('.mp4', '.avi', '.mov'))
             
+            if use_server:
+                identify_via_server(input_path, is_video=is_video)
+                return
+            
             # Optional output path for video
             output_video_path = None
             if is_video:
@@ -294,18 +437,144 @@ def main():
             identify_found_child(None, is_video=False, is_webcam=True)
         
         elif action == "close":
-            # Close a specific case: python main.py close embedding_id
-            if len(sys.argv) != 3:
+            # Close one or more cases: python main.py close embedding_id [embedding_id ...]
+            if len(sys.argv) < 3:
                 logging.error("Incorrect arguments for case closure")
-                print("Close requires an Embedding ID")
+                print("Close requires at least one Embedding ID")
                 sys.exit(1)
             
-            embedding_id = int(sys.argv[2])
-            close_child_case(embedding_id)
+            embedding_ids = [int(embedding_id) for embedding_id in sys.argv[2:]]
+            if len(embedding_ids) == 1:
+                if use_server:
+                    close_via_server(embedding_ids[0])
+                else:
+                    close_child_case(embedding_ids[0])
+            elif use_server:
+                close_many_via_server(embedding_ids)
+            else:
+                close_child_cases(embedding_ids)
+        
+        elif action == "import":
+            # Bulk registration: python main.py import manifest.csv images_dir [--batch-size N] [--restart]
+            if len(sys.argv) < 4:
+                logging.error("Insufficient arguments for import")
+                print("Import requires a manifest CSV and an images directory")
+                sys.exit(1)
+            
+            from importer import import_manifest
+            from config import IMPORT_BATCH_SIZE
+            batch_size = IMPORT_BATCH_SIZE
+            if "--batch-size" in sys.argv:
+                batch_size = int(sys.argv[sys.argv.index("--batch-size") + 1])
+            
+            summary = import_manifest(sys.argv[2], sys.argv[3], batch_size=batch_size,
+                                      restart="--restart" in sys.argv)
+            print("Import summary:")
+            print(f"  Rows processed: {summary['rows']} (resumed after row {summary['resumed_from_row']})")
+            print(f"  Imported: {summary['imported']}, already imported: {summary['already_imported']}")
+            for reason, count in summary['failed'].items():
+                print(f"  Failed ({reason.replace('_', ' ')}): {count}")
+            print(f"  Throughput: {summary['rows_per_second']:.1f} rows/s, "
+                  f"{summary['imported_per_second']:.1f} children/s over {summary['elapsed_seconds']:.1f}s")
+            stages = ", ".join(f"{stage} {seconds:.1f}s" for stage, seconds in summary['stage_seconds'].items())
+            print(f"  Stage time: {stages}")
+        
+        elif action == "reconcile":
+            # Repair FAISS/MySQL drift: python main.py reconcile [--dry-run] [--reembed]
+            from reconcile import reconcile_stores
+            report = reconcile_stores(
+                dry_run="--dry-run" in sys.argv,
+                reembed_missing="--reembed" in sys.argv
+            )
+            print("Reconciliation report:")
+            for key, value in report.items():
+                print(f"  {key}: {value}")
+        
+        elif action == "archive":
+            # Move resolved and closed cases to the archive now: python main.py archive
+            from case_archive import archive_cases
+            from database import count_cases_by_table
+            result = archive_cases()
+            print(f"Archived {result['archived']} cases, restored {result['restored']} reopened cases")
+            for table, counts in count_cases_by_table().items():
+                print(f"  {table}: " + (", ".join(f"{status} {count}" for status, count in counts.items()) or "empty"))
+        
+        elif action == "migrate":
+            # Apply pending schema migrations: python main.py migrate [--status] [--chunk-size N]
+            from migrations import migrate_schema, get_applied_migrations, MIGRATIONS
+            from config import MIGRATION_CHUNK_SIZE
+            if "--status" in sys.argv:
+                applied = {migration['version']: migration for migration in get_applied_migrations()}
+                for version, name, _ in MIGRATIONS:
+                    state = f"applied {applied[version]['applied_at']}" if version in applied else "pending"
+                    print(f"  {version}: {name} ({state})")
+                return
+            
+            chunk_size = MIGRATION_CHUNK_SIZE
+            if "--chunk-size" in sys.argv:
+                chunk_size = int(sys.argv[sys.argv.index("--chunk-size") + 1])
+            
+            def report_progress(done, total):
+                print(f"  Copied rows up to child_id {done} of {total}", end="\r", flush=True)
+            
+            applied = migrate_schema(chunk_size=chunk_size, progress_callback=report_progress)
+            if applied is False:
+                print("\nSchema migration failed; see database_operations.log")
+                sys.exit(1)
+            print(f"\nApplied migrations: {applied or 'none (schema is up to date)'}")
+        
+        elif action == "migrate-images":
+            # Move encrypted images to another layout: python main.py migrate-images --to sharded|packed [--from flat] [--delete-source]
+            from image_stores import create_image_store, migrate_image_store
+            if "--to" not in sys.argv:
+                print("migrate-images requires --to flat|sharded|packed")
+                sys.exit(1)
+            target_name = sys.argv[sys.argv.index("--to") + 1]
+            source_name = sys.argv[sys.argv.index("--from") + 1] if "--from" in sys.argv else "flat"
+            
+            def report_image_progress(copied, skipped, failed):
+                print(f"  {copied} copied, {skipped} already present, {failed} failed", end="\r", flush=True)
+            
+            counts = migrate_image_store(
+                create_image_store(source_name), create_image_store(target_name),
+                delete_source="--delete-source" in sys.argv, progress_callback=report_image_progress
+            )
+            print(f"\nMigrated images {source_name} -> {target_name}: {counts}")
+            if not counts["failed"]:
+                print(f"Set IMAGE_STORE_BACKEND={target_name} in .env to use the new layout")
+        
+        elif action == "compact-images":
+            # Reclaim space left by deleted images in the packed store: python main.py compact-images
+            from image_stores import PackedImageStore
+            reclaimed = PackedImageStore().compact()
+            print(f"Image pack compacted, {reclaimed} bytes reclaimed")
+        
+        elif action == "rotate-key":
+            # Rotate the image master key: python main.py rotate-key [--workers N]
+            from key_rotation import rotate_master_key
+            from config import ROTATION_WORKERS
+            workers = ROTATION_WORKERS
+            if "--workers" in sys.argv:
+                workers = int(sys.argv[sys.argv.index("--workers") + 1])
+            
+            def report_rotation_progress(done, total, counts):
+                print(f"  {done}/{total} files checked, {counts['rewrapped']} rewrapped, "
+                      f"{counts['reencrypted']} re-encrypted, {counts['failed']} failed", end="\r", flush=True)
+            
+            result = rotate_master_key(workers=workers, progress_callback=report_rotation_progress)
+            if not result["completed"]:
+                print(f"\nKey rotation incomplete (the old key is still current); run it again to resume: {result}")
+                sys.exit(1)
+            print(f"\nImage master key rotated: {result}. Running GUI and server processes switch to it on their own.")
+        
+        elif action == "serve":
+            # Keep models, index and database warm: python main.py serve
+            from server import serve
+            serve()
         
         else:
             logging.error("Invalid action specified")
-            print("Invalid action. Use 'register', 'identify', 'webcam', or 'close'")
+            print("Invalid action. Use 'register', 'identify', 'webcam', 'close', 'import', 'reconcile', 'archive', 'migrate', 'migrate-images', 'compact-images', 'rotate-key', or 'serve'")
             sys.exit(1)
     
     except Exception as e:
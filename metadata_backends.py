@@ -0,0 +1,734 @@
+import datetime
+import functools
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from config import (
+    MYSQL_CONFIG,
+    MYSQL_POOL_SIZE,
+    MYSQL_POOL_TIMEOUT,
+    MYSQL_POOL_PING_INTERVAL,
+    MYSQL_RECONNECT_ATTEMPTS,
+    METADATA_BACKEND,
+    SQLITE_DB_PATH
+)
+
+try:
+    import mysql.connector
+except ImportError:
+    # Only the MySQL backend needs the connector; SQLite works without it
+    mysql = None
+
+# Errors either backend can raise from connect/execute/commit
+DatabaseError = (mysql.connector.Error, sqlite3.Error) if mysql else (sqlite3.Error,)
+
+# Resolved and closed cases are moved here so Children_Metadata only holds what open-case queries scan
+ARCHIVE_TABLE = "Children_Metadata_Archive"
+
+# Columns copied when rows move between tables (name_normalized is generated)
+METADATA_COLUMNS = (
+    "child_id", "name", "age", "gender", "guardian_contact", "embedding_id", "image_url",
+    "case_status", "distinguishing_features", "last_known_location",
+    "registration_timestamp", "last_updated",
+)
+
+# Secondary indexes of Children_Metadata as (name, columns); both backends create these
+METADATA_INDEXES = (
+    ("idx_open_list", "case_status, child_id, embedding_id, name, age, gender, "
+                      "guardian_contact, last_known_location"),
+    ("idx_open_name", "case_status, name_normalized, child_id"),
+    ("idx_open_name_contact", "case_status, name_normalized, guardian_contact"),
+    ("idx_status_updated", "case_status, last_updated"),
+)
+
+class PooledConnection:
+    def __init__(self, pool, conn):
+        """
+        Checked-out pool connection; close() hands it back instead of disconnecting
+
+        Args:
+            pool (ConnectionPool): Owning pool
+            conn (mysql.connector.connection.MySQLConnection): Underlying connection
+        """
+        self._pool = pool
+        self._conn = conn
+
+    def close(self):
+        if self._conn is not None:
+            conn, self._conn = self._conn, None
+            self._pool.release(conn)
+
+    def __getattr__(self, name):
+        if self._conn is None:
+            raise mysql.connector.errors.OperationalError("Connection already returned to pool")
+        return getattr(self._conn, name)
+
+    def __del__(self):
+        # Callers that forget close() on an error path must not leak a pool slot
+        try:
+            self.close()
+        except Exception:
+            pass
+
+class ConnectionPool:
+    def __init__(self, config=MYSQL_CONFIG, size=MYSQL_POOL_SIZE, timeout=MYSQL_POOL_TIMEOUT,
+                 ping_interval=MYSQL_POOL_PING_INTERVAL, reconnect_attempts=MYSQL_RECONNECT_ATTEMPTS):
+        """
+        Bounded pool of MySQL connections with health checks and reconnect-on-failure
+
+        Args:
+            config (dict): host, user, password and database to connect with
+            size (int): Maximum open connections
+            timeout (float): Seconds to wait for a free connection
+            ping_interval (float): Idle seconds after which a connection is pinged before reuse
+            reconnect_attempts (int): Reconnect attempts for a connection that fails its health check
+        """
+        self.config = config
+        self.size = size
+        self.timeout = timeout
+        self.ping_interval = ping_interval
+        self.reconnect_attempts = reconnect_attempts
+
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._created = 0
+        self._in_use = 0
+
+        self.stats = {
+            "connections_created": 0,
+            "checkouts": 0,
+            "wait_timeouts": 0,
+            "health_checks": 0,
+            "reconnects": 0,
+            "discarded": 0,
+            "peak_in_use": 0,
+            "total_wait_seconds": 0.0,
+        }
+
+    def _connect(self):
+        conn = mysql.connector.connect(
+            host=self.config["host"],
+            user=self.config["user"],
+            password=self.config["password"],
+            database=self.config["database"]
+        )
+        with self._lock:
+            self.stats["connections_created"] += 1
+        return conn
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+        with self._lock:
+            self._created -= 1
+            self.stats["discarded"] += 1
+
+    def _health_check(self, conn, last_used):
+        """
+        Ping connections that sat idle long enough for the server to have dropped them
+        """
+        # Recently used connections skip the check entirely; is_connected() is itself a round trip
+        if time.monotonic() - last_used < self.ping_interval:
+            return conn
+
+        with self._lock:
+            self.stats["health_checks"] += 1
+        try:
+            conn.ping(reconnect=True, attempts=self.reconnect_attempts, delay=0.5)
+            return conn
+        except mysql.connector.Error as e:
+            logging.warning(f"Pooled connection failed health check, replacing it: {e}")
+            self._discard(conn)
+
+        conn = self._connect()
+        with self._lock:
+            self._created += 1
+            self.stats["reconnects"] += 1
+        return conn
+
+    def get_connection(self):
+        """
+        Check out a healthy connection, opening a new one while under the size limit
+
+        Returns:
+            PooledConnection: Connection to close() when finished
+
+        Raises:
+            mysql.connector.Error: If no connection could be obtained in time
+        """
+        start = time.monotonic()
+        try:
+            conn, last_used = self._idle.get_nowait()
+        except queue.Empty:
+            conn = None
+            with self._lock:
+                can_create = self._created < self.size
+                if can_create:
+                    self._created += 1
+            if can_create:
+                try:
+                    conn = self._connect()
+                except mysql.connector.Error:
+                    with self._lock:
+                        self._created -= 1
+                    raise
+                last_used = time.monotonic()
+            else:
+                try:
+                    conn, last_used = self._idle.get(timeout=self.timeout)
+                except queue.Empty:
+                    with self._lock:
+                        self.stats["wait_timeouts"] += 1
+                    raise mysql.connector.errors.PoolError(
+                        f"No database connection free after {self.timeout}s (pool size {self.size})"
+                    )
+
+        conn = self._health_check(conn, last_used)
+
+        with self._lock:
+            self._in_use += 1
+            self.stats["checkouts"] += 1
+            self.stats["peak_in_use"] = max(self.stats["peak_in_use"], self._in_use)
+            self.stats["total_wait_seconds"] += time.monotonic() - start
+        return PooledConnection(self, conn)
+
+    def release(self, conn):
+        """
+        Return a connection to the pool, discarding it if it is no longer usable
+        """
+        with self._lock:
+            self._in_use -= 1
+        try:
+            # Never hand the next caller someone else's open transaction
+            if conn.in_transaction:
+                conn.rollback()
+            self._idle.put((conn, time.monotonic()))
+        except Exception:
+            self._discard(conn)
+
+    def get_stats(self):
+        """
+        Report pool usage
+
+        Returns:
+            dict: Counters plus current open/idle/in-use connections
+        """
+        with self._lock:
+            stats = dict(self.stats)
+            stats.update({
+                "size": self.size,
+                "open": self._created,
+                "in_use": self._in_use,
+                "idle": self._idle.qsize(),
+            })
+        checkouts = stats["checkouts"]
+        stats["avg_wait_ms"] = stats["total_wait_seconds"] * 1000 / checkouts if checkouts else 0.0
+        return stats
+
+class MetadataBackend:
+    """
+    Storage engine behind database.py
+
+    database.py writes each query once in the SQL subset both engines accept
+    (%s placeholders, no engine-specific functions); a backend supplies
+    connections that run that SQL, plus the engine-specific schema DDL.
+    """
+    name = None
+
+    def create_database(self):
+        """
+        Create the database (or database file location) if it doesn't exist
+
+        Returns:
+            bool: True on success
+        """
+        raise NotImplementedError
+
+    def connect(self):
+        """
+        Get a connection; close() it when finished
+
+        Returns:
+            Connection with cursor(dictionary=False), commit(), rollback(), close()
+        """
+        raise NotImplementedError
+
+    def metadata_table_ddl(self, table="Children_Metadata"):
+        """
+        CREATE TABLE statement for the current Children_Metadata layout
+
+        Args:
+            table (str): Table name (migrations build a shadow copy under another name)
+        """
+        raise NotImplementedError
+
+    def create_schema(self, cursor):
+        """
+        Create Children_Metadata and its indexes
+        """
+        raise NotImplementedError
+
+    def sightings_table_ddl(self, table="Sightings"):
+        """
+        CREATE TABLE statement for the current Sightings layout
+
+        Args:
+            table (str): Table name (migrations build a shadow copy under another name)
+        """
+        raise NotImplementedError
+
+    def create_sightings_schema(self, cursor):
+        """
+        Create the Sightings table and its indexes
+        """
+        raise NotImplementedError
+
+    def create_outbox_schema(self, cursor):
+        """
+        Create the Index_Outbox table of pending FAISS index mutations
+        """
+        raise NotImplementedError
+
+    def create_archive_schema(self, cursor):
+        """
+        Create the archive table for resolved and closed cases (same layout as Children_Metadata)
+        """
+        raise NotImplementedError
+
+    def days_ago_sql(self):
+        """
+        SQL expression for the database server's clock minus a number of days
+
+        Takes the day count as its single %s parameter, so cutoffs compare
+        against last_updated in the same clock the column defaults use.
+        """
+        raise NotImplementedError
+
+    def stats(self):
+        """
+        Report connection usage
+
+        Returns:
+            dict: Backend-specific counters
+        """
+        return {"backend": self.name}
+
+class MySQLBackend(MetadataBackend):
+    name = "mysql"
+
+    def __init__(self, config=MYSQL_CONFIG, pool_size=MYSQL_POOL_SIZE):
+        """
+        MySQL server backend using the bounded connection pool
+
+        Args:
+            config (dict): host, user, password and database to connect with
+            pool_size (int): Maximum pooled connections
+        """
+        if mysql is None:
+            raise ImportError("METADATA_BACKEND is 'mysql' but mysql-connector-python is not installed")
+        self.config = config
+        self.pool = ConnectionPool(config, size=pool_size)
+
+    def create_database(self):
+        try:
+            # Connect without specifying a database
+            conn = mysql.connector.connect(
+                host=self.config["host"],
+                user=self.config["user"],
+                password=self.config["password"]
+            )
+            cursor = conn.cursor()
+            
+            # Create database if not exists
+            cursor.execute(f"CREATE DATABASE IF NOT EXISTS {self.config['database']}")
+            conn.commit()
+            
+            logging.info(f"Database {self.config['database']} created or already exists")
+            
+            cursor.close()
+            conn.close()
+            return True
+        except mysql.connector.Error as e:
+            logging.error(f"Database Creation Error: {e}")
+            return False
+
+    def connect(self):
+        return self.pool.get_connection()
+
+    def metadata_table_ddl(self, table="Children_Metadata"):
+        # image_url is derived from the unique embedding_id, so it carries no index of its own.
+        # idx_open_list covers the Manage Cases page query and idx_open_name_contact the
+        # guardian contact lookup; idx_open_name drives the keyset name search.
+        indexes = ",\n                ".join(f"INDEX {index} ({columns})" for index, columns in METADATA_INDEXES)
+        return f'''
+            CREATE TABLE IF NOT EXISTS {table} (
+                child_id INT AUTO_INCREMENT PRIMARY KEY,
+                name VARCHAR(255) NOT NULL,
+                age INT CHECK (age > 0 AND age < 18),
+                gender ENUM('Male', 'Female', 'Other') NOT NULL,
+                guardian_contact VARCHAR(20) NOT NULL,
+                embedding_id BIGINT,
+                image_url VARCHAR(255),
+                case_status ENUM('Open', 'Resolved', 'Closed') DEFAULT 'Open',
+                distinguishing_features TEXT,
+                last_known_location VARCHAR(255),
+                registration_timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+                name_normalized VARCHAR(255) AS (LOWER(TRIM(name))) STORED,
+                
+                UNIQUE INDEX uq_embedding_id (embedding_id),
+                {indexes}
+            )
+        '''
+
+    def create_schema(self, cursor):
+        # embedding_id's type is brought up to date by migrations.py
+        cursor.execute(self.metadata_table_ddl())
+        self.ensure_metadata_indexes(cursor)
+
+    def ensure_metadata_indexes(self, cursor):
+        """
+        Add columns and indexes introduced after Children_Metadata was first created
+
+        Args:
+            cursor: Open cursor on the child_safety database
+        """
+        cursor.execute(
+            "SELECT COLUMN_NAME, DATA_TYPE FROM information_schema.COLUMNS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'Children_Metadata' "
+            "AND COLUMN_NAME IN ('embedding_id', 'name_normalized')"
+        )
+        columns = {name: data_type.lower() for name, data_type in cursor.fetchall()}
+        if columns.get("embedding_id") != "bigint":
+            # Migration 1 rebuilds this table with the full current layout
+            return
+
+        if "name_normalized" not in columns:
+            logging.info("Adding name_normalized column to Children_Metadata")
+            cursor.execute(
+                "ALTER TABLE Children_Metadata "
+                "ADD COLUMN name_normalized VARCHAR(255) AS (LOWER(TRIM(name))) STORED"
+            )
+
+        cursor.execute(
+            "SELECT DISTINCT INDEX_NAME FROM information_schema.STATISTICS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'Children_Metadata'"
+        )
+        existing = {row[0] for row in cursor.fetchall()}
+        for index, columns in METADATA_INDEXES:
+            if index not in existing:
+                logging.info(f"Adding {index} index to Children_Metadata")
+                cursor.execute(f"ALTER TABLE Children_Metadata ADD INDEX {index} ({columns})")
+
+    def create_archive_schema(self, cursor):
+        cursor.execute(self.metadata_table_ddl(ARCHIVE_TABLE))
+
+    def sightings_table_ddl(self, table="Sightings"):
+        return f'''
+            CREATE TABLE IF NOT EXISTS {table} (
+                sighting_id BIGINT AUTO_INCREMENT PRIMARY KEY,
+                embedding_id BIGINT NOT NULL,
+                similarity FLOAT NOT NULL,
+                source VARCHAR(255) NOT NULL,
+                frame_timestamp DATETIME(3) NOT NULL,
+                embedding BLOB,
+                recorded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                
+                INDEX idx_sightings_child_time (embedding_id, frame_timestamp),
+                INDEX idx_sightings_time (frame_timestamp)
+            )
+        '''
+
+    def create_sightings_schema(self, cursor):
+        # Tables with the older text embedding_id are converted by migrations.py
+        cursor.execute(self.sightings_table_ddl())
+
+    def create_outbox_schema(self, cursor):
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS Index_Outbox (
+                outbox_id BIGINT AUTO_INCREMENT PRIMARY KEY,
+                embedding_id BIGINT NOT NULL,
+                operation VARCHAR(16) NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+
+    def days_ago_sql(self):
+        return "NOW() - INTERVAL %s DAY"
+
+    def stats(self):
+        stats = self.pool.get_stats()
+        stats["backend"] = self.name
+        return stats
+
+@functools.lru_cache(maxsize=512)
+def _to_qmark(query):
+    # database.py uses %s placeholders; sqlite3 wants ?. Cached so each
+    # distinct statement is translated once and sqlite3's statement cache
+    # sees identical text on every call.
+    return query.replace("%s", "?")
+
+def _adapt_datetime(value):
+    # 'YYYY-MM-DD HH:MM:SS[.ffffff]' orders correctly against the text the column defaults produce
+    return value.isoformat(" ")
+
+sqlite3.register_adapter(datetime.datetime, _adapt_datetime)
+
+class SQLiteCursor:
+    def __init__(self, cursor, dictionary=False):
+        """
+        sqlite3 cursor that accepts %s placeholders and can return rows as dicts
+        """
+        self._cursor = cursor
+        self._dictionary = dictionary
+
+    def execute(self, query, params=()):
+        self._cursor.execute(_to_qmark(query), tuple(params))
+        return self
+
+    def executemany(self, query, seq_of_params):
+        self._cursor.executemany(_to_qmark(query), [tuple(params) for params in seq_of_params])
+        return self
+
+    def _row(self, row):
+        if row is None or not self._dictionary:
+            return row
+        return dict(zip([column[0] for column in self._cursor.description], row))
+
+    def fetchone(self):
+        return self._row(self._cursor.fetchone())
+
+    def fetchall(self):
+        return [self._row(row) for row in self._cursor.fetchall()]
+
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    def close(self):
+        self._cursor.close()
+
+class SQLiteConnection:
+    def __init__(self, conn):
+        """
+        Per-thread sqlite3 connection; close() ends any open transaction but keeps the
+        connection so the thread's prepared statement cache survives between calls
+        """
+        self._conn = conn
+
+    def cursor(self, dictionary=False):
+        return SQLiteCursor(self._conn.cursor(), dictionary)
+
+    def commit(self):
+        self._conn.commit()
+
+    def rollback(self):
+        self._conn.rollback()
+
+    @property
+    def in_transaction(self):
+        return self._conn.in_transaction
+
+    def close(self):
+        # Never hand the next caller on this thread someone else's open transaction
+        if self._conn.in_transaction:
+            self._conn.rollback()
+
+class SQLiteBackend(MetadataBackend):
+    name = "sqlite"
+
+    def __init__(self, path=SQLITE_DB_PATH, busy_timeout=MYSQL_POOL_TIMEOUT, cached_statements=256):
+        """
+        Embedded single-file backend for machines without a MySQL server
+
+        Each thread gets its own connection. WAL journaling lets readers run
+        while a writer commits, and busy_timeout makes concurrent writers wait
+        instead of failing immediately.
+
+        Args:
+            path (str): Database file
+            busy_timeout (float): Seconds a writer waits for the database lock
+            cached_statements (int): Prepared statements kept per connection
+        """
+        self.path = path
+        self.busy_timeout = busy_timeout
+        self.cached_statements = cached_statements
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.connections_created = 0
+
+    def create_database(self):
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            logging.info(f"SQLite database at {self.path}")
+            return True
+        except OSError as e:
+            logging.error(f"Database Creation Error: {e}")
+            return False
+
+    def connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout,
+                                   cached_statements=self.cached_statements)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._local.conn = conn
+            with self._lock:
+                self.connections_created += 1
+        return SQLiteConnection(conn)
+
+    def metadata_table_ddl(self, table="Children_Metadata"):
+        return f'''
+            CREATE TABLE IF NOT EXISTS {table} (
+                child_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT NOT NULL,
+                age INTEGER CHECK (age > 0 AND age < 18),
+                gender TEXT NOT NULL CHECK (gender IN ('Male', 'Female', 'Other')),
+                guardian_contact TEXT NOT NULL,
+                embedding_id INTEGER UNIQUE,
+                image_url TEXT,
+                case_status TEXT DEFAULT 'Open' CHECK (case_status IN ('Open', 'Resolved', 'Closed')),
+                distinguishing_features TEXT,
+                last_known_location TEXT,
+                registration_timestamp TEXT DEFAULT (datetime('now', 'localtime')),
+                last_updated TEXT DEFAULT (datetime('now', 'localtime')),
+                name_normalized TEXT GENERATED ALWAYS AS (lower(trim(name))) STORED
+            )
+        '''
+
+    def create_metadata_indexes(self, cursor):
+        """
+        Create the secondary indexes and last_updated trigger of Children_Metadata
+
+        SQLite index and trigger names are database-wide, so a migration's shadow
+        table gets these only after it has replaced the old table.
+        """
+        for index, columns in METADATA_INDEXES:
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS {index} ON Children_Metadata ({columns})")
+        # MySQL's ON UPDATE CURRENT_TIMESTAMP; the WHEN clause stops the trigger re-firing itself
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS trg_children_last_updated
+            AFTER UPDATE ON Children_Metadata
+            FOR EACH ROW WHEN NEW.last_updated = OLD.last_updated
+            BEGIN
+                UPDATE Children_Metadata SET last_updated = datetime('now', 'localtime')
+                WHERE child_id = NEW.child_id;
+            END
+        ''')
+
+    def create_schema(self, cursor):
+        # Tables created before the current layout are brought up to date by migrations.py
+        cursor.execute(self.metadata_table_ddl())
+        self.create_metadata_indexes(cursor)
+
+    def create_archive_schema(self, cursor):
+        cursor.execute(self.metadata_table_ddl(ARCHIVE_TABLE))
+        # Cleanup of old closed cases, and reopened cases waiting to move back
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_archive_status_updated "
+                       f"ON {ARCHIVE_TABLE} (case_status, last_updated)")
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_archive_last_updated
+            AFTER UPDATE ON {ARCHIVE_TABLE}
+            FOR EACH ROW WHEN NEW.last_updated = OLD.last_updated
+            BEGIN
+                UPDATE {ARCHIVE_TABLE} SET last_updated = datetime('now', 'localtime')
+                WHERE child_id = NEW.child_id;
+            END
+        ''')
+
+    def sightings_table_ddl(self, table="Sightings"):
+        return f'''
+            CREATE TABLE IF NOT EXISTS {table} (
+                sighting_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                embedding_id INTEGER NOT NULL,
+                similarity REAL NOT NULL,
+                source TEXT NOT NULL,
+                frame_timestamp TEXT NOT NULL,
+                embedding BLOB,
+                recorded_at TEXT DEFAULT (datetime('now', 'localtime'))
+            )
+        '''
+
+    def create_sightings_indexes(self, cursor):
+        """
+        Create the secondary indexes of Sightings (names are database-wide, see create_metadata_indexes)
+        """
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_sightings_child_time "
+                       "ON Sightings (embedding_id, frame_timestamp)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_sightings_time ON Sightings (frame_timestamp)")
+
+    def create_sightings_schema(self, cursor):
+        # Tables with the older text embedding_id are converted by migrations.py
+        cursor.execute(self.sightings_table_ddl())
+        self.create_sightings_indexes(cursor)
+
+    def create_outbox_schema(self, cursor):
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS Index_Outbox (
+                outbox_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                embedding_id INTEGER NOT NULL,
+                operation TEXT NOT NULL,
+                created_at TEXT DEFAULT (datetime('now', 'localtime'))
+            )
+        ''')
+
+    def days_ago_sql(self):
+        # Same local clock as the datetime('now', 'localtime') column defaults
+        return "datetime('now', 'localtime', '-' || %s || ' days')"
+
+    def stats(self):
+        return {"backend": self.name, "path": self.path, "connections_created": self.connections_created}
+
+_backend = None
+_backend_lock = threading.Lock()
+
+def create_backend(name=METADATA_BACKEND):
+    """
+    Build the backend named in config.py
+
+    Args:
+        name (str): "mysql" or "sqlite"
+
+    Returns:
+        MetadataBackend: New backend
+    """
+    if name == "mysql":
+        return MySQLBackend()
+    if name == "sqlite":
+        return SQLiteBackend()
+    raise ValueError(f"Unknown METADATA_BACKEND {name!r}; expected 'mysql' or 'sqlite'")
+
+def get_backend():
+    """
+    Get the process-wide metadata backend, creating it on first use
+
+    Returns:
+        MetadataBackend: Shared backend
+    """
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            _backend = create_backend()
+        return _backend
+
+def set_backend(backend):
+    """
+    Replace the process-wide metadata backend (benchmarks and tools pointing at a scratch store)
+
+    Args:
+        backend (MetadataBackend): Backend to use from now on
+    """
+    global _backend
+    with _backend_lock:
+        _backend = backend
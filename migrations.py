@@ -0,0 +1,296 @@
+import logging
+import time
+from config import MIGRATION_CHUNK_SIZE, MIGRATION_LOCK_TIMEOUT
+from metadata_backends import DatabaseError, METADATA_COLUMNS, get_backend
+
+SHADOW_TABLE = "Children_Metadata_new"
+RETIRED_TABLE = "Children_Metadata_old"
+COPY_TRIGGERS = ("trg_migrate_copy_insert", "trg_migrate_copy_update", "trg_migrate_copy_delete")
+MIGRATION_LOCK_NAME = "child_safety_schema_migrations"
+
+def _integer_cast(backend):
+    return "SIGNED" if backend.name == "mysql" else "INTEGER"
+
+def _column_values(backend, prefix=""):
+    # embedding_id was stored as text before migration 1; every other column copies as is
+    return ", ".join(
+        f"CAST({prefix}{column} AS {_integer_cast(backend)})" if column == "embedding_id" else f"{prefix}{column}"
+        for column in METADATA_COLUMNS
+    )
+
+def _column_type(cursor, backend, table, column):
+    if backend.name == "mysql":
+        cursor.execute(
+            "SELECT DATA_TYPE FROM information_schema.COLUMNS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND COLUMN_NAME = %s",
+            (table, column)
+        )
+    else:
+        cursor.execute("SELECT type FROM pragma_table_info(%s) WHERE name = %s", (table, column))
+    row = cursor.fetchone()
+    return row[0].lower() if row else None
+
+def _drop_copy_artifacts(cursor):
+    # Left behind by a rebuild that stopped part way; the copy simply starts again
+    for trigger in COPY_TRIGGERS:
+        cursor.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    cursor.execute(f"DROP TABLE IF EXISTS {SHADOW_TABLE}")
+    cursor.execute(f"DROP TABLE IF EXISTS {RETIRED_TABLE}")
+
+def _create_copy_triggers(cursor, backend):
+    """
+    Mirror every write to Children_Metadata into the shadow table while it is being filled
+    """
+    columns = ", ".join(METADATA_COLUMNS)
+    upsert = "REPLACE INTO" if backend.name == "mysql" else "INSERT OR REPLACE INTO"
+    mirror = f"{upsert} {SHADOW_TABLE} ({columns}) VALUES ({_column_values(backend, 'NEW.')})"
+    delete = f"DELETE FROM {SHADOW_TABLE} WHERE child_id = OLD.child_id"
+
+    for trigger, event, statement in zip(COPY_TRIGGERS, ("INSERT", "UPDATE", "DELETE"), (mirror, mirror, delete)):
+        body = statement if backend.name == "mysql" else f"BEGIN {statement}; END"
+        cursor.execute(f"CREATE TRIGGER {trigger} AFTER {event} ON Children_Metadata FOR EACH ROW {body}")
+
+def _copy_in_chunks(conn, backend, chunk_size, progress_callback=None):
+    """
+    Copy existing rows into the shadow table, one short transaction per child_id range
+
+    Rows written meanwhile reach the shadow table through the copy triggers;
+    INSERT IGNORE keeps those newer versions instead of overwriting them.
+
+    Returns:
+        int: Rows copied
+    """
+    cursor = conn.cursor()
+    cursor.execute("SELECT COALESCE(MAX(child_id), 0) FROM Children_Metadata")
+    max_child_id = cursor.fetchone()[0]
+    conn.commit()
+
+    insert = "INSERT IGNORE INTO" if backend.name == "mysql" else "INSERT OR IGNORE INTO"
+    query = (
+        f"{insert} {SHADOW_TABLE} ({', '.join(METADATA_COLUMNS)}) "
+        f"SELECT {_column_values(backend)} FROM Children_Metadata WHERE child_id > %s AND child_id <= %s"
+    )
+    copied = 0
+    for low in range(0, max_child_id, chunk_size):
+        cursor.execute(query, (low, low + chunk_size))
+        copied += max(cursor.rowcount, 0)
+        conn.commit()
+        if progress_callback:
+            progress_callback(min(low + chunk_size, max_child_id), max_child_id)
+    return copied
+
+def _check_row_counts(cursor):
+    # The copy triggers run in the writer's transaction, so both tables always hold the same rows
+    cursor.execute(f"SELECT (SELECT COUNT(*) FROM Children_Metadata), (SELECT COUNT(*) FROM {SHADOW_TABLE})")
+    source_rows, shadow_rows = cursor.fetchone()
+    if source_rows != shadow_rows:
+        raise RuntimeError(f"Shadow table has {shadow_rows} rows but Children_Metadata has {source_rows}")
+
+def _swap_tables(conn, backend):
+    """
+    Replace Children_Metadata with the filled shadow table in one atomic step
+    """
+    cursor = conn.cursor()
+    if backend.name == "mysql":
+        _check_row_counts(cursor)
+        cursor.execute(f"RENAME TABLE Children_Metadata TO {RETIRED_TABLE}, {SHADOW_TABLE} TO Children_Metadata")
+        # The copy triggers moved with the retired table, which nothing writes to any more
+        _drop_copy_artifacts(cursor)
+    else:
+        # SQLite DDL is transactional; readers see the old table until the commit
+        cursor.execute("BEGIN IMMEDIATE")
+        _check_row_counts(cursor)
+        for trigger in COPY_TRIGGERS:
+            cursor.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        cursor.execute("DROP TABLE Children_Metadata")
+        cursor.execute(f"ALTER TABLE {SHADOW_TABLE} RENAME TO Children_Metadata")
+        backend.create_metadata_indexes(cursor)
+    conn.commit()
+
+def migrate_typed_embedding_id(conn, backend, chunk_size=MIGRATION_CHUNK_SIZE, progress_callback=None):
+    """
+    Migration 1: store embedding_id as an indexed BIGINT and add covering indexes
+
+    The table is rebuilt online: a shadow table with the current layout
+    (backend.metadata_table_ddl) is filled in chunks while triggers mirror
+    concurrent writes into it, then swapped in atomically. Reads and writes
+    continue throughout; only the final swap takes a brief lock.
+    """
+    cursor = conn.cursor()
+    _drop_copy_artifacts(cursor)
+    conn.commit()
+
+    if _column_type(cursor, backend, "Children_Metadata", "embedding_id") in (None, "bigint", "integer"):
+        # Not created yet, or created with the current layout; nothing to rebuild
+        return
+
+    text_type = "CHAR" if backend.name == "mysql" else "TEXT"
+    cursor.execute(
+        "SELECT COUNT(*) FROM Children_Metadata WHERE embedding_id IS NOT NULL "
+        f"AND CAST(CAST(embedding_id AS {_integer_cast(backend)}) AS {text_type}) <> embedding_id"
+    )
+    non_numeric = cursor.fetchone()[0]
+    if non_numeric:
+        raise RuntimeError(f"{non_numeric} rows have non-numeric embedding IDs; fix them before migrating")
+
+    cursor.execute(backend.metadata_table_ddl(SHADOW_TABLE))
+    _create_copy_triggers(cursor, backend)
+    conn.commit()
+
+    try:
+        copied = _copy_in_chunks(conn, backend, chunk_size, progress_callback)
+        _swap_tables(conn, backend)
+    except Exception:
+        # Stop mirroring writes into a shadow table that will never be used
+        conn.rollback()
+        _drop_copy_artifacts(conn.cursor())
+        conn.commit()
+        raise
+    logging.info(f"Rebuilt Children_Metadata with BIGINT embedding_id ({copied} rows copied)")
+
+def migrate_typed_sightings_embedding_id(conn, backend, chunk_size=MIGRATION_CHUNK_SIZE, progress_callback=None):
+    """
+    Migration 2: store Sightings.embedding_id as BIGINT like Children_Metadata
+
+    Compared with integer IDs, a text column is cast on every row, so
+    idx_sightings_child_time could not serve lookups or cleanup deletes.
+    MySQL converts the column in place; SQLite, which cannot change a
+    column type, copies the table in one transaction. Sightings written
+    meanwhile wait for the lock (the sightings recorder retries them).
+    """
+    cursor = conn.cursor()
+    if _column_type(cursor, backend, "Sightings", "embedding_id") in (None, "bigint", "integer"):
+        # Not created yet, or created with the current layout
+        return
+
+    text_type = "CHAR" if backend.name == "mysql" else "TEXT"
+    cursor.execute(
+        "SELECT COUNT(*) FROM Sightings "
+        f"WHERE CAST(CAST(embedding_id AS {_integer_cast(backend)}) AS {text_type}) <> embedding_id"
+    )
+    non_numeric = cursor.fetchone()[0]
+    if non_numeric:
+        raise RuntimeError(f"{non_numeric} sightings have non-numeric embedding IDs; fix them before migrating")
+
+    if backend.name == "mysql":
+        cursor.execute("ALTER TABLE Sightings MODIFY embedding_id BIGINT NOT NULL")
+    else:
+        columns = "sighting_id, embedding_id, similarity, source, frame_timestamp, embedding, recorded_at"
+        cursor.execute("BEGIN IMMEDIATE")
+        cursor.execute("DROP TABLE IF EXISTS Sightings_new")
+        cursor.execute(backend.sightings_table_ddl("Sightings_new"))
+        cursor.execute(
+            f"INSERT INTO Sightings_new ({columns}) SELECT sighting_id, CAST(embedding_id AS INTEGER), "
+            "similarity, source, frame_timestamp, embedding, recorded_at FROM Sightings"
+        )
+        cursor.execute("DROP TABLE Sightings")
+        cursor.execute("ALTER TABLE Sightings_new RENAME TO Sightings")
+        backend.create_sightings_indexes(cursor)
+    conn.commit()
+    logging.info("Converted Sightings.embedding_id to BIGINT")
+
+# (version, description, function(conn, backend, chunk_size, progress_callback)) in the order applied
+MIGRATIONS = [
+    (1, "BIGINT embedding_id and covering case-list indexes", migrate_typed_embedding_id),
+    (2, "BIGINT Sightings.embedding_id", migrate_typed_sightings_embedding_id),
+]
+
+def _create_migrations_table(cursor, backend):
+    if backend.name == "mysql":
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS Schema_Migrations (
+                version INT PRIMARY KEY,
+                name VARCHAR(255) NOT NULL,
+                applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+    else:
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS Schema_Migrations (
+                version INTEGER PRIMARY KEY,
+                name TEXT NOT NULL,
+                applied_at TEXT DEFAULT (datetime('now', 'localtime'))
+            )
+        ''')
+
+def _acquire_lock(cursor, backend):
+    # Two processes starting together must not rebuild the same table at once.
+    # SQLite is a single-machine store; its BEGIN IMMEDIATE swap is the only guard there.
+    if backend.name != "mysql":
+        return True
+    cursor.execute("SELECT GET_LOCK(%s, %s)", (MIGRATION_LOCK_NAME, MIGRATION_LOCK_TIMEOUT))
+    return cursor.fetchone()[0] == 1
+
+def _release_lock(cursor, backend):
+    if backend.name == "mysql":
+        cursor.execute("SELECT RELEASE_LOCK(%s)", (MIGRATION_LOCK_NAME,))
+        cursor.fetchone()
+
+def get_applied_migrations():
+    """
+    List the schema migrations recorded as applied
+
+    Returns:
+        list: Dicts with version, name and applied_at, oldest first
+    """
+    backend = get_backend()
+    conn = backend.connect()
+    try:
+        cursor = conn.cursor(dictionary=True)
+        _create_migrations_table(cursor, backend)
+        conn.commit()
+        cursor.execute("SELECT version, name, applied_at FROM Schema_Migrations ORDER BY version")
+        return cursor.fetchall()
+    except DatabaseError as e:
+        logging.error(f"Schema Migration Status Error: {e}")
+        return []
+    finally:
+        conn.close()
+
+def migrate_schema(chunk_size=MIGRATION_CHUNK_SIZE, progress_callback=None):
+    """
+    Apply every pending schema migration in version order
+
+    Args:
+        chunk_size (int): Rows copied per transaction by table rebuilds
+        progress_callback (callable, optional): Called with (rows_done_up_to, max_child_id) during a rebuild
+
+    Returns:
+        list or False: Versions applied by this call, or False if a migration failed
+    """
+    backend = get_backend()
+    conn = backend.connect()
+    try:
+        cursor = conn.cursor()
+        if not _acquire_lock(cursor, backend):
+            logging.error(f"Another process is still migrating the schema after {MIGRATION_LOCK_TIMEOUT}s")
+            return False
+
+        try:
+            _create_migrations_table(cursor, backend)
+            conn.commit()
+            cursor.execute("SELECT version FROM Schema_Migrations")
+            applied = {row[0] for row in cursor.fetchall()}
+
+            newly_applied = []
+            for version, name, migrate in MIGRATIONS:
+                if version in applied:
+                    continue
+                logging.info(f"Applying schema migration {version}: {name}")
+                start = time.perf_counter()
+                migrate(conn, backend, chunk_size, progress_callback)
+                cursor = conn.cursor()
+                cursor.execute("INSERT INTO Schema_Migrations (version, name) VALUES (%s, %s)", (version, name))
+                conn.commit()
+                newly_applied.append(version)
+                logging.info(f"Schema migration {version} applied in {time.perf_counter() - start:.1f}s")
+            return newly_applied
+        finally:
+            _release_lock(conn.cursor(), backend)
+
+    except (DatabaseError, RuntimeError) as e:
+        logging.error(f"Schema Migration Error: {e}")
+        conn.rollback()
+        return False
+    finally:
+        conn.close()
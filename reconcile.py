@@ -0,0 +1,256 @@
+import time
+import logging
+import faiss
+import numpy as np
+from config import RECONCILE_GRACE_SECONDS
+from database import create_connection
+from metadata_backends import ARCHIVE_TABLE
+from vector_store import VectorStore
+
+def stream_index_ids(vector_store):
+    """
+    Read every embedding ID stored in the index through the IndexIDMap id_map
+
+    Args:
+        vector_store (VectorStore): Loaded vector store
+
+    Returns:
+        numpy.ndarray: Physical embedding IDs (including tombstoned ones), sorted int64
+    """
+    if not hasattr(vector_store.index, 'id_map'):
+        raise TypeError(f"Index {type(vector_store.index).__name__} has no id_map; reconciliation needs an IndexIDMap")
+    return np.sort(faiss.vector_to_array(vector_store.index.id_map).astype(np.int64))
+
+def stream_metadata_ids(page_size=50000):
+    """
+    Read embedding IDs and case statuses from Children_Metadata and its archive in keyset pages on child_id
+
+    Args:
+        page_size (int): Rows per page
+
+    Returns:
+        tuple: (all embedding IDs, open embedding IDs, closed embedding IDs), sorted int64 arrays
+    """
+    conn = create_connection()
+    if not conn:
+        raise ConnectionError("Database connection failed")
+
+    all_ids = []
+    open_ids = []
+    closed_ids = []
+    try:
+        cursor = conn.cursor()
+        for table in ("Children_Metadata", ARCHIVE_TABLE):
+            last_child_id = 0
+            while True:
+                cursor.execute(
+                    f"SELECT child_id, embedding_id, case_status FROM {table} "
+                    "WHERE child_id > %s ORDER BY child_id LIMIT %s",
+                    (last_child_id, page_size)
+                )
+                rows = cursor.fetchall()
+                if not rows:
+                    break
+
+                for child_id, embedding_id, case_status in rows:
+                    try:
+                        embedding_id = int(embedding_id)
+                    except (TypeError, ValueError):
+                        logging.warning(f"Skipping non-numeric embedding ID for child {child_id}: {embedding_id!r}")
+                        continue
+                    all_ids.append(embedding_id)
+                    if case_status == 'Open':
+                        open_ids.append(embedding_id)
+                    elif case_status == 'Closed':
+                        closed_ids.append(embedding_id)
+
+                last_child_id = rows[-1][0]
+    finally:
+        conn.close()
+
+    return (np.unique(np.array(all_ids, dtype=np.int64)),
+            np.unique(np.array(open_ids, dtype=np.int64)),
+            np.unique(np.array(closed_ids, dtype=np.int64)))
+
+def find_metadata_ids(embedding_ids, chunk_size=1000):
+    """
+    Find which of the given embedding IDs have a row in Children_Metadata or its archive
+
+    Args:
+        embedding_ids (numpy.ndarray): Embedding IDs to look up
+        chunk_size (int): IDs per IN (...) query
+
+    Returns:
+        numpy.ndarray: IDs that have a metadata row, sorted int64
+    """
+    conn = create_connection()
+    if not conn:
+        raise ConnectionError("Database connection failed")
+
+    found = []
+    try:
+        cursor = conn.cursor()
+        for table in ("Children_Metadata", ARCHIVE_TABLE):
+            for i in range(0, len(embedding_ids), chunk_size):
+                chunk = [int(embedding_id) for embedding_id in embedding_ids[i:i + chunk_size]]
+                placeholders = ", ".join(["%s"] * len(chunk))
+                cursor.execute(f"SELECT embedding_id FROM {table} WHERE embedding_id IN ({placeholders})", chunk)
+                found.extend(int(row[0]) for row in cursor.fetchall())
+    finally:
+        conn.close()
+
+    return np.unique(np.array(found, dtype=np.int64))
+
+def confirm_orphans(candidate_ids, snapshot_time, grace_seconds=RECONCILE_GRACE_SECONDS):
+    """
+    Keep only the vectors that still have no metadata row once the grace window has passed
+
+    Registration adds the vector before it commits the metadata row, so a
+    vector seen without a row may belong to a registration still in flight.
+    Waiting until the index snapshot is grace_seconds old and looking the
+    candidates up again spares those.
+
+    Args:
+        candidate_ids (numpy.ndarray): Index IDs that had no metadata row
+        snapshot_time (float): time.monotonic() when the index IDs were read
+        grace_seconds (float): Minimum age of the snapshot before the re-check
+
+    Returns:
+        numpy.ndarray: IDs that are still orphaned, sorted int64
+    """
+    remaining = snapshot_time + grace_seconds - time.monotonic()
+    if remaining > 0:
+        logging.info(f"Waiting {remaining:.0f}s before re-checking {len(candidate_ids)} vectors without metadata")
+        time.sleep(remaining)
+    committed_meanwhile = find_metadata_ids(candidate_ids)
+    return np.setdiff1d(candidate_ids, committed_meanwhile, assume_unique=True)
+
+def reembed_from_storage(vector_store, embedding_ids):
+    """
+    Rebuild missing vectors from the stored encrypted photos, loading the models once
+
+    Args:
+        vector_store (VectorStore): Loaded vector store
+        embedding_ids (numpy.ndarray): Open cases with no live vector
+
+    Returns:
+        list: Embedding IDs that were re-added
+    """
+    from face_detection import FaceDetector, detect_faces
+    from embeddings import FaceEmbedding, extract_embedding
+    from storage import retrieve_encrypted_image_to_memory, image_reference, stored_image_exists
+
+    detector = FaceDetector()
+    embedder = FaceEmbedding()
+
+    new_ids = []
+    new_embeddings = []
+    for embedding_id in embedding_ids:
+        encrypted_path = image_reference(embedding_id)
+        if not stored_image_exists(encrypted_path):
+            logging.warning(f"No stored image to re-embed for embedding ID {embedding_id}")
+            continue
+
+        image = retrieve_encrypted_image_to_memory(encrypted_path, as_array=True)
+        faces = detect_faces(image, detector=detector) if image is not None else []
+        embedding = extract_embedding(faces[0], embedder) if faces else None
+
+        if embedding is None:
+            logging.warning(f"Could not re-embed stored image for embedding ID {embedding_id}")
+            continue
+        new_ids.append(int(embedding_id))
+        new_embeddings.append(embedding)
+
+    if new_ids and vector_store.add_embeddings(new_embeddings, new_ids, save=False):
+        return new_ids
+    return []
+
+def reconcile_stores(page_size=50000, dry_run=False, reembed_missing=False, grace_seconds=RECONCILE_GRACE_SECONDS):
+    """
+    Bring the FAISS index and Children_Metadata back in line after partial failures
+
+    register_lost_child writes FAISS before MySQL and update_case_status writes
+    MySQL before FAISS, so a failure between the two leaves one store ahead of
+    the other. All IDs are compared with NumPy set operations and every repair
+    is applied in bulk with a single index persist. Vectors without a
+    metadata row are only removed if they still have none grace_seconds after
+    the index was read, so registrations in flight are left alone.
+
+    Args:
+        page_size (int): Metadata rows fetched per keyset page
+        dry_run (bool): Report differences without repairing them
+        reembed_missing (bool): Re-embed open cases whose vector is missing from the index
+        grace_seconds (float): Time a registration gets to commit its metadata row
+
+    Returns:
+        dict: Counts of each kind of drift found and repaired, plus timings
+    """
+    timings = {}
+
+    start = time.perf_counter()
+    vector_store = VectorStore()
+    snapshot_time = time.monotonic()
+    physical_ids = stream_index_ids(vector_store)
+    tombstoned_ids = np.intersect1d(vector_store.tombstones.ids(), physical_ids, assume_unique=True)
+    live_ids = np.setdiff1d(physical_ids, tombstoned_ids, assume_unique=True)
+    timings["index_seconds"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    metadata_ids, open_ids, closed_ids = stream_metadata_ids(page_size)
+    timings["metadata_seconds"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    # Vector added but metadata insert never happened
+    index_only = np.setdiff1d(physical_ids, metadata_ids, assume_unique=True)
+    # Case closed in MySQL but the vector is still searchable. Only Closed cases
+    # are tombstoned by close_cases; Resolved ones stay searchable
+    closed_but_live = np.intersect1d(live_ids, closed_ids, assume_unique=True)
+    # Case reopened or resolved (or close rolled back) while its vector is still tombstoned
+    searchable_ids = np.setdiff1d(metadata_ids, closed_ids, assume_unique=True)
+    open_but_tombstoned = np.intersect1d(searchable_ids, tombstoned_ids, assume_unique=True)
+    # Open case with no vector at all; it can never be matched
+    open_missing = np.setdiff1d(open_ids, physical_ids, assume_unique=True)
+    timings["diff_seconds"] = time.perf_counter() - start
+
+    report = {
+        "index_vectors": int(len(physical_ids)),
+        "metadata_rows": int(len(metadata_ids)),
+        "index_only": int(len(index_only)),
+        "closed_but_live": int(len(closed_but_live)),
+        "open_but_tombstoned": int(len(open_but_tombstoned)),
+        "open_missing": int(len(open_missing)),
+        "index_only_in_flight": 0,
+        "reembedded": 0,
+        "dry_run": dry_run,
+    }
+    logging.info(f"Reconciliation differences: {report}")
+
+    if dry_run:
+        report["timings"] = timings
+        return report
+
+    start = time.perf_counter()
+    index_changed = False
+    if len(index_only):
+        orphaned = confirm_orphans(index_only, snapshot_time, grace_seconds)
+        report["index_only_in_flight"] = int(len(index_only) - len(orphaned))
+        index_only = orphaned
+    if len(index_only):
+        vector_store.remove_embeddings(index_only, save=False)
+        vector_store.tombstones.clear_many(index_only)
+        index_changed = True
+    if len(closed_but_live):
+        vector_store.tombstones.set_many(closed_but_live)
+    if len(open_but_tombstoned):
+        vector_store.tombstones.clear_many(open_but_tombstoned)
+    if reembed_missing and len(open_missing):
+        reembedded = reembed_from_storage(vector_store, open_missing)
+        report["reembedded"] = len(reembedded)
+        index_changed = index_changed or bool(reembedded)
+    if index_changed:
+        vector_store.save_index()
+    timings["repair_seconds"] = time.perf_counter() - start
+
+    report["timings"] = timings
+    logging.info(f"Reconciliation complete: {report}")
+    return report
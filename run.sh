@@ -10,12 +10,19 @@ pip install -r requirements.txt
 # Register a Lost Child (Image)
 python main.py register child_image.jpg "John Doe" 8 "Male" "+1234567890"
 
+# Bulk-register children from a CSV manifest and an image folder (resumable)
+python main.py import manifest.csv images/
+
 # Identify Found Child (Image)
 python main.py identify found_child_image.jpg
 
 # Identify Found Child (Video)
 python main.py identify found_child_video.mp4
 
+# Keep models and the gallery loaded, then delegate commands to it
+python main.py serve &
+python main.py identify found_child_image.jpg --server
+
 # Identify Found Child (Webcam)
 python main.py webcam
 
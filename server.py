@@ -0,0 +1,332 @@
+import json
+import logging
+import os
+import threading
+import time
+import urllib.request
+import urllib.error
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+from config import SERVER_HOST, SERVER_PORT, SERVER_TIMEOUT, SIMILARITY_THRESHOLD
+from face_detection import FaceDetector, detect_faces
+from embeddings import FaceEmbedding, extract_embedding
+from vector_store import VectorStore
+from database import (
+    create_connection,
+    get_pool_stats,
+    get_metadata_cache_stats,
+    insert_child_metadata,
+    get_children_by_embedding_ids,
+    update_case_status,
+    close_cases
+)
+from storage import store_encrypted_image
+from sightings import record_sightings, get_sightings_recorder
+from index_outbox import get_index_outbox_applier
+from case_archive import get_case_archiver
+from image_reaper import get_image_reaper
+
+class RecognitionService:
+    def __init__(self):
+        """
+        Load the detector, embedding model, FAISS index and a database connection once
+        so each request only pays for the work it actually does
+        """
+        self.logger = logging.getLogger(__name__)
+        self.started_at = time.time()
+        self.requests_served = 0
+        # Handler threads finish requests concurrently; += on the counter is not atomic
+        self.stats_lock = threading.Lock()
+
+        # YOLO and InceptionResnetV1 are not safe to run from several threads at once
+        self.model_lock = threading.Lock()
+        # FAISS does not allow searches while the index is reloaded or added to
+        self.index_lock = threading.Lock()
+
+        self.detector = FaceDetector()
+        self.embedder = FaceEmbedding()
+        self.vector_store = VectorStore()
+
+        # Opening one connection up front verifies credentials before the first request
+        conn = create_connection()
+        self.database_ok = conn is not None
+        if conn:
+            conn.close()
+
+        # Applies tombstones queued by closes, including those made by other processes
+        self.outbox_applier = get_index_outbox_applier()
+        self.case_archiver = get_case_archiver()
+        self.image_reaper = get_image_reaper()
+
+        self.logger.info(f"Recognition service ready in {time.time() - self.started_at:.1f}s")
+
+    def _embed_faces(self, input_path, is_video, timings):
+        """
+        Detect faces and extract their embeddings, recording stage timings
+        """
+        with self.model_lock:
+            start = time.perf_counter()
+            faces = detect_faces(input_path, is_video=is_video, detector=self.detector)
+            timings["detect"] = (time.perf_counter() - start) * 1000
+
+            start = time.perf_counter()
+            embeddings = [extract_embedding(face, self.embedder) for face in faces]
+            timings["embed"] = (time.perf_counter() - start) * 1000
+
+        return faces, [e for e in embeddings if e is not None]
+
+    def register(self, image_path, name, age, gender, guardian_contact,
+                 distinguishing_features=None, last_known_location=None):
+        """
+        Register a lost child using the loaded models
+
+        Returns:
+            dict: Registration result with embedding_id on success
+        """
+        timings = {}
+        faces, embeddings = self._embed_faces(image_path, False, timings)
+        if not faces:
+            return {"success": False, "error": "No face detected", "timings_ms": timings}
+        if not embeddings:
+            return {"success": False, "error": "Failed to extract facial embedding", "timings_ms": timings}
+
+        # Use the first detected face
+        embedding = embeddings[0]
+        embedding_id = hash(name + str(age) + str(np.mean(embedding))) % 1000000
+
+        start = time.perf_counter()
+        with self.index_lock:
+            self.vector_store.reload_if_changed()
+            added = self.vector_store.add_embedding(embedding, embedding_id)
+        timings["index"] = (time.perf_counter() - start) * 1000
+        if not added:
+            return {"success": False, "error": "Failed to add embedding to vector store", "timings_ms": timings}
+
+        start = time.perf_counter()
+        encrypted_image_path = store_encrypted_image(image_path, embedding_id)
+        timings["encrypt"] = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        metadata_id = insert_child_metadata(
+            name, age, gender, guardian_contact,
+            embedding_id, encrypted_image_path,
+            distinguishing_features, last_known_location
+        )
+        timings["metadata"] = (time.perf_counter() - start) * 1000
+        if not metadata_id:
+            return {"success": False, "error": "Failed to insert child metadata", "timings_ms": timings}
+
+        return {"success": True, "embedding_id": embedding_id, "metadata_id": metadata_id, "timings_ms": timings}
+
+    def identify(self, input_path, is_video=False, top_k=5, similarity_threshold=SIMILARITY_THRESHOLD):
+        """
+        Identify a found child from an image or video path
+
+        Returns:
+            dict: Matches with child details
+        """
+        timings = {}
+        faces, embeddings = self._embed_faces(input_path, is_video, timings)
+
+        start = time.perf_counter()
+        unique_matches = set()
+        if embeddings:
+            with self.index_lock:
+                self.vector_store.reload_if_changed()
+                scored = self.vector_store.search_embeddings_batch(embeddings, top_k, similarity_threshold,
+                                                                   with_scores=True)
+            for embedding, scored_matches in zip(embeddings, scored):
+                record_sightings(scored_matches, f"server:{input_path}", embedding=embedding)
+                unique_matches.update(embedding_id for embedding_id, _ in scored_matches)
+        timings["search"] = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        children = get_children_by_embedding_ids(sorted(unique_matches))
+        results = [children[embedding_id] for embedding_id in sorted(unique_matches) if embedding_id in children]
+        timings["metadata"] = (time.perf_counter() - start) * 1000
+
+        return {
+            "success": True,
+            "faces_detected": len(faces),
+            "matches": results,
+            "timings_ms": timings
+        }
+
+    def close(self, embedding_id, status='Closed'):
+        """
+        Close a case; its tombstone is applied in the background from the index outbox
+
+        Returns:
+            dict: Whether the update succeeded
+        """
+        timings = {}
+        start = time.perf_counter()
+        success = update_case_status(int(embedding_id), status)
+        timings["update"] = (time.perf_counter() - start) * 1000
+        return {"success": bool(success), "embedding_id": int(embedding_id), "timings_ms": timings}
+
+    def close_many(self, embedding_ids, status='Closed'):
+        """
+        Close several cases with one database transaction
+
+        Returns:
+            dict: Per-ID results; success is True if every case is now in the new status
+        """
+        timings = {}
+        start = time.perf_counter()
+        results = close_cases(embedding_ids, status)
+        timings["update"] = (time.perf_counter() - start) * 1000
+        return {
+            "success": bool(results) and all(result in ("updated", "unchanged") for result in results.values()),
+            "results": {str(embedding_id): result for embedding_id, result in results.items()},
+            "timings_ms": timings
+        }
+
+    def count_request(self):
+        """
+        Count a finished request, whatever its outcome
+        """
+        with self.stats_lock:
+            self.requests_served += 1
+
+    def health(self):
+        """
+        Report whether the loaded resources are usable
+
+        Returns:
+            dict: Health summary
+        """
+        with self.index_lock:
+            index_vectors = int(self.vector_store.index.ntotal)
+        with self.stats_lock:
+            requests_served = self.requests_served
+        return {
+            "success": True,
+            "uptime_seconds": time.time() - self.started_at,
+            "requests_served": requests_served,
+            "index_vectors": index_vectors,
+            "tombstoned": self.vector_store.tombstones.count(),
+            "query_cache": self.vector_store.query_cache.stats(),
+            "database_ok": self.database_ok,
+            "database_pool": get_pool_stats(),
+            "metadata_cache": get_metadata_cache_stats(),
+            "sightings": get_sightings_recorder().get_stats(),
+            "index_outbox": self.outbox_applier.get_stats(),
+            "case_archive": self.case_archiver.get_stats(),
+            "image_reaper": self.image_reaper.get_stats(),
+            "timings_ms": {}
+        }
+
+class RecognitionRequestHandler(BaseHTTPRequestHandler):
+    """
+    JSON-over-HTTP front end for RecognitionService
+
+    GET /health, POST /register, POST /identify, POST /close
+    """
+    service = None
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload, default=str).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _dispatch(self, handler, payload):
+        start = time.perf_counter()
+        try:
+            result = handler(payload)
+            status = 200
+        except (KeyError, TypeError, ValueError) as e:
+            result = {"success": False, "error": f"Bad request: {e}", "timings_ms": {}}
+            status = 400
+        except Exception as e:
+            logging.error(f"Recognition server error on {self.path}: {e}")
+            result = {"success": False, "error": str(e), "timings_ms": {}}
+            status = 500
+        result["timings_ms"]["total"] = (time.perf_counter() - start) * 1000
+        self.service.count_request()
+        self._send_json(status, result)
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._dispatch(lambda payload: self.service.health(), None)
+        else:
+            self._send_json(404, {"success": False, "error": f"Unknown endpoint {self.path}"})
+
+    def do_POST(self):
+        routes = {
+            "/register": lambda p: self.service.register(
+                p["image_path"], p["name"], int(p["age"]), p["gender"], p["guardian_contact"],
+                p.get("distinguishing_features"), p.get("last_known_location")
+            ),
+            "/identify": lambda p: self.service.identify(
+                p["input_path"], bool(p.get("is_video", False)),
+                int(p.get("top_k", 5)), float(p.get("similarity_threshold", SIMILARITY_THRESHOLD))
+            ),
+            "/close": lambda p: self.service.close_many(p["embedding_ids"], p.get("status", "Closed"))
+                if "embedding_ids" in p else self.service.close(p["embedding_id"], p.get("status", "Closed")),
+        }
+        if self.path not in routes:
+            self._send_json(404, {"success": False, "error": f"Unknown endpoint {self.path}"})
+            return
+
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            payload = json.loads(self.rfile.read(length) or b"{}")
+        except json.JSONDecodeError as e:
+            self._send_json(400, {"success": False, "error": f"Invalid JSON: {e}"})
+            return
+        self._dispatch(routes[self.path], payload)
+
+    def log_message(self, format, *args):
+        logging.info(f"Recognition server: {format % args}")
+
+def serve(host=SERVER_HOST, port=SERVER_PORT):
+    """
+    Run the recognition server until interrupted
+
+    Args:
+        host (str): Interface to bind; keep it on localhost, there is no authentication
+        port (int): TCP port
+    """
+    RecognitionRequestHandler.service = RecognitionService()
+    httpd = ThreadingHTTPServer((host, port), RecognitionRequestHandler)
+    print(f"Recognition server listening on http://{host}:{port}")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        print("Recognition server stopped.")
+    finally:
+        httpd.server_close()
+
+def call_server(endpoint, payload=None, host=SERVER_HOST, port=SERVER_PORT, timeout=SERVER_TIMEOUT):
+    """
+    Send a request to a running recognition server
+
+    Args:
+        endpoint (str): Endpoint name, e.g. "identify"
+        payload (dict, optional): JSON body; a GET is sent when omitted
+
+    Returns:
+        dict: Server response with a client-side "round_trip_ms" added
+    """
+    url = f"http://{host}:{port}/{endpoint}"
+    data = None
+    if payload is not None:
+        # The server resolves paths in its own working directory
+        for key in ("image_path", "input_path"):
+            if payload.get(key):
+                payload[key] = os.path.abspath(payload[key])
+        data = json.dumps(payload).encode('utf-8')
+
+    request = urllib.request.Request(url, data=data, headers={"Content-Type": "application/json"})
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            result = json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        result = json.loads(e.read() or b"{}")
+    result["round_trip_ms"] = (time.perf_counter() - start) * 1000
+    return result
@@ -0,0 +1,182 @@
+import atexit
+import datetime
+import logging
+import threading
+from collections import deque
+import numpy as np
+from config import (
+    SIGHTINGS_FLUSH_ROWS,
+    SIGHTINGS_FLUSH_INTERVAL,
+    SIGHTINGS_MAX_BUFFER,
+    SIGHTINGS_STORE_EMBEDDINGS
+)
+from database import create_sightings_table, insert_sightings
+
+class SightingsRecorder:
+    def __init__(self, flush_rows=SIGHTINGS_FLUSH_ROWS, flush_interval=SIGHTINGS_FLUSH_INTERVAL,
+                 max_buffer=SIGHTINGS_MAX_BUFFER, store_embeddings=SIGHTINGS_STORE_EMBEDDINGS):
+        """
+        Buffered writer for identification matches
+
+        record() only appends to an in-memory buffer, so the webcam loop never
+        waits on the database. A background thread writes the buffer with one
+        executemany when it reaches flush_rows or every flush_interval seconds.
+        If the database is unreachable the rows are kept and retried, up to
+        max_buffer rows, after which the oldest are dropped.
+
+        Args:
+            flush_rows (int): Buffered rows that wake the writer early
+            flush_interval (float): Maximum seconds between flushes
+            max_buffer (int): Maximum rows held while waiting for the database
+            store_embeddings (bool): Keep the query embedding with each sighting
+        """
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        self.store_embeddings = store_embeddings
+
+        self.buffer = deque(maxlen=max_buffer)
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.stopped = threading.Event()
+        self.flush_lock = threading.Lock()
+
+        self.stats = {"recorded": 0, "written": 0, "dropped": 0, "flushes": 0, "failed_flushes": 0}
+
+        if not create_sightings_table():
+            logging.error("Sightings table unavailable; sightings will be buffered until it can be written")
+
+        self.thread = threading.Thread(target=self._run, name="sightings-writer", daemon=True)
+        self.thread.start()
+        atexit.register(self.close)
+
+    def record(self, embedding_id, similarity, source, frame_timestamp=None, embedding=None):
+        """
+        Queue one match event without touching the database
+
+        Args:
+            embedding_id (int): Matched child's embedding ID
+            similarity (float): Match similarity
+            source (str): Where the frame came from, e.g. "webcam" or "image:path"
+            frame_timestamp (datetime, optional): When the frame was captured (defaults to now)
+            embedding (numpy.ndarray, optional): Query embedding, kept only if store_embeddings is set
+        """
+        if frame_timestamp is None:
+            frame_timestamp = datetime.datetime.now()
+        embedding_bytes = None
+        if self.store_embeddings and embedding is not None:
+            embedding_bytes = np.asarray(embedding, dtype=np.float32).tobytes()
+
+        with self.lock:
+            if len(self.buffer) == self.buffer.maxlen:
+                self.stats["dropped"] += 1
+            self.buffer.append((int(embedding_id), float(similarity), source, frame_timestamp, embedding_bytes))
+            self.stats["recorded"] += 1
+            full = len(self.buffer) >= self.flush_rows
+
+        if full:
+            self.wakeup.set()
+
+    def record_matches(self, scored_matches, source, frame_timestamp=None, embedding=None):
+        """
+        Queue every (embedding_id, similarity) pair returned by a scored search
+        """
+        frame_timestamp = frame_timestamp or datetime.datetime.now()
+        for embedding_id, similarity in scored_matches:
+            self.record(embedding_id, similarity, source, frame_timestamp, embedding)
+
+    def flush(self):
+        """
+        Write everything buffered so far
+
+        Returns:
+            int: Number of sightings written
+        """
+        with self.flush_lock:
+            with self.lock:
+                batch = list(self.buffer)
+                self.buffer.clear()
+            if not batch:
+                return 0
+
+            written = insert_sightings(batch)
+            if written is False:
+                # Put the batch back in front of anything recorded meanwhile
+                with self.lock:
+                    retained = batch + list(self.buffer)
+                    self.buffer.clear()
+                    overflow = max(0, len(retained) - self.buffer.maxlen)
+                    self.buffer.extend(retained[overflow:])
+                    self.stats["dropped"] += overflow
+                    self.stats["failed_flushes"] += 1
+                return 0
+
+            with self.lock:
+                self.stats["written"] += written
+                self.stats["flushes"] += 1
+            return written
+
+    def _run(self):
+        while not self.stopped.is_set():
+            self.wakeup.wait(self.flush_interval)
+            self.wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logging.error(f"Sightings writer error: {e}")
+
+    def close(self):
+        """
+        Stop the writer thread and flush what is left
+        """
+        if self.stopped.is_set():
+            return
+        self.stopped.set()
+        self.wakeup.set()
+        self.thread.join(timeout=self.flush_interval + 5)
+        self.flush()
+
+    def get_stats(self):
+        """
+        Report writer activity
+
+        Returns:
+            dict: Recorded, written and dropped counts plus the current buffer size
+        """
+        with self.lock:
+            stats = dict(self.stats)
+            stats["buffered"] = len(self.buffer)
+        return stats
+
+_recorder = None
+_recorder_lock = threading.Lock()
+
+def get_sightings_recorder():
+    """
+    Get the process-wide sightings recorder, starting its writer thread on first use
+
+    Returns:
+        SightingsRecorder: Shared recorder
+    """
+    global _recorder
+    with _recorder_lock:
+        if _recorder is None:
+            _recorder = SightingsRecorder()
+        return _recorder
+
+# Utility functions
+def record_sightings(scored_matches, source, frame_timestamp=None, embedding=None):
+    """
+    Convenience function to queue match events from a scored search
+
+    Args:
+        scored_matches (list): (embedding_id, similarity) pairs
+        source (str): Where the frame came from
+        frame_timestamp (datetime, optional): When the frame was captured
+        embedding (numpy.ndarray, optional): Query embedding
+    """
+    if not scored_matches:
+        return
+    try:
+        get_sightings_recorder().record_matches(scored_matches, source, frame_timestamp, embedding)
+    except Exception as e:
+        logging.error(f"Error recording sightings: {e}")
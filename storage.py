@@ -1,7 +1,44 @@
+import io
 import os
-import shutil
-from config import IMAGE_STORAGE_PATH
-from encryption import encrypt_image, decrypt_image
+import logging
+from config import (
+    SECURE_DELETE_MODE,
+    SECURE_DELETE_PASSES,
+    SECURE_DELETE_CHUNK_SIZE,
+    THUMBNAIL_SIZES,
+    THUMBNAIL_QUALITY
+)
+from encryption import get_image_encryptor
+from image_stores import get_image_store, overwrite_range
+
+def _blob_name(image_ref):
+    # image_url may be a path from any file layout or a bare packed-store name
+    return os.path.basename(image_ref)
+
+def image_reference(child_id, size=None):
+    """
+    Reference of a stored image (or one of its thumbnails) from the child's ID alone
+    
+    Args:
+        child_id (int): Unique child identifier (the embedding ID)
+        size (int, optional): Thumbnail size instead of the original
+    
+    Returns:
+        str: Reference accepted by the retrieve functions
+    """
+    return f"{child_id}.enc" if size is None else f"{child_id}.thumb{size}.enc"
+
+def stored_image_exists(image_ref):
+    """
+    Check whether an encrypted image is in the image store
+    
+    Args:
+        image_ref (str): image_url value or image_reference()
+    
+    Returns:
+        bool: True if it exists
+    """
+    return get_image_store().exists(_blob_name(image_ref))
 
 def store_encrypted_image(image_url, child_id):
     """
@@ -12,25 +49,234 @@ def store_encrypted_image(image_url, child_id):
         child_id (int): Unique child identifier
     
     Returns:
-        str: Path to encrypted image
+        str: Reference to the encrypted image (a file path unless the packed store is used)
     """
-    # Ensure storage directory exists
-    os.makedirs(IMAGE_STORAGE_PATH, exist_ok=True)
-    
-    # Generate encrypted image path
-    encrypted_path = os.path.join(IMAGE_STORAGE_PATH, f"{child_id}.enc")
+    store = get_image_store()
+    blob_name = image_reference(child_id)
     
     # Encrypt and store image
-    encrypt_image(image_url, encrypted_path)
+    with open(image_url, 'rb') as src, store.open_write(blob_name) as dst:
+        get_image_encryptor().encrypt_stream(src, dst)
+
+    # Thumbnails are a display convenience; registration does not fail without them
+    try:
+        with open(image_url, 'rb') as f:
+            store_encrypted_thumbnails(f.read(), blob_name)
+    except Exception as e:
+        logging.error(f"Error creating thumbnails for {blob_name}: {e}")
+    
+    return store.location(blob_name)
+
+def thumbnail_name(image_ref, size):
+    """
+    Name of the encrypted thumbnail stored with an encrypted image
+    
+    Args:
+        image_ref (str): Encrypted original image reference
+        size (int): Longest side of the thumbnail in pixels
     
-    return encrypted_path
+    Returns:
+        str: Thumbnail blob name, e.g. 123.thumb200.enc
+    """
+    base, _ = os.path.splitext(_blob_name(image_ref))
+    return f"{base}.thumb{size}.enc"
+
+def store_encrypted_thumbnails(image_data, image_ref, sizes=THUMBNAIL_SIZES):
+    """
+    Render an image at each thumbnail size and store the results encrypted
+    
+    Args:
+        image_data (bytes): Encoded original image
+        image_ref (str): Encrypted original image reference the thumbnails belong to
+        sizes (tuple): Longest sides in pixels
+    
+    Returns:
+        dict: Encoded JPEG thumbnail bytes by size
+    """
+    from PIL import Image
+
+    with Image.open(io.BytesIO(image_data)) as original:
+        original = original.convert("RGB")
+        thumbnails = {}
+        for size in sorted(sizes, reverse=True):
+            # Each size is scaled down from the previous, larger one
+            original.thumbnail((size, size), Image.LANCZOS)
+            buffer = io.BytesIO()
+            original.save(buffer, format="JPEG", quality=THUMBNAIL_QUALITY)
+            thumbnails[size] = buffer.getvalue()
+
+    store = get_image_store()
+    encryptor = get_image_encryptor()
+    for size, data in thumbnails.items():
+        with store.open_write(thumbnail_name(image_ref, size)) as dst:
+            encryptor.encrypt_stream(io.BytesIO(data), dst)
+    return thumbnails
+
+def retrieve_thumbnail_to_memory(image_ref, size=min(THUMBNAIL_SIZES)):
+    """
+    Retrieve a decrypted thumbnail of a stored image without writing plaintext to disk
+    
+    Uses the smallest stored thumbnail at least size pixels on its longest
+    side. Images stored before thumbnails existed are rendered from the
+    original once and their thumbnails stored for next time.
+    
+    Args:
+        image_ref (str): Encrypted original image reference
+        size (int): Wanted longest side in pixels
+    
+    Returns:
+        io.BytesIO: Encoded JPEG thumbnail
+    """
+    tier = min((s for s in THUMBNAIL_SIZES if s >= size), default=max(THUMBNAIL_SIZES))
+    store = get_image_store()
+    name = thumbnail_name(image_ref, tier)
+    if store.exists(name):
+        with store.open_read(name) as src:
+            return io.BytesIO(get_image_encryptor().decrypt_bytes(src))
+
+    thumbnails = store_encrypted_thumbnails(_decrypt_blob(image_ref), image_ref)
+    return io.BytesIO(thumbnails[tier])
+
+def _decrypt_blob(image_ref):
+    with get_image_store().open_read(_blob_name(image_ref)) as src:
+        return get_image_encryptor().decrypt_bytes(src)
 
-def retrieve_encrypted_image(encrypted_path, output_path):
+def retrieve_encrypted_image(image_ref, output_path):
     """
     Retrieve and decrypt an image
     
     Args:
-        encrypted_path (str): Encrypted image path
+        image_ref (str): Encrypted image reference
         output_path (str): Decrypted image output path
     """
-    decrypt_image(encrypted_path, output_path)
\ No newline at end of file
+    with get_image_store().open_read(_blob_name(image_ref)) as src:
+        try:
+            with open(output_path, 'wb') as dst:
+                for chunk in get_image_encryptor().iter_decrypt_stream(src):
+                    dst.write(chunk)
+        except ValueError:
+            # Do not leave a partial plaintext behind a failed verification
+            os.remove(output_path)
+            raise
+
+def retrieve_encrypted_image_to_memory(image_ref, as_array=False):
+    """
+    Retrieve and decrypt an image without writing the plaintext to disk
+    
+    Args:
+        image_ref (str): Encrypted image reference
+        as_array (bool): Decode to a BGR numpy array instead of returning the encoded bytes
+    
+    Returns:
+        io.BytesIO or numpy.ndarray: Encoded image buffer (for PIL), or decoded image
+            (None if it cannot be decoded)
+    """
+    data = _decrypt_blob(image_ref)
+    if not as_array:
+        return io.BytesIO(data)
+
+    import cv2
+    import numpy as np
+    return cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+
+def retrieve_encrypted_range(image_ref, offset, length):
+    """
+    Decrypt part of a stored file, e.g. a segment of video evidence
+    
+    Args:
+        image_ref (str): Encrypted file reference
+        offset (int): First plaintext byte
+        length (int): Number of bytes wanted
+    
+    Returns:
+        bytes: Plaintext range
+    """
+    with get_image_store().open_read(_blob_name(image_ref)) as src:
+        return get_image_encryptor().read_range(src, offset, length)
+
+def secure_delete_file(file_path, passes=SECURE_DELETE_PASSES, chunk_size=SECURE_DELETE_CHUNK_SIZE):
+    """
+    Overwrite a file with random data in place, then remove it
+    
+    Random data is streamed in fixed-size chunks so memory use does not grow
+    with the file, and each pass is flushed to disk before the next begins.
+    
+    Args:
+        file_path (str): File to destroy
+        passes (int): Number of overwrite passes
+        chunk_size (int): Bytes of random data written per call
+    
+    Returns:
+        bool: True if the file was overwritten and removed, or was already gone
+    """
+    try:
+        file_size = os.path.getsize(file_path)
+    except FileNotFoundError:
+        return True
+
+    try:
+        with open(file_path, 'r+b') as f:
+            overwrite_range(f, 0, file_size, passes, chunk_size)
+
+        os.remove(file_path)
+        logging.info(f"Securely deleted: {file_path}")
+        return True
+    except OSError as e:
+        logging.error(f"Error securely deleting {file_path}: {e}")
+        return False
+
+def shred_stored_blob(store, blob_name, passes=SECURE_DELETE_PASSES, encryptor=None):
+    """
+    Make a stored blob unreadable by destroying its data key, then discard it
+    
+    Only the key block is written, so the cost does not depend on the image
+    size; the ciphertext is freed later by the image reaper. Files in the
+    older formats have no key of their own and are overwritten instead.
+    
+    Args:
+        store (ImageStore): Store holding the blob
+        blob_name (str): Blob to shred
+        passes (int): Overwrite passes for files without a key block
+        encryptor (ImageEncryptor, optional): Encryptor that reads the key block (defaults to the shared one)
+    
+    Returns:
+        bool: True if the blob was shredded (or already gone)
+    """
+    try:
+        with store.open_update(blob_name) as f:
+            shredded = (encryptor or get_image_encryptor()).destroy_data_key(f)
+    except FileNotFoundError:
+        return True
+    except OSError as e:
+        logging.error(f"Error shredding {blob_name}: {e}")
+        return False
+
+    if not shredded:
+        return store.delete(blob_name, passes)
+    return store.discard(blob_name)
+
+def delete_stored_image(image_ref, mode=SECURE_DELETE_MODE, passes=SECURE_DELETE_PASSES):
+    """
+    Securely delete an encrypted image together with its thumbnails
+    
+    Args:
+        image_ref (str): Encrypted original image reference
+        mode (str): "shred" (destroy each blob's data key) or "overwrite" (rewrite each blob in full)
+        passes (int): Random overwrite passes before a blob is removed (overwrite mode and older-format files)
+    
+    Returns:
+        bool: True if every blob was removed (or already gone)
+    """
+    if mode not in ("shred", "overwrite"):
+        raise ValueError(f"Unknown SECURE_DELETE_MODE {mode!r}; expected 'shred' or 'overwrite'")
+
+    store = get_image_store()
+    names = [thumbnail_name(image_ref, size) for size in THUMBNAIL_SIZES] + [_blob_name(image_ref)]
+    # Thumbnails go first so a failed wipe never leaves them without their original
+    if mode == "shred":
+        removed = all([shred_stored_blob(store, name, passes) for name in names])
+    else:
+        removed = all([store.delete(name, passes) for name in names])
+    if removed:
+        logging.info(f"Securely deleted ({mode}): {image_ref}")
+    return removed
@@ -0,0 +1,58 @@
+import os
+import sys
+import pytest
+
+# The modules live at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+import encryption
+import image_reaper
+import image_stores
+import index_outbox
+import metadata_backends
+from encryption import ImageEncryptor, KeyProvider
+from metadata_backends import SQLiteBackend
+
+@pytest.fixture
+def encryptor(tmp_path):
+    """
+    Encryptor with its own master key file in the test's directory
+    """
+    provider = KeyProvider(str(tmp_path / "image_key.bin"), env_var=None, lock_memory=False)
+    return ImageEncryptor(key_provider=provider)
+
+@pytest.fixture(params=["flat", "sharded", "packed"])
+def image_store(request, tmp_path, encryptor, monkeypatch):
+    """
+    Each image store layout in the test's directory, installed with the encryptor as the process-wide ones
+    """
+    root = str(tmp_path / "images")
+    os.makedirs(root)
+    if request.param == "flat":
+        store = image_stores.FlatImageStore(root)
+    elif request.param == "sharded":
+        store = image_stores.ShardedImageStore(root, depth=2)
+    else:
+        store = image_stores.PackedImageStore(root)
+    monkeypatch.setattr(image_stores, "_store", store)
+    monkeypatch.setattr(encryption, "_image_encryptor", encryptor)
+    return store
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """
+    Scratch SQLite metadata database installed as the process-wide backend
+    """
+    backend = SQLiteBackend(str(tmp_path / "metadata.db"))
+    previous = metadata_backends._backend
+    metadata_backends.set_backend(backend)
+    # Keep the tests to the database: no image store, no background applier or reaper
+    monkeypatch.setattr(database, "delete_stored_image", lambda image_url: True)
+    monkeypatch.setattr(index_outbox, "notify_index_outbox", lambda: None)
+    monkeypatch.setattr(image_reaper, "notify_image_reaper", lambda: None)
+    database.invalidate_metadata_cache()
+    assert database.initialize_database()
+    yield backend
+    database.invalidate_metadata_cache()
+    metadata_backends.set_backend(previous)
@@ -0,0 +1,144 @@
+import datetime
+import pytest
+import database
+import metadata_backends
+import migrations
+from metadata_backends import SQLiteBackend
+
+def add_children(count, start=1):
+    children = [
+        {"name": f"Child {i}", "age": 5 + i % 10, "gender": "Female", "guardian_contact": f"555-{i:04d}",
+         "embedding_id": i, "image_url": f"images/{i}.enc", "last_known_location": "Park"}
+        for i in range(start, start + count)
+    ]
+    assert database.insert_children_metadata(children) == count
+
+def age_cases(backend, embedding_ids, days):
+    conn = backend.connect()
+    placeholders = ", ".join(["%s"] * len(embedding_ids))
+    conn.cursor().execute(
+        f"UPDATE Children_Metadata SET last_updated = datetime('now', 'localtime', %s) "
+        f"WHERE embedding_id IN ({placeholders})",
+        [f"-{days} days"] + list(embedding_ids)
+    )
+    conn.commit()
+    conn.close()
+
+def test_initialize_is_idempotent_and_records_migrations(db):
+    assert database.initialize_database()
+    assert [row["version"] for row in migrations.get_applied_migrations()] == [1, 2]
+
+def test_insert_and_lookup(db):
+    assert database.insert_child_metadata("Ada Lovelace", 7, "Female", "555-0000", 42, "images/42.enc")
+    add_children(3)
+
+    child = database.get_child_by_embedding_id(42)
+    assert child["name"] == "Ada Lovelace"
+    assert child["case_status"] == "Open"
+    assert database.get_child_by_embedding_id(999) is None
+
+    found = database.get_children_by_embedding_ids([1, 3, 999])
+    assert sorted(found) == [1, 3]
+
+def test_open_case_paging_and_name_search(db):
+    add_children(5)
+    first = database.get_open_cases_page(limit=3)
+    second = database.get_open_cases_page(after_child_id=first[-1]["child_id"], limit=3)
+    assert len(first) == 3 and len(second) == 2
+    assert database.count_open_cases() == 5
+
+    matches = database.search_open_cases_by_name("child 1")
+    assert [case["name"] for case in matches] == ["Child 1"]
+    assert database.count_open_cases_by_name("CHILD") == 5
+
+def test_close_cases_queues_tombstones(db):
+    add_children(3)
+    results = database.close_cases([1, 2, 404], "Closed")
+    assert results == {1: "updated", 2: "updated", 404: "not_found"}
+    assert database.close_cases([1], "Closed") == {1: "unchanged"}
+
+    assert database.get_child_by_embedding_id(1)["case_status"] == "Closed"
+    assert database.count_open_cases() == 1
+    queued = sorted(embedding_id for _, embedding_id, _ in database.fetch_index_outbox())
+    assert queued == [1, 1, 2]
+
+def test_archived_cases_are_still_found(db):
+    add_children(2)
+    database.close_cases([1], "Resolved")
+    assert database.archive_inactive_cases() == 1
+    assert database.count_cases_by_table() == {"active": {"Open": 1}, "archive": {"Resolved": 1}}
+    assert database.get_child_by_embedding_id(1)["case_status"] == "Resolved"
+    assert database.get_child_by_embedding_id(1, include_history=False) is None
+
+def test_sightings_round_trip(db):
+    add_children(1)
+    seen_at = datetime.datetime(2026, 1, 2, 3, 4, 5)
+    assert database.insert_sightings([(1, 0.91, "camera-1", seen_at, None)]) == 1
+    sightings = database.get_sightings_for_child(1)
+    assert len(sightings) == 1
+    assert sightings[0]["source"] == "camera-1"
+
+def test_cleanup_deletes_only_old_closed_cases_and_their_sightings(db):
+    add_children(4)
+    database.insert_sightings([(1, 0.9, "camera-1", datetime.datetime(2026, 1, 1), None),
+                               (3, 0.9, "camera-1", datetime.datetime(2026, 1, 1), None)])
+    database.close_cases([1, 2, 3], "Closed")
+    age_cases(db, [1, 2], days=40)
+    age_cases(db, [4], days=40)
+
+    assert database.cleanup_closed_cases(older_than_days=30) == 2
+    assert database.get_child_by_embedding_id(1) is None
+    assert database.get_child_by_embedding_id(3)["case_status"] == "Closed"
+    assert database.get_child_by_embedding_id(4)["case_status"] == "Open"
+    assert database.get_sightings_for_child(1) == []
+    assert len(database.get_sightings_for_child(3)) == 1
+
+def test_purge_deletes_cases_their_sightings_and_images_now(db, monkeypatch):
+    wiped = []
+    monkeypatch.setattr(database, "delete_stored_image", lambda image_url: wiped.append(image_url) or True)
+    add_children(3)
+    database.insert_sightings([(1, 0.9, "camera-1", datetime.datetime(2026, 1, 1), None)])
+    database.close_cases([2], "Resolved")
+    database.archive_inactive_cases()
+
+    assert database.purge_cases([1, 2, 404]) == {1: "deleted", 2: "deleted", 404: "not_found"}
+    assert sorted(wiped) == ["images/1.enc", "images/2.enc"]
+    assert database.get_child_by_embedding_id(1) is None
+    assert database.get_child_by_embedding_id(2) is None
+    assert database.get_child_by_embedding_id(3)["case_status"] == "Open"
+    assert database.get_sightings_for_child(1) == []
+    assert sorted(embedding_id for _, embedding_id, _ in database.fetch_index_outbox()) == [1, 2]
+
+def test_purge_keeps_a_case_whose_image_could_not_be_wiped(db, monkeypatch):
+    monkeypatch.setattr(database, "delete_stored_image", lambda image_url: False)
+    add_children(1)
+    assert database.purge_cases([1]) == {1: "error"}
+    assert database.get_child_by_embedding_id(1)["case_status"] == "Open"
+    assert database.fetch_index_outbox() == []
+
+def test_text_sighting_ids_are_migrated_to_integers(tmp_path, monkeypatch):
+    backend = SQLiteBackend(str(tmp_path / "old.db"))
+    conn = backend.connect()
+    cursor = conn.cursor()
+    cursor.execute(backend.sightings_table_ddl().replace("embedding_id INTEGER", "embedding_id TEXT"))
+    cursor.execute("INSERT INTO Sightings (embedding_id, similarity, source, frame_timestamp) "
+                   "VALUES ('7', 0.8, 'camera-1', '2026-01-01 00:00:00')")
+    conn.commit()
+    conn.close()
+
+    previous = metadata_backends._backend
+    metadata_backends.set_backend(backend)
+    try:
+        assert database.initialize_database()
+        conn = backend.connect()
+        cursor = conn.cursor()
+        cursor.execute("SELECT type FROM pragma_table_info('Sightings') WHERE name = 'embedding_id'")
+        assert cursor.fetchone()[0] == "INTEGER"
+        cursor.execute("SELECT typeof(embedding_id) FROM Sightings")
+        assert cursor.fetchone()[0] == "integer"
+        cursor.execute("EXPLAIN QUERY PLAN DELETE FROM Sightings WHERE embedding_id IN (7, 8)")
+        assert any("idx_sightings_child_time" in row[-1] for row in cursor.fetchall())
+        conn.close()
+        assert [s["source"] for s in database.get_sightings_for_child(7)] == ["camera-1"]
+    finally:
+        metadata_backends.set_backend(previous)
@@ -0,0 +1,106 @@
+import io
+import os
+import pytest
+from Crypto.Cipher import AES
+from Crypto.Random import get_random_bytes
+import encryption
+from encryption import ENVELOPE_HEADER_SIZE, STREAM_TAG_SIZE
+
+CHUNK = 64
+RECORD = CHUNK + STREAM_TAG_SIZE
+
+def encrypt(encryptor, data):
+    dst = io.BytesIO()
+    assert encryptor.encrypt_stream(io.BytesIO(data), dst, chunk_size=CHUNK) == len(data)
+    return dst.getvalue()
+
+def decrypt(encryptor, blob):
+    return encryptor.decrypt_bytes(io.BytesIO(blob))
+
+@pytest.mark.parametrize("size", [0, 1, CHUNK - 1, CHUNK, CHUNK + 1, 3 * CHUNK, 3 * CHUNK + 5])
+def test_round_trip(encryptor, size):
+    data = os.urandom(size)
+    blob = encrypt(encryptor, data)
+    # Every chunk (at least one, even for empty input) carries its own tag
+    assert len(blob) == ENVELOPE_HEADER_SIZE + size + max(-(-size // CHUNK), 1) * STREAM_TAG_SIZE
+    assert decrypt(encryptor, blob) == data
+    assert encryptor.get_plaintext_size(io.BytesIO(blob)) == size
+
+def test_file_round_trip(tmp_path, encryptor):
+    data = os.urandom(3 * CHUNK)
+    encryptor.encrypt_bytes(data, str(tmp_path / "1.enc"), chunk_size=CHUNK)
+    encryptor.decrypt_image(str(tmp_path / "1.enc"), str(tmp_path / "1.jpg"))
+    assert (tmp_path / "1.jpg").read_bytes() == data
+    assert not os.path.exists(tmp_path / "1.enc.part")
+
+def test_tampered_chunk_is_rejected(encryptor):
+    blob = bytearray(encrypt(encryptor, os.urandom(3 * CHUNK)))
+    blob[ENVELOPE_HEADER_SIZE + RECORD + 3] ^= 1
+    with pytest.raises(ValueError):
+        decrypt(encryptor, bytes(blob))
+
+def test_tampered_header_is_rejected(encryptor):
+    blob = bytearray(encrypt(encryptor, os.urandom(CHUNK)))
+    blob[ENVELOPE_HEADER_SIZE - 1] ^= 1
+    with pytest.raises(ValueError):
+        decrypt(encryptor, bytes(blob))
+
+def test_reordered_chunks_are_rejected(encryptor):
+    blob = encrypt(encryptor, os.urandom(3 * CHUNK))
+    body = blob[ENVELOPE_HEADER_SIZE:]
+    swapped = body[RECORD:2 * RECORD] + body[:RECORD] + body[2 * RECORD:]
+    with pytest.raises(ValueError):
+        decrypt(encryptor, blob[:ENVELOPE_HEADER_SIZE] + swapped)
+
+def test_chunks_moved_between_files_are_rejected(encryptor):
+    first = encrypt(encryptor, os.urandom(2 * CHUNK))
+    second = encrypt(encryptor, os.urandom(2 * CHUNK))
+    with pytest.raises(ValueError):
+        decrypt(encryptor, first[:ENVELOPE_HEADER_SIZE + RECORD] + second[ENVELOPE_HEADER_SIZE + RECORD:])
+
+@pytest.mark.parametrize("cut", [RECORD, RECORD - 1, STREAM_TAG_SIZE - 1])
+def test_truncated_file_is_rejected(encryptor, cut):
+    # Dropping the whole last chunk fails too: the one before it is not marked as last
+    blob = encrypt(encryptor, os.urandom(3 * CHUNK))
+    with pytest.raises(ValueError):
+        decrypt(encryptor, blob[:-cut])
+
+def test_truncated_header_is_rejected(encryptor):
+    blob = encrypt(encryptor, b"x")
+    with pytest.raises(ValueError):
+        decrypt(encryptor, blob[:ENVELOPE_HEADER_SIZE - 1])
+
+@pytest.mark.parametrize("offset, length", [
+    (0, 1), (0, CHUNK), (CHUNK - 1, 2), (CHUNK, CHUNK), (CHUNK - 1, CHUNK + 2),
+    (2 * CHUNK, 10), (3 * CHUNK + 4, 100), (3 * CHUNK + 5, 1), (10 * CHUNK, 1), (5, 0),
+])
+def test_read_range_at_chunk_boundaries(tmp_path, encryptor, monkeypatch, offset, length):
+    data = os.urandom(3 * CHUNK + 5)
+    path = str(tmp_path / "1.enc")
+    encryptor.encrypt_bytes(data, path, chunk_size=CHUNK)
+    monkeypatch.setattr(encryption, "_image_encryptor", encryptor)
+    assert encryption.read_encrypted_range(path, offset, length) == data[offset:offset + length]
+
+def test_read_range_rejects_a_tampered_chunk(encryptor):
+    data = os.urandom(3 * CHUNK)
+    blob = bytearray(encrypt(encryptor, data))
+    blob[ENVELOPE_HEADER_SIZE + 2 * RECORD] ^= 1
+    # Only the chunks covering the range are checked
+    assert encryptor.read_range(io.BytesIO(bytes(blob)), 0, CHUNK) == data[:CHUNK]
+    with pytest.raises(ValueError):
+        encryptor.read_range(io.BytesIO(bytes(blob)), 2 * CHUNK, 1)
+
+def test_original_single_message_format_still_decrypts(tmp_path, encryptor):
+    data = os.urandom(200)
+    cipher = AES.new(bytes(encryptor.key), AES.MODE_GCM, nonce=get_random_bytes(16))
+    ciphertext, tag = cipher.encrypt_and_digest(data)
+    path = tmp_path / "old.enc"
+    path.write_bytes(cipher.nonce + tag + ciphertext)
+
+    assert encryptor.decrypt_bytes(str(path)) == data
+    assert encryptor.get_plaintext_size(str(path)) == len(data)
+    assert encryptor.read_range(str(path), 10, 20) == data[10:30]
+
+    path.write_bytes(cipher.nonce + tag + ciphertext[:-1] + bytes([ciphertext[-1] ^ 1]))
+    with pytest.raises(ValueError):
+        encryptor.decrypt_bytes(str(path))
@@ -0,0 +1,179 @@
+import hashlib
+import os
+import shutil
+import pytest
+from image_stores import (
+    PACK_DELETED_MAGIC,
+    PACK_RECORD_HEADER,
+    FlatImageStore,
+    PackedImageStore,
+    ShardedImageStore,
+    migrate_image_store,
+)
+
+def put(store, blob_name, data):
+    with store.open_write(blob_name) as dst:
+        dst.write(data)
+
+def get(store, blob_name):
+    with store.open_read(blob_name) as src:
+        return src.read()
+
+def blob(i, size=1000):
+    return hashlib.sha256(str(i).encode()).digest() * (size // 32)
+
+@pytest.fixture
+def flat(tmp_path):
+    os.makedirs(tmp_path / "flat")
+    return FlatImageStore(str(tmp_path / "flat"))
+
+@pytest.fixture
+def packed(tmp_path):
+    return PackedImageStore(str(tmp_path / "pack"))
+
+def test_sharded_layout_keeps_an_image_with_its_thumbnails(tmp_path):
+    store = ShardedImageStore(str(tmp_path / "sharded"), depth=2)
+    digest = hashlib.sha256(b"123").hexdigest()
+    assert store.path("123.enc") == os.path.join(store.root, digest[:2], digest[2:4], "123.enc")
+    assert os.path.dirname(store.path("123.thumb200.enc")) == os.path.dirname(store.path("123.enc"))
+
+    for blob_name in ("123.enc", "123.thumb200.enc", "456.enc"):
+        put(store, blob_name, blob_name.encode())
+    assert get(store, "123.thumb200.enc") == b"123.thumb200.enc"
+    assert sorted(store.names()) == ["123.enc", "123.thumb200.enc", "456.enc"]
+    assert store.location("456.enc") == store.path("456.enc")
+
+def test_sharded_names_skip_partial_and_foreign_files(tmp_path):
+    store = ShardedImageStore(str(tmp_path / "sharded"), depth=1)
+    put(store, "1.enc", b"x")
+    shard = os.path.dirname(store.path("1.enc"))
+    open(os.path.join(shard, "2.enc.part"), 'wb').close()
+    os.makedirs(os.path.join(store.root, "not-a-shard"))
+    open(os.path.join(store.root, "not-a-shard", "3.enc"), 'wb').close()
+    assert list(store.names()) == ["1.enc"]
+
+def test_failed_write_leaves_nothing_behind(tmp_path):
+    store = ShardedImageStore(str(tmp_path / "sharded"), depth=2)
+    with pytest.raises(RuntimeError):
+        with store.open_write("1.enc") as dst:
+            dst.write(b"half")
+            raise RuntimeError
+    assert not store.exists("1.enc")
+    assert list(store.names()) == []
+    assert not os.path.exists(store.path("1.enc") + ".part")
+
+def test_packed_append_read_replace_and_delete(packed):
+    for i in range(3):
+        put(packed, f"{i}.enc", blob(i))
+    assert [get(packed, f"{i}.enc") for i in range(3)] == [blob(i) for i in range(3)]
+
+    put(packed, "1.enc", b"replacement")
+    assert get(packed, "1.enc") == b"replacement"
+
+    assert packed.delete("0.enc", passes=1)
+    assert not packed.exists("0.enc")
+    with pytest.raises(FileNotFoundError):
+        get(packed, "0.enc")
+    assert packed.delete("0.enc")
+    assert sorted(packed.names()) == ["1.enc", "2.enc"]
+
+    stats = packed.stats()
+    assert stats["blobs"] == 2 and stats["live_bytes"] == len(b"replacement") + len(blob(2))
+
+def test_packed_reads_are_confined_to_the_blob(packed):
+    put(packed, "1.enc", b"first")
+    put(packed, "2.enc", b"second")
+    with packed.open_read("1.enc") as src:
+        assert src.read(100) == b"first"
+        assert src.read() == b""
+        src.seek(1)
+        assert src.read(3) == b"irs"
+
+def test_failed_packed_write_is_not_indexed(packed):
+    with pytest.raises(RuntimeError):
+        with packed.open_write("1.enc") as dst:
+            dst.write(b"half")
+            raise RuntimeError
+    assert not packed.exists("1.enc")
+
+def test_compact_drops_dead_bytes_and_keeps_live_blobs(packed):
+    for i in range(6):
+        put(packed, f"{i}.enc", blob(i))
+    put(packed, "5.enc", blob(50))
+    for i in (0, 2):
+        packed.delete(f"{i}.enc")
+    old_pack = packed._pack_path(0)
+    before = packed.stats()
+
+    freed = packed.compact()
+
+    after = packed.stats()
+    assert freed == before["pack_bytes"] - after["pack_bytes"]
+    assert freed >= 3 * len(blob(0))
+    assert not os.path.exists(old_pack)
+    assert sorted(packed.names()) == ["1.enc", "3.enc", "4.enc", "5.enc"]
+    assert get(packed, "5.enc") == blob(50)
+    assert [get(packed, f"{i}.enc") for i in (1, 3, 4)] == [blob(i) for i in (1, 3, 4)]
+    # Only record headers are left outside the blobs, far below the reclaim threshold
+    assert packed.reclaim() == 0
+
+def test_rebuild_index_from_the_pack_alone(tmp_path, packed):
+    for i in range(4):
+        put(packed, f"{i}.enc", blob(i))
+    put(packed, "1.enc", b"newer")
+    packed.delete("3.enc")
+    packed.compact()
+    put(packed, "4.enc", blob(4))
+    packed.delete("0.enc")
+
+    # Restore a backup of the pack files without index.db
+    restored = tmp_path / "restored"
+    os.makedirs(restored)
+    for name in os.listdir(packed.directory):
+        if name.startswith("pack-"):
+            shutil.copy(os.path.join(packed.directory, name), restored / name)
+    store = PackedImageStore(str(restored))
+    assert list(store.names()) == []
+
+    assert store.rebuild_index() == 3
+    assert sorted(store.names()) == ["1.enc", "2.enc", "4.enc"]
+    assert get(store, "1.enc") == b"newer"
+    assert get(store, "2.enc") == blob(2)
+    assert get(store, "4.enc") == blob(4)
+
+def test_deleted_records_are_marked_in_the_pack(packed):
+    put(packed, "1.enc", b"data")
+    packed.delete("1.enc")
+    with open(packed._pack_path(0), 'rb') as pack:
+        magic, _, _ = PACK_RECORD_HEADER.unpack(pack.read(PACK_RECORD_HEADER.size))
+    assert magic == PACK_DELETED_MAGIC
+
+@pytest.mark.parametrize("target_layout", ["sharded", "packed"])
+def test_migrate_from_flat_with_delete_source(tmp_path, flat, target_layout):
+    if target_layout == "sharded":
+        target = ShardedImageStore(str(tmp_path / "sharded"), depth=2)
+    else:
+        target = PackedImageStore(str(tmp_path / "target-pack"))
+    names = [f"{i}.enc" for i in range(5)] + ["0.thumb200.enc"]
+    for i, blob_name in enumerate(names):
+        put(flat, blob_name, blob(i))
+    # Copied by an earlier, interrupted run
+    put(target, "3.enc", blob(3))
+
+    progress = []
+    counts = migrate_image_store(flat, target, delete_source=True,
+                                 progress_callback=lambda *counts: progress.append(counts))
+
+    assert counts == {"copied": 5, "skipped": 1, "failed": 0}
+    assert progress[-1] == (5, 1, 0)
+    assert list(flat.names()) == []
+    assert sorted(target.names()) == sorted(names)
+    for i, blob_name in enumerate(names):
+        assert get(target, blob_name) == blob(i)
+
+def test_migrate_keeps_the_source_by_default(tmp_path, flat):
+    target = PackedImageStore(str(tmp_path / "target-pack"))
+    put(flat, "1.enc", b"one")
+    assert migrate_image_store(flat, target) == {"copied": 1, "skipped": 0, "failed": 0}
+    assert get(flat, "1.enc") == b"one"
+    assert migrate_image_store(flat, target) == {"copied": 0, "skipped": 1, "failed": 0}
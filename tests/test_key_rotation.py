@@ -0,0 +1,191 @@
+import io
+import os
+import struct
+import pytest
+from Crypto.Cipher import AES
+from Crypto.Random import get_random_bytes
+import encryption
+from encryption import (
+    ImageEncryptor,
+    KeyProvider,
+    KEY_BLOCK_OFFSET,
+    KEY_BLOCK_SIZE,
+    KEY_ID_SIZE,
+    STREAM_MAGIC,
+    STREAM_NONCE_PREFIX_SIZE,
+    key_id,
+)
+from image_stores import FlatImageStore
+from key_rotation import KeyRotation
+
+CHUNK = 64
+
+@pytest.fixture
+def store(tmp_path):
+    os.makedirs(tmp_path / "images")
+    return FlatImageStore(str(tmp_path / "images"))
+
+def write_blob(store, encryptor, blob_name, data):
+    with store.open_write(blob_name) as dst:
+        encryptor.encrypt_stream(io.BytesIO(data), dst, chunk_size=CHUNK)
+
+def write_v1_blob(store, key, blob_name, data):
+    # Original format: one GCM message, nonce(16) + tag(16) + ciphertext
+    cipher = AES.new(bytes(key), AES.MODE_GCM, nonce=get_random_bytes(16))
+    ciphertext, tag = cipher.encrypt_and_digest(data)
+    with store.open_write(blob_name) as dst:
+        dst.write(cipher.nonce + tag + ciphertext)
+
+def write_v2_blob(store, encryptor, key, blob_name, data):
+    # Chunked format with the master key used for the chunks directly
+    header = STREAM_MAGIC + struct.pack(">I", CHUNK) + get_random_bytes(STREAM_NONCE_PREFIX_SIZE)
+    chunks = [data[i:i + CHUNK] for i in range(0, len(data), CHUNK)] or [b""]
+    with store.open_write(blob_name) as dst:
+        dst.write(header)
+        for index, chunk in enumerate(chunks):
+            ciphertext, tag = encryptor._chunk_cipher(bytes(key), header, index, index == len(chunks) - 1).encrypt_and_digest(chunk)
+            dst.write(ciphertext + tag)
+
+def read_blob(store, encryptor, blob_name):
+    with store.open_read(blob_name) as src:
+        return encryptor.decrypt_bytes(src)
+
+def wrapping_key_id(store, encryptor, blob_name):
+    with store.open_read(blob_name) as src:
+        return encryptor.read_key_block(src)[1][:KEY_ID_SIZE]
+
+def payload(i):
+    return bytes([i]) * (CHUNK * 2 + 10)
+
+def test_rotation_rewraps_every_file_and_promotes_the_key(store, encryptor):
+    old_key = bytes(encryptor.key)
+    for i in range(5):
+        write_blob(store, encryptor, f"{i}.enc", payload(i))
+
+    result = KeyRotation(store, encryptor, workers=2, batch_size=2).run()
+
+    assert result["completed"] and result["rewrapped"] == 5 and result["failed"] == 0
+    new_key = bytes(encryptor.key)
+    assert new_key != old_key
+    for i in range(5):
+        assert wrapping_key_id(store, encryptor, f"{i}.enc") == key_id(new_key)
+        assert read_blob(store, encryptor, f"{i}.enc") == payload(i)
+
+    # Another process starting afresh reads them with the promoted key file
+    fresh = ImageEncryptor(key_provider=KeyProvider(encryptor.key_path, env_var=None, lock_memory=False))
+    assert read_blob(store, fresh, "3.enc") == payload(3)
+    assert not os.path.exists(encryptor.key_provider.next_key_path)
+
+def test_repair_restores_a_torn_key_block_from_the_journal(store, encryptor):
+    write_blob(store, encryptor, "1.enc", payload(1))
+    with store.open_read("1.enc") as src:
+        _, old_block = encryptor.read_key_block(src)
+
+    rotation = KeyRotation(store, encryptor)
+    rotation.journal.record([("1.enc", old_block)])
+    # A crash tore the in-place rewrite of the block
+    with store.open_update("1.enc") as f:
+        f.seek(KEY_BLOCK_OFFSET)
+        f.write(get_random_bytes(KEY_BLOCK_SIZE))
+    with pytest.raises(ValueError):
+        read_blob(store, encryptor, "1.enc")
+
+    assert rotation.repair() == 1
+    assert read_blob(store, encryptor, "1.enc") == payload(1)
+    assert not os.path.exists(rotation.journal.path)
+
+def test_repair_leaves_a_completed_rewrite_alone(store, encryptor):
+    write_blob(store, encryptor, "1.enc", payload(1))
+    with store.open_read("1.enc") as src:
+        _, block = encryptor.read_key_block(src)
+    rotation = KeyRotation(store, encryptor)
+    rotation.journal.record([("1.enc", block), ("gone.enc", block)])
+    assert rotation.repair() == 0
+    assert read_blob(store, encryptor, "1.enc") == payload(1)
+
+def test_file_under_an_unknown_key_fails_and_the_old_key_is_kept(tmp_path, store, encryptor):
+    old_key = bytes(encryptor.key)
+    write_blob(store, encryptor, "1.enc", payload(1))
+    stranger = ImageEncryptor(key_provider=KeyProvider(str(tmp_path / "other_key.bin"), env_var=None, lock_memory=False))
+    write_blob(store, stranger, "2.enc", payload(2))
+
+    result = KeyRotation(store, encryptor).run()
+
+    assert not result["completed"]
+    assert result["failed"] == 1 and result["rewrapped"] == 1
+    assert bytes(encryptor.key) == old_key
+    with open(encryptor.key_path, 'rb') as f:
+        assert f.read() == old_key
+    # The rotated file still opens through the pending next key
+    assert read_blob(store, encryptor, "1.enc") == payload(1)
+
+def test_legacy_files_are_reencrypted_into_envelopes(store, encryptor):
+    key = encryptor.key
+    data = b"legacy image bytes" * 20
+    write_v1_blob(store, key, "1.enc", data)
+    write_v2_blob(store, encryptor, key, "2.enc", data)
+    assert read_blob(store, encryptor, "1.enc") == data
+    assert read_blob(store, encryptor, "2.enc") == data
+
+    result = KeyRotation(store, encryptor).run()
+
+    assert result["completed"] and result["reencrypted"] == 2
+    for blob_name in ("1.enc", "2.enc"):
+        assert wrapping_key_id(store, encryptor, blob_name) == key_id(encryptor.key)
+        assert read_blob(store, encryptor, blob_name) == data
+
+def test_interrupted_rotation_resumes(store, encryptor):
+    for i in range(6):
+        write_blob(store, encryptor, f"{i}.enc", payload(i))
+
+    def stop_after_first_batch(done, total, counts):
+        raise KeyboardInterrupt
+    with pytest.raises(KeyboardInterrupt):
+        KeyRotation(store, encryptor, batch_size=2).run(stop_after_first_batch)
+    assert os.path.exists(encryptor.key_provider.next_key_path)
+
+    result = KeyRotation(store, encryptor, batch_size=2).run()
+
+    assert result["completed"] and result["rewrapped"] == 4 and result["failed"] == 0
+    for i in range(6):
+        assert read_blob(store, encryptor, f"{i}.enc") == payload(i)
+
+def test_files_written_during_a_sweep_are_caught_by_the_next(store, encryptor):
+    old_encryptor = ImageEncryptor(key_provider=KeyProvider(encryptor.key_path, env_var=None, lock_memory=False))
+    for i in range(4):
+        write_blob(store, encryptor, f"{i}.enc", payload(i))
+
+    written = []
+    def write_during_first_sweep(done, total, counts):
+        if not written:
+            # Another process still wrapping new files with the old key
+            write_blob(store, old_encryptor, "late.enc", payload(9))
+            written.append(True)
+
+    result = KeyRotation(store, encryptor, batch_size=2).run(write_during_first_sweep)
+
+    assert result["completed"] and result["rewrapped"] == 5
+    assert wrapping_key_id(store, encryptor, "late.enc") == key_id(encryptor.key)
+    assert read_blob(store, encryptor, "late.enc") == payload(9)
+
+def test_key_file_is_checked_at_most_once_per_interval(store, encryptor, monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(encryption.time, "monotonic", lambda: clock[0])
+    provider = KeyProvider(encryptor.key_path, env_var=None, lock_memory=False, check_interval=5)
+    old_key = bytes(provider.get_key())
+
+    stats = []
+    real_stamp = provider._key_file_stamp
+    monkeypatch.setattr(provider, "_key_file_stamp", lambda: stats.append(1) or real_stamp())
+    for _ in range(100):
+        provider.get_key()
+    assert stats == []
+
+    # Rotated by another process: seen only once the interval has passed
+    write_blob(store, encryptor, "1.enc", payload(1))
+    assert KeyRotation(store, encryptor).run()["completed"]
+    clock[0] += 4
+    assert bytes(provider.get_key()) == old_key
+    clock[0] += 2
+    assert bytes(provider.get_key()) == bytes(encryptor.key) != old_key
+    assert len(stats) == 3
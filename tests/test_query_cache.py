@@ -0,0 +1,104 @@
+import numpy as np
+import pytest
+from vector_store import QueryCache, VectorStore
+
+DIM = 512
+
+def unit(vector):
+    vector = np.asarray(vector, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+@pytest.fixture
+def store(tmp_path):
+    return VectorStore(DIM, index_path=str(tmp_path / "index.bin"), tombstone_path=str(tmp_path / "tombstones.bin"))
+
+def test_hit_returns_cached_matches():
+    cache = QueryCache(max_entries=8)
+    key = cache.make_key(unit(np.ones(DIM)), 5, 0.6)
+    assert cache.get(key, 0) is None
+    cache.put(key, 0, [(7, 0.9)])
+    assert cache.get(key, 0) == [(7, 0.9)]
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"]) == (1, 1)
+    assert stats["hit_rate"] == 0.5
+
+def test_entry_from_older_generation_is_never_served():
+    cache = QueryCache(max_entries=8)
+    key = cache.make_key(unit(np.ones(DIM)), 5, 0.6)
+    cache.put(key, 0, [(7, 0.9)])
+    assert cache.get(key, 1) is None
+    assert cache.stats()["stale_rejections"] == 1
+    # Discarded, not kept for a later lookup at the old generation
+    assert cache.get(key, 0) is None
+
+def test_search_parameters_are_part_of_the_key():
+    cache = QueryCache()
+    embedding = unit(np.ones(DIM))
+    assert cache.make_key(embedding, 5, 0.6) != cache.make_key(embedding, 3, 0.6)
+    assert cache.make_key(embedding, 5, 0.6) != cache.make_key(embedding, 5, 0.7)
+
+def test_nearby_queries_share_a_key():
+    cache = QueryCache(quant_step=0.02)
+    rng = np.random.default_rng(0)
+    embedding = unit(rng.standard_normal(DIM))
+    jittered = embedding + 0.001 * np.sign(rng.standard_normal(DIM))
+    # Keep every component inside its rounding bucket
+    jittered = np.where(np.round(jittered / 0.02) == np.round(embedding / 0.02), jittered, embedding)
+    assert cache.make_key(embedding, 5, 0.6) == cache.make_key(jittered, 5, 0.6)
+
+@pytest.mark.parametrize("quant_step", [0.02, 0.004, 0.0005])
+def test_large_components_do_not_collide(quant_step):
+    # With an 8-bit key, components 256 steps apart wrapped to the same value
+    cache = QueryCache(quant_step=quant_step)
+    first = np.zeros(DIM, dtype=np.float32)
+    second = np.zeros(DIM, dtype=np.float32)
+    first[0], second[0] = 0.9, 0.9 - 256 * quant_step
+    assert cache.make_key(first, 5, 0.6) != cache.make_key(second, 5, 0.6)
+
+@pytest.mark.parametrize("quant_step", [0, -0.1, 1e-6, 2.0])
+def test_unusable_quant_step_is_rejected(quant_step):
+    with pytest.raises(ValueError):
+        QueryCache(quant_step=quant_step)
+
+def test_cache_stays_within_its_entry_limit():
+    cache = QueryCache(max_entries=4)
+    rng = np.random.default_rng(1)
+    for _ in range(20):
+        cache.put(cache.make_key(unit(rng.standard_normal(DIM)), 5, 0.6), 0, [(1, 0.9)])
+    stats = cache.stats()
+    assert stats["entries"] == 4
+    assert 0 < stats["memory_bytes"] < 4096
+
+def test_store_repeats_search_from_cache(store):
+    embedding = unit(np.ones(DIM))
+    store.add_embedding(embedding, 1)
+    first = store.search_embeddings(embedding, with_scores=True)
+    assert store.search_embeddings(embedding, with_scores=True) == first
+    assert store.query_cache.stats()["hits"] == 1
+
+def test_add_invalidates_cached_results(store):
+    rng = np.random.default_rng(2)
+    query = unit(rng.standard_normal(DIM))
+    store.add_embedding(unit(rng.standard_normal(DIM)), 1)
+    assert store.search_embeddings(query) == [-1]
+
+    store.add_embedding(query, 2)
+    assert store.search_embeddings(query) == [2]
+    assert store.query_cache.stats()["stale_rejections"] == 1
+
+def test_close_invalidates_cached_results(store):
+    embedding = unit(np.ones(DIM))
+    store.add_embedding(embedding, 1)
+    assert store.search_embeddings(embedding) == [1]
+
+    store.close_embedding(1)
+    assert store.search_embeddings(embedding) == [-1]
+
+def test_close_by_another_process_invalidates_cached_results(store, tmp_path):
+    embedding = unit(np.ones(DIM))
+    store.add_embedding(embedding, 1)
+    assert store.search_embeddings(embedding) == [1]
+
+    other = VectorStore(DIM, index_path=str(tmp_path / "index.bin"), tombstone_path=str(tmp_path / "tombstones.bin"))
+    other.close_embedding(1)
+    assert store.search_embeddings(embedding) == [-1]
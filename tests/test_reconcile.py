@@ -0,0 +1,65 @@
+import faiss
+import numpy as np
+import pytest
+import database
+import reconcile
+from vector_store import VectorStore
+
+DIM = 512
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    def open_store():
+        return VectorStore(DIM, index_path=str(tmp_path / "index.bin"), tombstone_path=str(tmp_path / "tombstones.bin"))
+    monkeypatch.setattr(reconcile, "VectorStore", open_store)
+    return open_store
+
+def register_metadata(embedding_id):
+    assert database.insert_child_metadata(f"Child {embedding_id}", 6, "Male", "555-0100",
+                                          embedding_id, f"images/{embedding_id}.enc")
+
+def index_ids(store):
+    # Keep the store referenced while its id_map is read
+    vector_store = store()
+    return sorted(faiss.vector_to_array(vector_store.index.id_map).tolist())
+
+def add_vectors(store, embedding_ids):
+    rng = np.random.default_rng(0)
+    assert store().add_embeddings(rng.standard_normal((len(embedding_ids), DIM)), embedding_ids)
+
+def test_registration_in_flight_is_not_removed(db, store, monkeypatch):
+    add_vectors(store, [1, 2, 3, 4])
+    register_metadata(1)
+    register_metadata(2)
+
+    waited = []
+    def commit_during_grace(seconds):
+        # Registration of 3 commits its metadata row while reconcile waits
+        waited.append(seconds)
+        register_metadata(3)
+    monkeypatch.setattr(reconcile.time, "sleep", commit_during_grace)
+
+    report = reconcile.reconcile_stores(grace_seconds=60)
+
+    assert waited and 0 < waited[0] <= 60
+    assert report["index_only"] == 2 and report["index_only_in_flight"] == 1
+    assert index_ids(store) == [1, 2, 3]
+
+def test_orphans_are_removed_once_the_grace_window_has_passed(db, store, monkeypatch):
+    add_vectors(store, [1, 2])
+    register_metadata(1)
+    monkeypatch.setattr(reconcile.time, "sleep", lambda seconds: pytest.fail("no wait expected"))
+
+    report = reconcile.reconcile_stores(grace_seconds=0)
+
+    assert report["index_only"] == 1 and report["index_only_in_flight"] == 0
+    assert index_ids(store) == [1]
+
+def test_dry_run_does_not_wait_or_remove(db, store, monkeypatch):
+    add_vectors(store, [1, 2])
+    monkeypatch.setattr(reconcile.time, "sleep", lambda seconds: pytest.fail("no wait expected"))
+
+    report = reconcile.reconcile_stores(dry_run=True, grace_seconds=60)
+
+    assert report["index_only"] == 2
+    assert index_ids(store) == [1, 2]
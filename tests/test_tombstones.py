@@ -0,0 +1,131 @@
+import threading
+import faiss
+import numpy as np
+import pytest
+from tombstones import TombstoneBitmap
+from vector_store import VectorStore
+
+DIM = 512
+
+def vectors(count, seed=0):
+    rng = np.random.default_rng(seed)
+    batch = rng.standard_normal((count, DIM)).astype(np.float32)
+    return batch / np.linalg.norm(batch, axis=1)[:, np.newaxis]
+
+def open_store(tmp_path):
+    return VectorStore(DIM, index_path=str(tmp_path / "index.bin"), tombstone_path=str(tmp_path / "tombstones.bin"))
+
+def index_ids(store):
+    return sorted(faiss.vector_to_array(store.index.id_map).tolist())
+
+@pytest.fixture
+def store(tmp_path):
+    return open_store(tmp_path)
+
+def test_tombstoned_ids_are_skipped_in_search(store):
+    embeddings = vectors(10)
+    assert store.add_embeddings(embeddings, list(range(10)))
+    assert store.search_embeddings(embeddings[3], top_k=1) == [3]
+
+    assert store.close_embedding(3)
+
+    # Still physically in the index, but never returned
+    assert store.index.ntotal == 10
+    assert 3 not in store.search_embeddings(embeddings[3], top_k=10, similarity_threshold=0.0)
+    assert store.search_embeddings(embeddings[3], top_k=1) == [-1]
+    batch = store.search_embeddings_batch(embeddings[[3, 4]], top_k=1)
+    assert batch == [[-1], [4]]
+
+def test_top_k_is_filled_past_tombstoned_neighbours(store):
+    embeddings = vectors(20)
+    store.add_embeddings(embeddings, list(range(20)))
+    nearest = store.search_embeddings(embeddings[0], top_k=5, similarity_threshold=0.0)
+    for embedding_id in nearest[:3]:
+        store.close_embedding(embedding_id)
+
+    results = store.search_embeddings(embeddings[0], top_k=5, similarity_threshold=0.0)
+    assert len(results) == 5 and not set(results) & set(nearest[:3])
+
+def test_bitmap_persists_and_reloads(tmp_path):
+    path = str(tmp_path / "tombstones.bin")
+    bitmap = TombstoneBitmap(path)
+    assert bitmap.set(5) and bitmap.set_many([9, 1000])
+
+    reloaded = TombstoneBitmap(path)
+    assert reloaded.ids().tolist() == [5, 9, 1000]
+    assert reloaded.count() == 3
+    assert not reloaded.is_set(6)
+
+    # A second instance picks up changes written by the first
+    bitmap.clear_many([9, 1000])
+    assert reloaded.refresh()
+    assert reloaded.ids().tolist() == [5]
+    assert not reloaded.refresh()
+
+def test_close_in_another_process_is_seen_by_search(tmp_path, store):
+    embeddings = vectors(4)
+    store.add_embeddings(embeddings, list(range(4)))
+    generation = store.current_generation()
+    assert store.search_embeddings(embeddings[2], top_k=1) == [2]
+
+    TombstoneBitmap(str(tmp_path / "tombstones.bin")).set(2)
+
+    # The cached result from before the close is not served
+    assert store.search_embeddings(embeddings[2], top_k=1) == [-1]
+    assert store.current_generation() > generation
+
+def test_compaction_drops_exactly_the_tombstoned_vectors(tmp_path, store):
+    store.add_embeddings(vectors(10), list(range(10)))
+    for embedding_id in (2, 5, 7):
+        store.close_embedding(embedding_id)
+    # Registered by another process after this store loaded the index
+    other = open_store(tmp_path)
+    other.add_embeddings(vectors(2, seed=1), [10, 11])
+
+    assert store.compact(force=True) == 3
+
+    expected = [0, 1, 3, 4, 6, 8, 9, 10, 11]
+    assert index_ids(store) == expected
+    assert store.tombstones.count() == 0
+    assert index_ids(open_store(tmp_path)) == expected
+
+def test_compaction_below_the_threshold_is_skipped(store):
+    store.add_embeddings(vectors(10), list(range(10)))
+    store.close_embedding(4)
+    assert store.compact() == 0
+    assert store.index.ntotal == 10 and store.tombstones.is_set(4)
+    assert store.compact(force=True) == 1
+
+def test_compaction_waits_for_the_index_file_lock(store):
+    store.add_embeddings(vectors(5), list(range(5)))
+    store.close_embedding(1)
+
+    removed = []
+    with store._index_file_lock():
+        compaction = threading.Thread(target=lambda: removed.append(store.compact(force=True)))
+        compaction.start()
+        compaction.join(0.3)
+        # Blocked until the lock is released, with nothing purged yet
+        assert compaction.is_alive()
+        assert store.index.ntotal == 5 and store.tombstones.is_set(1)
+    compaction.join(5)
+
+    assert removed == [1]
+    assert index_ids(store) == [0, 2, 3, 4]
+
+@pytest.mark.parametrize("compact_first", [False, True])
+def test_reused_closed_id_becomes_searchable_again(store, compact_first):
+    old, new = vectors(2, seed=2)
+    store.add_embeddings(vectors(4), [0, 1, 2, 3])
+    store.add_embedding(old, 7)
+    store.close_embedding(7)
+    if compact_first:
+        store.compact(force=True)
+
+    assert store.add_embedding(new, 7)
+
+    assert not store.tombstones.is_set(7)
+    assert store.search_embeddings(new, top_k=1) == [7]
+    # Only the new vector is held under the reused ID
+    assert index_ids(store).count(7) == 1
+    assert 7 not in store.search_embeddings(old, top_k=5, similarity_threshold=0.9)
@@ -0,0 +1,227 @@
+import os
+import threading
+import logging
+import numpy as np
+from config import FAISS_TOMBSTONE_PATH
+
+class TombstoneBitmap:
+    def __init__(self, path=FAISS_TOMBSTONE_PATH):
+        """
+        Persistent bitmap of embedding IDs that are closed but still physically in the FAISS index
+
+        Bit N of the file is set when embedding ID N has been closed. Setting a bit
+        rewrites a single byte, so closing a case costs the same regardless of gallery size.
+
+        Args:
+            path (str): Path of the bitmap file
+        """
+        self.path = path
+        self.lock = threading.Lock()
+        self.bits = bytearray()
+        self._count = 0
+        self._stamp = None
+        self.refresh()
+
+    def _file_stamp(self):
+        try:
+            stat = os.stat(self.path)
+            return (stat.st_mtime_ns, stat.st_size)
+        except FileNotFoundError:
+            return None
+
+    def refresh(self):
+        """
+        Reload the bitmap if another process or instance has changed it on disk
+        
+        Returns:
+            bool: True if the bitmap changed since it was last loaded
+        """
+        with self.lock:
+            stamp = self._file_stamp()
+            if stamp == self._stamp:
+                return False
+            if stamp is None:
+                self.bits = bytearray()
+            else:
+                with open(self.path, 'rb') as f:
+                    self.bits = bytearray(f.read())
+            self._stamp = stamp
+            self._count = int.from_bytes(self.bits, 'little').bit_count()
+            return True
+
+    def is_set(self, embedding_id):
+        """
+        Check whether an embedding ID is tombstoned
+
+        Args:
+            embedding_id (int): Embedding ID to check
+
+        Returns:
+            bool: True if the ID has been closed
+        """
+        embedding_id = int(embedding_id)
+        byte_index = embedding_id >> 3
+        if embedding_id < 0 or byte_index >= len(self.bits):
+            return False
+        return bool(self.bits[byte_index] & (1 << (embedding_id & 7)))
+
+    def set(self, embedding_id):
+        """
+        Tombstone a single embedding ID by rewriting only the byte that holds its bit
+
+        Args:
+            embedding_id (int): Embedding ID to tombstone
+
+        Returns:
+            bool: True if the tombstone was written
+        """
+        embedding_id = int(embedding_id)
+        if embedding_id < 0:
+            logging.error(f"Cannot tombstone negative embedding ID: {embedding_id}")
+            return False
+
+        byte_index = embedding_id >> 3
+        mask = 1 << (embedding_id & 7)
+
+        with self.lock:
+            if byte_index < len(self.bits) and self.bits[byte_index] & mask:
+                return True
+
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            mode = 'r+b' if os.path.exists(self.path) else 'w+b'
+            with open(self.path, mode) as f:
+                f.seek(byte_index)
+                current = f.read(1)
+                value = (current[0] if current else 0) | mask
+                f.seek(byte_index)
+                f.write(bytes([value]))
+
+            if byte_index >= len(self.bits):
+                self.bits.extend(bytes(byte_index + 1 - len(self.bits)))
+            self.bits[byte_index] |= mask
+            self._count += 1
+            self._stamp = self._file_stamp()
+        return True
+
+    def set_many(self, embedding_ids):
+        """
+        Tombstone several embedding IDs with one rewrite of the bitmap
+
+        Args:
+            embedding_ids (iterable): Embedding IDs to tombstone
+
+        Returns:
+            int: Number of IDs tombstoned
+        """
+        embedding_ids = np.unique(np.asarray(list(embedding_ids), dtype=np.int64))
+        if len(embedding_ids) and embedding_ids[0] < 0:
+            logging.error("Cannot tombstone negative embedding IDs")
+            embedding_ids = embedding_ids[embedding_ids >= 0]
+        if len(embedding_ids) == 0:
+            return 0
+        if len(embedding_ids) == 1:
+            return 1 if self.set(embedding_ids[0]) else 0
+
+        with self.lock:
+            self._reread()
+            needed = int(embedding_ids[-1] >> 3) + 1
+            if needed > len(self.bits):
+                self.bits.extend(bytes(needed - len(self.bits)))
+
+            bitmap = np.frombuffer(bytes(self.bits), dtype=np.uint8).copy()
+            np.bitwise_or.at(bitmap, embedding_ids >> 3, (1 << (embedding_ids & 7)).astype(np.uint8))
+            self.bits = bytearray(bitmap.tobytes())
+            self._write_all()
+        return len(embedding_ids)
+
+    def clear_many(self, embedding_ids):
+        """
+        Clear tombstones once their vectors have been purged from the index
+
+        Args:
+            embedding_ids (iterable): Embedding IDs to clear
+        """
+        with self.lock:
+            self._reread()
+
+            for embedding_id in embedding_ids:
+                embedding_id = int(embedding_id)
+                byte_index = embedding_id >> 3
+                if 0 <= embedding_id and byte_index < len(self.bits):
+                    self.bits[byte_index] &= ~(1 << (embedding_id & 7)) & 0xFF
+
+            # Trailing zero bytes carry no information
+            self.bits = bytearray(bytes(self.bits).rstrip(b'\x00'))
+            self._write_all()
+
+    def _reread(self):
+        # Re-read so bits set by other writers since our last load are kept
+        if os.path.exists(self.path):
+            with open(self.path, 'rb') as f:
+                self.bits = bytearray(f.read())
+
+    def _write_all(self):
+        # Replace the file atomically so readers never see a half-written bitmap
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(self.bits)
+        os.replace(tmp_path, self.path)
+
+        self._count = int.from_bytes(self.bits, 'little').bit_count()
+        self._stamp = self._file_stamp()
+
+    def ids(self):
+        """
+        Get all tombstoned embedding IDs
+
+        Returns:
+            numpy.ndarray: Tombstoned IDs as int64
+        """
+        if not self.bits:
+            return np.empty(0, dtype=np.int64)
+        unpacked = np.unpackbits(np.frombuffer(bytes(self.bits), dtype=np.uint8), bitorder='little')
+        return np.flatnonzero(unpacked).astype(np.int64)
+
+    def count(self):
+        """
+        Get the number of tombstoned embedding IDs
+
+        Returns:
+            int: Number of tombstones
+        """
+        return self._count
+
+# Utility functions
+def tombstone_embedding(embedding_id):
+    """
+    Convenience function to mark a closed embedding so searches skip it immediately
+
+    Args:
+        embedding_id (int): Embedding ID to tombstone
+
+    Returns:
+        bool: True if the tombstone was written
+    """
+    try:
+        return TombstoneBitmap().set(embedding_id)
+    except Exception as e:
+        logging.error(f"Error tombstoning embedding {embedding_id}: {e}")
+        return False
+
+def tombstone_embeddings(embedding_ids):
+    """
+    Convenience function to tombstone several closed embeddings with one bitmap write
+    
+    Args:
+        embedding_ids (iterable): Embedding IDs to tombstone
+    
+    Returns:
+        bool: True if the tombstones were written
+    """
+    try:
+        TombstoneBitmap().set_many(embedding_ids)
+        return True
+    except Exception as e:
+        logging.error(f"Error tombstoning {len(list(embedding_ids))} embeddings: {e}")
+        return False
@@ -1,21 +1,191 @@
 import faiss
 import numpy as np
 import os
-from config import FAISS_INDEX_PATH, SIMILARITY_THRESHOLD
+import sys
+import contextlib
+import hashlib
+import threading
+from collections import OrderedDict
+try:
+    import fcntl
+except ImportError:
+    # Windows
+    fcntl = None
+    import msvcrt
+from config import (
+    FAISS_INDEX_PATH,
+    FAISS_TOMBSTONE_PATH,
+    FAISS_INDEX_DESCRIPTION,
+    SIMILARITY_THRESHOLD,
+    TOMBSTONE_COMPACTION_FRACTION,
+    QUERY_CACHE_SIZE,
+    QUERY_CACHE_QUANT_STEP
+)
 import logging
 from database import search_open_cases
+from tombstones import TombstoneBitmap
+
+# Serialises in-process compactions so two background jobs never rewrite the index at once
+_compaction_lock = threading.Lock()
+_compaction_thread = None
+
+@contextlib.contextmanager
+def _exclusive_file_lock(path):
+    """
+    Hold an exclusive lock on a lock file, shared by every process using the index
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'a+b') as f:
+        if fcntl:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            while True:
+                try:
+                    # LK_LOCK gives up after about 10 seconds; keep waiting
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+class QueryCache:
+    def __init__(self, max_entries=QUERY_CACHE_SIZE, quant_step=QUERY_CACHE_QUANT_STEP):
+        """
+        LRU cache of search results keyed by a quantised embedding signature
+        
+        Every entry records the index generation it was computed at. A lookup made
+        at a later generation discards the entry instead of returning it, so adds,
+        closes and compactions can never serve stale matches.
+        
+        Args:
+            max_entries (int): Maximum cached results (0 disables caching)
+            quant_step (float): Rounding step applied to embedding components for the key
+        """
+        # Components of a normalised embedding lie in [-1, 1]; the quantised values must fit in int16
+        if not 0 < quant_step <= 1 or 1 / quant_step > np.iinfo(np.int16).max:
+            raise ValueError(f"QUERY_CACHE_QUANT_STEP must be in [{1 / np.iinfo(np.int16).max:.1e}, 1], got {quant_step}")
+        self.max_entries = max_entries
+        self.quant_step = quant_step
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.stale_rejections = 0
+
+    def make_key(self, embedding, top_k, similarity_threshold):
+        """
+        Build the cache key for a normalised query embedding
+        
+        Returns:
+            bytes: Digest of the quantised embedding plus search parameters
+        """
+        components = np.clip(np.asarray(embedding, dtype=np.float32).ravel(), -1.0, 1.0)
+        quantised = np.round(components / self.quant_step).astype(np.int16)
+        digest = hashlib.blake2b(quantised.tobytes(), digest_size=16)
+        digest.update(f"{top_k}:{similarity_threshold}".encode())
+        return digest.digest()
+
+    def get(self, key, generation):
+        """
+        Look up a cached result for the current index generation
+        
+        Returns:
+            list or None: Cached (embedding_id, similarity) pairs, or None on a miss
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            
+            entry_generation, matches = entry
+            if entry_generation != generation:
+                # Computed against an older gallery; never serve it
+                del self.entries[key]
+                self.stale_rejections += 1
+                self.misses += 1
+                return None
+            
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return list(matches)
+
+    def put(self, key, generation, matches):
+        """
+        Store a search result tagged with the generation it was computed at
+        """
+        if self.max_entries <= 0:
+            return
+        with self.lock:
+            self.entries[key] = (generation, tuple((int(m), float(score)) for m, score in matches))
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self):
+        """
+        Report cache effectiveness
+        
+        Returns:
+            dict: Hit/miss counts, hit rate, stale rejections, entry count and approximate memory in bytes
+        """
+        with self.lock:
+            lookups = self.hits + self.misses
+            memory_bytes = sys.getsizeof(self.entries) + sum(
+                sys.getsizeof(key) + sys.getsizeof(entry) + sys.getsizeof(entry[1])
+                + sum(sys.getsizeof(m) for m in entry[1])
+                for key, entry in self.entries.items()
+            )
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "stale_rejections": self.stale_rejections,
+                "entries": len(self.entries),
+                "memory_bytes": memory_bytes
+            }
 
 class VectorStore:
-    def __init__(self, embedding_dim=512):
+    def __init__(self, embedding_dim=512, index_path=FAISS_INDEX_PATH,
+                 tombstone_path=FAISS_TOMBSTONE_PATH, index_description=FAISS_INDEX_DESCRIPTION):
         """
         Initialize FAISS vector store with comprehensive error handling
+        
+        Args:
+            embedding_dim (int): Dimension of stored embeddings
+            index_path (str): Path of the persisted FAISS index
+            tombstone_path (str): Path of the tombstone bitmap for this index
+            index_description (str): faiss.index_factory string used when creating a new index
         """
         logging.basicConfig(level=logging.INFO)
         self.logger = logging.getLogger(__name__)
         
         # Ensure a consistent index type
         self.embedding_dim = embedding_dim
+        self.index_path = index_path
+        self.index_description = index_description
         self.index = None
+        self._index_stamp = None
+        # Adds and removals not yet saved, replayed onto the file on disk if another
+        # process rewrote it meanwhile: (IDs to remove, embeddings to add or None, their IDs)
+        self._pending = []
+        self.tombstones = TombstoneBitmap(tombstone_path)
+        
+        # Bumped on every add, close, compaction or reload; cached results are tagged with it
+        self.generation = 0
+        self.query_cache = QueryCache()
         
         # Initialize the index
         self.create_or_load_index()
@@ -23,71 +193,232 @@ class VectorStore:
     def create_or_load_index(self):
         """
         Create a new index or load an existing one
+        
+        A file that cannot be read never replaces the gallery with an empty
+        index: the index already loaded is kept, and a failed first load raises.
+        Unsaved adds and removals are replayed onto the loaded index.
+        
+        Returns:
+            bool: True if an index was created or loaded, False if the file could not be read
         """
-        try:
-            # Create a new index if file doesn't exist
-            if not os.path.exists(FAISS_INDEX_PATH):
-                self.logger.info("Creating new FAISS index")
-                # Use IndexFlatL2 for Euclidean distance (better for facial embeddings)
-                base_index = faiss.IndexFlatL2(self.embedding_dim)
-                self.index = faiss.IndexIDMap(base_index)
+        # Create a new index if file doesn't exist
+        if not os.path.exists(self.index_path):
+            self.logger.info(f"Creating new FAISS index ({self.index_description})")
+            # L2 distance over normalised embeddings (better for facial embeddings)
+            self.index = faiss.index_factory(self.embedding_dim, self.index_description)
+            if self.index.is_trained:
                 self.save_index()
-            else:
-                # Load existing index
-                self.logger.info("Loading existing FAISS index")
-                self.index = faiss.read_index(FAISS_INDEX_PATH)
-                
-                # Verify index
-                self.logger.info(f"Loaded index dimension: {self.index.d}")
-                self.logger.info(f"Total vectors in index: {self.index.ntotal}")
+            return True
         
+        try:
+            # Load existing index
+            self.logger.info("Loading existing FAISS index")
+            stamp = self._file_stamp()
+            index = faiss.read_index(self.index_path)
         except Exception as e:
-            self.logger.error(f"Error creating/loading index: {e}")
-            # Fallback to creating a new index
-            base_index = faiss.IndexFlatL2(self.embedding_dim)
-            self.index = faiss.IndexIDMap(base_index)
+            self.logger.error(f"Error loading index: {e}")
+            if self.index is None:
+                raise
+            return False
+        
+        for remove_ids, embeddings, add_ids in self._pending:
+            index.remove_ids(remove_ids)
+            if embeddings is not None:
+                index.add_with_ids(embeddings, add_ids)
+        self.index = index
+        self._index_stamp = stamp
+        
+        # Verify index
+        self.logger.info(f"Loaded index dimension: {self.index.d}")
+        self.logger.info(f"Total vectors in index: {self.index.ntotal}")
+        return True
+
+    def _file_stamp(self):
+        try:
+            stat = os.stat(self.index_path)
+            return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        except FileNotFoundError:
+            return None
+
+    def reload_if_changed(self):
+        """
+        Reload the index if another process has rewritten it since it was loaded
+        
+        Long-lived holders of a VectorStore (such as the recognition server)
+        call this before searching so registrations made elsewhere are visible.
+        If the new file cannot be read, the loaded index and its stamp are kept
+        and the reload is retried on the next call.
+        
+        Returns:
+            bool: True if the index was reloaded
+        """
+        stamp = self._file_stamp()
+        if stamp is None or stamp == self._index_stamp:
+            return False
+        self.logger.info("FAISS index changed on disk, reloading")
+        if not self.create_or_load_index():
+            return False
+        self.generation += 1
+        return True
+
+    def current_generation(self):
+        """
+        Get the index generation, picking up closes written by other processes
+        
+        Returns:
+            int: Generation counter for cache tagging
+        """
+        if self.tombstones.refresh():
+            self.generation += 1
+        return self.generation
+
+    def close_embedding(self, embedding_id):
+        """
+        Tombstone an embedding so it is excluded from searches immediately
+        
+        Returns:
+            bool: True if the tombstone was written
+        """
+        if not self.tombstones.set(embedding_id):
+            return False
+        self.generation += 1
+        return True
 
     def add_embedding(self, embedding, embedding_id):
         """
         Add embedding to vector store with comprehensive checks
         """
+        return self.add_embeddings([embedding], [embedding_id])
+
+    def add_embeddings(self, embeddings, embedding_ids, save=True):
+        """
+        Add a batch of embeddings with a single index persist
+        
+        Args:
+            embeddings (array-like): Embeddings of shape (n, embedding_dim)
+            embedding_ids (array-like): One integer ID per embedding
+            save (bool): Persist the index after adding
+        
+        Returns:
+            bool: True if the batch was added
+        """
         try:
-            # Ensure embedding is correct shape and type
-            embedding = np.array([embedding], dtype=np.float32)
-            embedding_id = np.array([embedding_id], dtype=np.int64)
+            # Ensure embeddings are correct shape and type
+            embeddings = np.asarray(embeddings, dtype=np.float32).reshape(len(embedding_ids), -1)
+            embedding_ids = np.asarray(embedding_ids, dtype=np.int64)
             
             # Verify embedding dimension
-            if embedding.shape[1] != self.embedding_dim:
-                self.logger.warning(f"Embedding dimension mismatch. Expected {self.embedding_dim}, got {embedding.shape[1]}")
+            if embeddings.shape[1] != self.embedding_dim:
+                self.logger.warning(f"Embedding dimension mismatch. Expected {self.embedding_dim}, got {embeddings.shape[1]}")
                 return False
             
-            # Normalize embedding for better similarity search
-            embedding = embedding / np.linalg.norm(embedding, axis=1)[:, np.newaxis]
+            # Normalize embeddings for better similarity search
+            embeddings = embeddings / np.linalg.norm(embeddings, axis=1)[:, np.newaxis]
+            
+            # A reused ID may still have its closed vector in the index; purge it first
+            reused_ids = [eid for eid in embedding_ids if self.tombstones.is_set(eid)]
+            if reused_ids:
+                reused_ids = np.array(reused_ids, dtype=np.int64)
+                self.index.remove_ids(reused_ids)
+                self.tombstones.clear_many(reused_ids)
             
-            # Add embedding
-            self.index.add_with_ids(embedding, embedding_id)
+            # Add embeddings
+            self.index.add_with_ids(embeddings, embedding_ids)
+            self._pending.append((embedding_ids, embeddings, embedding_ids))
+            self.generation += 1
             
             # Save updated index
-            self.save_index()
+            if save:
+                self.save_index()
             
-            self.logger.info(f"Added embedding with ID {embedding_id[0]}")
+            if len(embedding_ids) == 1:
+                self.logger.info(f"Added embedding with ID {embedding_ids[0]}")
+            else:
+                self.logger.info(f"Added {len(embedding_ids)} embeddings")
             return True
         
         except Exception as e:
-            self.logger.error(f"Error adding embedding: {e}")
+            self.logger.error(f"Error adding embeddings: {e}")
             return False
 
-    def search_embeddings(self, embedding, top_k=5, similarity_threshold=SIMILARITY_THRESHOLD):
+    def remove_embeddings(self, embedding_ids, save=True):
+        """
+        Physically remove embeddings from the index (orphans without metadata)
+        
+        Args:
+            embedding_ids (array-like): Integer IDs to remove
+            save (bool): Persist the index after removing
+        
+        Returns:
+            int: Number of vectors removed
+        """
+        embedding_ids = np.asarray(embedding_ids, dtype=np.int64)
+        removed = self.index.remove_ids(embedding_ids)
+        self._pending.append((embedding_ids, None, None))
+        self.generation += 1
+        if save:
+            self.save_index()
+        return removed
+
+    def _search_k(self, top_k):
+        """
+        Number of neighbours to fetch so top_k live results survive tombstone filtering
+        """
+        self.tombstones.refresh()
+        return min(top_k + self.tombstones.count(), max(self.index.ntotal, top_k))
+
+    def _filter_matches(self, distances, ids, top_k, similarity_threshold):
+        """
+        Drop tombstoned IDs and keep live results above the similarity threshold
+        
+        Returns:
+            list: (embedding_id, similarity) pairs, most similar first
+        """
+        matches = []
+        live_results = 0
+        for dist, embedding_id in zip(distances, ids):
+            if embedding_id == -1 or self.tombstones.is_set(embedding_id):
+                continue
+            live_results += 1
+            if live_results > top_k:
+                break
+            # Convert distance to similarity
+            similarity = 1 / (1 + dist)
+            if similarity > similarity_threshold:
+                matches.append((int(embedding_id), float(similarity)))
+        return matches
+
+    @staticmethod
+    def _format_matches(scored_matches, with_scores):
+        """
+        Return (embedding_id, similarity) pairs, or plain IDs with -1 if no matches
+        """
+        if with_scores:
+            return scored_matches
+        return [embedding_id for embedding_id, _ in scored_matches] or [-1]
+
+    def search_embeddings(self, embedding, top_k=5, similarity_threshold=SIMILARITY_THRESHOLD, with_scores=False):
         """
         Enhanced search with improved similarity calculation
+        
+        Args:
+            with_scores (bool): Return (embedding_id, similarity) pairs ([] if no matches)
+                instead of IDs ([-1] if no matches)
         """
         try:
             # Normalize query embedding
             embedding = np.array([embedding], dtype=np.float32)
             embedding = embedding / np.linalg.norm(embedding, axis=1)[:, np.newaxis]
             
-            # Perform search
-            D, I = self.index.search(embedding, top_k)
+            # Near-identical queries (e.g. consecutive webcam frames) reuse earlier results
+            generation = self.current_generation()
+            cache_key = self.query_cache.make_key(embedding, top_k, similarity_threshold)
+            cached = self.query_cache.get(cache_key, generation)
+            if cached is not None:
+                return self._format_matches(cached, with_scores)
+            
+            # Perform search, over-fetching so closed cases can be skipped
+            D, I = self.index.search(embedding, self._search_k(top_k))
             
             # Detailed logging of search results
             self.logger.info("Search Results:")
@@ -97,33 +428,165 @@ class VectorStore:
                 self.logger.info(f"Embedding ID: {idx}, Distance: {dist}, Similarity: {similarity}")
             
             # Filter matches based on similarity
-            matches = []
-            for sim, embedding_id in zip(D[0], I[0]):
-                # Convert distance to similarity
-                similarity = 1 / (1 + sim)
-                if similarity > similarity_threshold and embedding_id != -1:
-                    matches.append(embedding_id)
+            matches = self._filter_matches(D[0], I[0], top_k, similarity_threshold)
+            self.query_cache.put(cache_key, generation, matches)
+            return self._format_matches(matches, with_scores)
+        
+        except Exception as e:
+            self.logger.error(f"Error searching embeddings: {e}")
+            return self._format_matches([], with_scores)
+
+    def search_embeddings_batch(self, embeddings, top_k=5, similarity_threshold=SIMILARITY_THRESHOLD,
+                                with_scores=False):
+        """
+        Search several query embeddings with one index call
+        
+        Args:
+            embeddings (array-like): Query embeddings of shape (n, embedding_dim)
+            top_k (int): Maximum matches per query
+            similarity_threshold (float): Minimum similarity for a match
+            with_scores (bool): Return (embedding_id, similarity) pairs instead of IDs
+        
+        Returns:
+            list: One match list per query, [-1] (or [] with scores) where a query has no match
+        """
+        try:
+            embeddings = np.asarray(embeddings, dtype=np.float32)
+            embeddings = embeddings / np.linalg.norm(embeddings, axis=1)[:, np.newaxis]
+            
+            D, I = self.index.search(embeddings, self._search_k(top_k))
             
-            # Return matches or -1 if no matches
-            return matches if matches else [-1]
+            return [
+                self._format_matches(self._filter_matches(distances, ids, top_k, similarity_threshold), with_scores)
+                for distances, ids in zip(D, I)
+            ]
         
         except Exception as e:
             self.logger.error(f"Error searching embeddings: {e}")
-            return [-1]
+            return [self._format_matches([], with_scores) for _ in range(len(embeddings))]
+
+    def _write_index(self, filename):
+        """
+        Write the index to a temporary file and move it into place, so readers
+        in other processes never see a half-written index
+        """
+        temp_path = f"{filename}.tmp-{os.getpid()}-{threading.get_ident()}"
+        try:
+            faiss.write_index(self.index, temp_path)
+            with open(temp_path, 'rb') as f:
+                os.fsync(f.fileno())
+            os.replace(temp_path, filename)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def _index_file_lock(self):
+        return _exclusive_file_lock(f"{self.index_path}.lock")
 
-    def save_index(self, filename=FAISS_INDEX_PATH):
+    def _save_locked(self):
+        """
+        Persist the index while holding the index file lock
+        
+        If another process rewrote the file since it was loaded, that version
+        is read back and this store's unsaved adds and removals are replayed
+        onto it, so neither side's changes are lost.
+        """
+        if self._file_stamp() not in (None, self._index_stamp):
+            self.logger.info("FAISS index changed on disk, merging before saving")
+            if not self.create_or_load_index():
+                raise RuntimeError("Index on disk could not be read to merge with")
+            self.generation += 1
+        self._write_index(self.index_path)
+        self._index_stamp = self._file_stamp()
+        self._pending = []
+
+    def save_index(self, filename=None):
         """
         Save FAISS index with robust error handling
+        
+        Returns:
+            bool: True if the index was written
         """
+        filename = filename or self.index_path
         try:
             # Ensure directory exists
             os.makedirs(os.path.dirname(filename), exist_ok=True)
             
             # Save index
-            faiss.write_index(self.index, filename)
+            if filename == self.index_path:
+                with self._index_file_lock():
+                    self._save_locked()
+            else:
+                self._write_index(filename)
             self.logger.info(f"Index saved to {filename}")
+            return True
         except Exception as e:
             self.logger.error(f"Error saving index: {e}")
+            return False
+
+    def compact(self, force=False):
+        """
+        Physically purge tombstoned embeddings from the index
+        
+        Runs under the index file lock on the latest index on disk, so
+        vectors other processes add meanwhile are neither lost nor able to
+        bring purged ones back.
+        
+        Args:
+            force (bool): Compact even if the tombstoned fraction is below the threshold
+        
+        Returns:
+            int: Number of vectors removed from the index
+        """
+        with _compaction_lock:
+            try:
+                self.tombstones.refresh()
+                if self.tombstones.count() == 0:
+                    return 0
+                
+                with self._index_file_lock():
+                    self.reload_if_changed()
+                    self.tombstones.refresh()
+                    tombstoned_ids = self.tombstones.ids()
+                    if len(tombstoned_ids) == 0:
+                        return 0
+                    
+                    fraction = len(tombstoned_ids) / max(self.index.ntotal, 1)
+                    if not force and fraction < TOMBSTONE_COMPACTION_FRACTION:
+                        self.logger.info(f"Skipping compaction: {fraction:.1%} of index tombstoned")
+                        return 0
+                    
+                    removed = self.index.remove_ids(tombstoned_ids)
+                    self._save_locked()
+                    # Cleared only once the purged index is in place
+                    self.tombstones.clear_many(tombstoned_ids)
+                    self.generation += 1
+                
+                self.logger.info(f"Compacted index: removed {removed} tombstoned embeddings")
+                return removed
+            except Exception as e:
+                self.logger.error(f"Error compacting index: {e}")
+                return 0
+
+# One store per process so the loaded index and query cache survive between searches
+_shared_store = None
+_shared_store_lock = threading.Lock()
+
+def get_shared_vector_store():
+    """
+    Get the process-wide VectorStore, reloading it if the index changed on disk
+    
+    Returns:
+        VectorStore: Shared vector store
+    """
+    global _shared_store
+    with _shared_store_lock:
+        if _shared_store is None:
+            _shared_store = VectorStore()
+        else:
+            _shared_store.reload_if_changed()
+        return _shared_store
 
 # Utility functions
 def add_embedding_to_faiss(embedding, embedding_id):
@@ -137,13 +600,46 @@ def add_embedding_to_faiss(embedding, embedding_id):
         logging.error(f"Error adding embedding: {e}")
         return False
 
-def search_faiss(embedding, top_k=5, similarity_threshold=SIMILARITY_THRESHOLD):
+def search_faiss(embedding, top_k=5, similarity_threshold=SIMILARITY_THRESHOLD, with_scores=False):
     """
     Convenience function to search embeddings
     """
     try:
-        vector_store = VectorStore()
-        return vector_store.search_embeddings(embedding, top_k, similarity_threshold)
+        vector_store = get_shared_vector_store()
+        return vector_store.search_embeddings(embedding, top_k, similarity_threshold, with_scores)
     except Exception as e:
         logging.error(f"Error searching embeddings: {e}")
-        return [-1]
\ No newline at end of file
+        return [] if with_scores else [-1]
+
+def compact_faiss(force=False):
+    """
+    Convenience function to purge tombstoned embeddings from the index
+    """
+    try:
+        # Loading the index is the expensive part; skip it when nothing is tombstoned
+        if TombstoneBitmap().count() == 0:
+            return 0
+        vector_store = VectorStore()
+        return vector_store.compact(force)
+    except Exception as e:
+        logging.error(f"Error compacting index: {e}")
+        return 0
+
+def compact_faiss_async(force=False):
+    """
+    Run index compaction in a background thread, unless one is already running
+    
+    The thread is a daemon so it never delays a process's exit; the index is
+    replaced atomically and tombstones are cleared only afterwards, so an
+    interrupted compaction leaves the previous index in place.
+    
+    Returns:
+        threading.Thread: The compaction thread (the one already running, if any)
+    """
+    global _compaction_thread
+    with _shared_store_lock:
+        if _compaction_thread is None or not _compaction_thread.is_alive():
+            _compaction_thread = threading.Thread(target=compact_faiss, args=(force,),
+                                                  name="faiss-compaction", daemon=True)
+            _compaction_thread.start()
+        return _compaction_thread